@@ -0,0 +1,154 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from time import monotonic
+from typing import override
+
+
+class CacheBackend(ABC):
+    """Byte-oriented key/value store with per-entry expiry."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under `key`, or None if absent."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store `value` under `key` for `ttl` seconds."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove `keys`, ignoring the ones that are absent."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove every entry owned by this cache."""
+
+
+class NullCache(CacheBackend):
+    """Cache that stores nothing, used when caching is disabled."""
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    @override
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @override
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Bounded LRU cache local to the worker process.
+
+    Least recently used entries are evicted once there are more than
+    `max_entries` of them or, if `max_bytes` is set, once keys and
+    values add up to more than `max_bytes`.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        if not (entry := self._entries.get(key)):
+            return None
+
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._remove(key)
+        self._entries[key] = (monotonic() + ttl, value)
+        self.size += len(key) + len(value)
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.size > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    @override
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._remove(key)
+
+    @override
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key: str) -> None:
+        if entry := self._entries.pop(key, None):
+            self.size -= len(key) + len(entry[1])
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker, stored in Redis.
+
+    `client` is any object with the `redis.asyncio.Redis` interface.
+    Keys are namespaced with `prefix` so `clear` only touches our own.
+    """
+
+    def __init__(self, client, prefix: str):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str) -> 'RedisCache':
+        from redis.asyncio import Redis  # noqa: PLC0415
+
+        return cls(Redis.from_url(url), prefix)
+
+    @override
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    @override
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    @override
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    @override
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(f'{self.prefix}*')]
+        if keys:
+            await self.client.delete(*keys)
+
+
+def create_cache(
+    backend: str,
+    *,
+    max_entries: int,
+    redis_url: str | None,
+    prefix: str,
+    max_bytes: int | None = None,
+) -> CacheBackend:
+    """Build the cache backend selected in the settings."""
+    match backend:
+        case 'memory':
+            return MemoryCache(max_entries, max_bytes)
+        case 'redis':
+            if not redis_url:
+                raise ValueError('REDIS_URL is required for the redis cache')
+            return RedisCache.from_url(redis_url, prefix)
+        case _:
+            return NullCache()
@@ -0,0 +1,100 @@
+import hashlib
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+
+from fastapi import Request, Response
+from sqlalchemy import Select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+@dataclass(frozen=True)
+class Validators:
+    """`ETag` and `Last-Modified` of a resource or collection."""
+
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def build(cls, last_modified: datetime | None, *parts) -> 'Validators':
+        """Derive a weak ETag from the newest `updated_at` and `parts`.
+
+        Args:
+            last_modified (datetime | None): The newest `updated_at`,
+                `None` for an empty collection.
+            *parts: Anything else the representation depends on,
+                such as the row count or the owner id.
+        """
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=UTC)
+
+        stamp = last_modified.isoformat() if last_modified else ''
+        payload = ':'.join(map(str, (stamp, *parts))).encode()
+        digest = hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+        return cls(etag=f'W/"{digest}"', last_modified=last_modified)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {'ETag': self.etag}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = format_datetime(
+                self.last_modified, usegmt=True
+            )
+        return headers
+
+    def is_fresh(self, request: Request) -> bool:
+        """Whether the client's cached copy is still current.
+
+        `If-None-Match` wins over `If-Modified-Since` when both are
+        sent, as RFC 9110 requires.
+        """
+        if (if_none_match := request.headers.get('if-none-match')) is not None:
+            tags = {tag.strip() for tag in if_none_match.split(',')}
+            return '*' in tags or _weak(self.etag) in {_weak(t) for t in tags}
+
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since is None or self.last_modified is None:
+            return False
+
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+        return self.last_modified.replace(microsecond=0) <= since
+
+    def not_modified(self) -> Response:
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED, headers=self.headers
+        )
+
+
+def _weak(tag: str) -> str:
+    return tag.removeprefix('W/')
+
+
+async def collection_validators(
+    session: AsyncSession,
+    query: Select,
+    updated_at: InstrumentedAttribute,
+    *parts,
+) -> Validators:
+    """ETag for every row `query` selects, without loading them.
+
+    The count catches deletions, which leave `max(updated_at)` as is.
+    No `Last-Modified` is sent: a date alone cannot tell a client that
+    a row was deleted, so `If-Modified-Since` is ignored here. Pagination
+    is not applied, so any change in the filtered set invalidates all of
+    its pages.
+    """
+    count, last_modified = (
+        await session.execute(
+            query.with_only_columns(func.count(), func.max(updated_at))
+        )
+    ).one()
+
+    validators = Validators.build(last_modified, count, *parts)
+    return replace(validators, last_modified=None)
@@ -1,10 +1,208 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import asyncio
+from collections.abc import Iterator
+from time import perf_counter
+from typing import Annotated, Any
 
-from app.settings import settings
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-engine = create_async_engine(settings.DATABASE_URL)
+from app.metrics import gauge_family, histogram
+from app.profiling import instrument_queries
+from app.settings import Settings
 
+pool_checkout_wait = histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled connection.',
+)
+pool_in_use = gauge_family(
+    'db_pool_connections_in_use',
+    'Connections checked out of the pool, by database.',
+    labels=('database',),
+)
+pool_saturation = gauge_family(
+    'db_pool_saturation_ratio',
+    'Connections in use over pool_size + max_overflow, by database.',
+    labels=('database',),
+    multiprocess_mode='max',
+)
 
-async def get_session():  # pragma: no cover
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that times how long every checkout waits."""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_wait.observe(perf_counter() - start)
+
+
+def engine_options(settings: Settings) -> dict[str, Any]:
+    """Pool arguments for `create_async_engine`.
+
+    Connections are recycled after `DATABASE_POOL_RECYCLE` seconds
+    instead of pinged at every checkout, which would cost a round trip
+    per request. In-memory SQLite runs on a single static connection,
+    which takes no sizing arguments. asyncpg keeps each statement
+    prepared on its connection, so repeated queries skip parsing and
+    planning.
+    """
+    options: dict[str, Any] = {
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+    }
+
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == 'sqlite' and url.database in {
+        None,
+        '',
+        ':memory:',
+    }:
+        return options
+
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'prepared_statement_cache_size': (
+                settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE
+            ),
+        }
+
+    return options | {
+        'poolclass': TimedQueuePool,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+    }
+
+
+def set_sqlite_pragmas(settings: Settings):
+    def on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}')
+        cursor.execute(f'PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}')
+        cursor.execute(
+            f'PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}'
+        )
+        cursor.execute(f'PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}')
+        cursor.close()
+
+    return on_connect
+
+
+def instrument_pool(engine: AsyncEngine, capacity: int, database: str) -> None:
+    """Keep the pool usage gauges of `database` up to date.
+
+    Saturation is worked out from this engine's own checkouts, so
+    engines never skew each other's ratio.
+    """
+    pool = engine.sync_engine.pool
+    in_use = pool_in_use.labels(database)
+    saturation = pool_saturation.labels(database)
+    checked_out = 0
+
+    def on_checkout(*_):
+        nonlocal checked_out
+        checked_out += 1
+        in_use.inc()
+        saturation.set(checked_out / capacity)
+
+    def on_checkin(*_):
+        nonlocal checked_out
+        checked_out -= 1
+        in_use.dec()
+        saturation.set(checked_out / capacity)
+
+    event.listen(pool, 'checkout', on_checkout)
+    event.listen(pool, 'checkin', on_checkin)
+
+
+def each_database(settings: Settings) -> Iterator[tuple[str, Settings]]:
+    """The primary and every shard, each with its own `DATABASE_URL`.
+
+    Names are the pool metric labels: `primary` and `shard-<name>`.
+    """
+    yield 'primary', settings
+    for name, url in settings.DATABASE_SHARDS.items():
+        yield (
+            f'shard-{name}',
+            settings.model_copy(update={'DATABASE_URL': url}),
+        )
+
+
+def create_engine(
+    settings: Settings, database: str = 'primary'
+) -> AsyncEngine:
+    """Engine for `DATABASE_URL`; `database` labels its pool metrics."""
+    options = engine_options(settings)
+    engine = create_async_engine(settings.DATABASE_URL, **options)
+
+    if engine.dialect.name == 'sqlite':
+        event.listen(
+            engine.sync_engine, 'connect', set_sqlite_pragmas(settings)
+        )
+
+    instrument_pool(
+        engine,
+        options.get('pool_size', 1) + options.get('max_overflow', 0),
+        database,
+    )
+    instrument_queries(engine)
+    return engine
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open up to `connections` pooled connections before traffic arrives.
+
+    They are held at the same time, so each one is a distinct connection
+    that goes back to the pool afterwards.
+    """
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        connections = min(connections, 1)
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+def pool_status(engine: AsyncEngine) -> dict[str, int] | None:
+    """Occupancy of a queue pool; None for single-connection pools."""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
+
+
+def get_engine(connection: HTTPConnection) -> AsyncEngine:
+    """The engine opened by the application lifespan."""
+    return connection.app.state.engine
+
+
+async def checkout(session: AsyncSession) -> None:
+    """Acquire the session's connection up front."""
+    await session.connection()
+
+
+async def get_session(
+    engine: Annotated[AsyncEngine, Depends(get_engine)],
+):  # pragma: no cover
+    """Session that takes a connection at its first query, if any."""
     async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
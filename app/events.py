@@ -0,0 +1,315 @@
+"""Per-user feed of todo changes, streamed as server-sent events.
+
+Clients resume from `Last-Event-ID`, or get a `reset` event once the
+events they missed have left the log.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from itertools import takewhile
+from time import time_ns
+from typing import Any, override
+
+from fastapi.requests import HTTPConnection
+from pydantic_core import to_json
+
+from app.metrics import counter, gauge
+from app.settings import Settings
+
+change_feed_streams = gauge(
+    'change_feed_streams', 'Change feed streams open on this worker.'
+)
+change_feed_resets = counter(
+    'change_feed_resets_total', 'Resumes that fell behind the event log.'
+)
+
+MAX_CHANNELS = 10_000
+RETRY_MS = 1000
+
+Event = tuple[str, bytes]
+
+
+class EventLog(ABC):
+    """Bounded, ordered log of events per channel."""
+
+    @abstractmethod
+    async def append(self, channel: str, data: bytes) -> str:
+        """Add `data` to `channel` and return its event id."""
+
+    @abstractmethod
+    async def latest(self, channel: str) -> str:
+        """Id to read after to only get the events appended from now on."""
+
+    @abstractmethod
+    async def covers(self, channel: str, event_id: str) -> bool:
+        """Whether every event of `channel` after `event_id` is logged."""
+
+    @abstractmethod
+    async def read(
+        self, channel: str, after: str, timeout: float
+    ) -> list[Event]:
+        """Events of `channel` after `after`, waiting up to `timeout`."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove every channel owned by this log."""
+
+
+class MemoryEventLog(EventLog):
+    """Log local to the worker process.
+
+    Ids are `<start time ms>-<sequence>`, so the ids a client kept from
+    a previous process are never mistaken for current ones. Only the
+    `max_channels` most recently written channels are kept; a channel
+    written again after its eviction only covers ids from its floor,
+    the newest id evicted before it was recreated.
+    """
+
+    def __init__(self, max_events: int, max_channels: int = MAX_CHANNELS):
+        self.max_events = max_events
+        self.max_channels = max_channels
+        self.epoch = str(time_ns() // 1_000_000)
+        self._last = 0
+        self._evicted = 0
+        self._channels: OrderedDict[str, deque[tuple[int, bytes]]] = (
+            OrderedDict()
+        )
+        self._floors: dict[str, int] = {}
+        self._waiters: dict[str, set[asyncio.Event]] = {}
+
+    @override
+    async def append(self, channel: str, data: bytes) -> str:
+        self._last += 1
+        if (events := self._channels.get(channel)) is None:
+            events = self._channels[channel] = deque(maxlen=self.max_events)
+            self._floors[channel] = self._evicted
+        self._channels.move_to_end(channel)
+        events.append((self._last, data))
+
+        while len(self._channels) > self.max_channels:
+            evicted, dropped = self._channels.popitem(last=False)
+            del self._floors[evicted]
+            self._evicted = max(self._evicted, dropped[-1][0])
+
+        for waiter in self._waiters.get(channel, ()):
+            waiter.set()
+        return self._id(self._last)
+
+    @override
+    async def latest(self, channel: str) -> str:
+        return self._id(self._last)
+
+    @override
+    async def covers(self, channel: str, event_id: str) -> bool:
+        if (sequence := self._sequence(event_id)) is None:
+            return False
+        if sequence > self._last:
+            return False
+        if (events := self._channels.get(channel)) is None:
+            return sequence >= self._evicted
+        if sequence < self._floors[channel]:
+            return False
+        return len(events) < self.max_events or sequence >= events[0][0]
+
+    @override
+    async def read(
+        self, channel: str, after: str, timeout: float
+    ) -> list[Event]:
+        sequence = self._sequence(after) or 0
+        if not (events := self._after(channel, sequence)):
+            waiter = asyncio.Event()
+            waiters = self._waiters.setdefault(channel, set())
+            waiters.add(waiter)
+            try:
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(timeout):
+                        await waiter.wait()
+            finally:
+                waiters.discard(waiter)
+                if not waiters:
+                    self._waiters.pop(channel, None)
+            events = self._after(channel, sequence)
+
+        return [(self._id(number), data) for number, data in events]
+
+    @override
+    async def clear(self) -> None:
+        self._channels.clear()
+        self._floors.clear()
+        self._evicted = self._last
+
+    def _id(self, sequence: int) -> str:
+        return f'{self.epoch}-{sequence}'
+
+    def _sequence(self, event_id: str) -> int | None:
+        epoch, _, sequence = event_id.partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def _after(self, channel: str, sequence: int) -> list[tuple[int, bytes]]:
+        events = self._channels.get(channel, ())
+        newer = takewhile(lambda event: event[0] > sequence, reversed(events))
+        return list(newer)[::-1]
+
+
+def _stream_id(event_id: bytes | str) -> tuple[int, int] | None:
+    if isinstance(event_id, bytes):
+        event_id = event_id.decode()
+    milliseconds, _, sequence = event_id.partition('-')
+    if not (milliseconds.isdigit() and sequence.isdigit()):
+        return None
+    return int(milliseconds), int(sequence)
+
+
+class RedisEventLog(EventLog):
+    """Log shared by every worker: one capped Redis stream per channel.
+
+    `client` is any object with the `redis.asyncio.Redis` interface.
+    Streams are trimmed approximately, so they can briefly hold a few
+    more than `max_events` entries.
+    """
+
+    def __init__(self, client, prefix: str, max_events: int):
+        self.client = client
+        self.prefix = prefix
+        self.max_events = max_events
+
+    @classmethod
+    def from_url(
+        cls, url: str, prefix: str, max_events: int
+    ) -> 'RedisEventLog':
+        from redis.asyncio import Redis  # noqa: PLC0415
+
+        return cls(Redis.from_url(url), prefix, max_events)
+
+    @override
+    async def append(self, channel: str, data: bytes) -> str:
+        event_id = await self.client.xadd(
+            self.prefix + channel,
+            {'data': data},
+            maxlen=self.max_events,
+            approximate=True,
+        )
+        return event_id.decode()
+
+    @override
+    async def latest(self, channel: str) -> str:
+        newest = await self.client.xrevrange(self.prefix + channel, count=1)
+        return newest[0][0].decode() if newest else '0-0'
+
+    @override
+    async def covers(self, channel: str, event_id: str) -> bool:
+        if (after := _stream_id(event_id)) is None:
+            return False
+
+        key = self.prefix + channel
+        oldest = await self.client.xrange(key, count=1)
+        newest = await self.client.xrevrange(key, count=1)
+        if not newest:
+            return after == (0, 0)
+
+        first, last = _stream_id(oldest[0][0]), _stream_id(newest[0][0])
+        if first is None or last is None:
+            return False
+        return first <= after <= last
+
+    @override
+    async def read(
+        self, channel: str, after: str, timeout: float
+    ) -> list[Event]:
+        streams = await self.client.xread(
+            {self.prefix + channel: after}, block=max(1, int(timeout * 1000))
+        )
+        return [
+            (event_id.decode(), fields[b'data'])
+            for _, entries in streams or ()
+            for event_id, fields in entries
+        ]
+
+    @override
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(f'{self.prefix}*')]
+        if keys:
+            await self.client.delete(*keys)
+
+
+def create_event_log(
+    backend: str, *, max_events: int, redis_url: str | None, prefix: str
+) -> EventLog:
+    """Build the event log selected in the settings."""
+    if backend == 'redis':
+        if not redis_url:
+            raise ValueError('REDIS_URL is required for the redis event log')
+        return RedisEventLog.from_url(redis_url, prefix, max_events)
+    return MemoryEventLog(max_events)
+
+
+class ChangeFeed:
+    """Publishes events to an `EventLog` and streams them as SSE."""
+
+    def __init__(self, log: EventLog, keepalive: float):
+        self.log = log
+        self.keepalive = keepalive
+
+    async def publish(self, channel: str, event: str, data: Any) -> None:
+        """Append `event` to `channel`, rendered once for every stream."""
+        await self.log.append(
+            channel, b'event: %s\ndata: %s\n' % (event.encode(), to_json(data))
+        )
+
+    async def stream(
+        self, channel: str, last_event_id: str | None
+    ) -> AsyncIterator[bytes]:
+        """Events of `channel` after `last_event_id`, or from now on.
+
+        A comment is sent every `keepalive` seconds without events, so
+        proxies keep the connection open and a gone client is noticed.
+        """
+        change_feed_streams.inc()
+        try:
+            yield b'retry: %d\n\n' % RETRY_MS
+
+            if last_event_id and await self.log.covers(channel, last_event_id):
+                cursor = last_event_id
+            else:
+                cursor = await self.log.latest(channel)
+                if last_event_id:
+                    change_feed_resets.inc()
+                    yield b'id: %s\nevent: reset\ndata: {}\n\n' % (
+                        cursor.encode()
+                    )
+
+            while True:
+                events = await self.log.read(channel, cursor, self.keepalive)
+                if not events:
+                    yield b': keepalive\n\n'
+                    continue
+
+                cursor = events[-1][0]
+                yield b''.join(
+                    b'id: %s\n%s\n' % (event_id.encode(), data)
+                    for event_id, data in events
+                )
+        finally:
+            change_feed_streams.dec()
+
+
+def create_change_feed(settings: Settings) -> ChangeFeed:
+    return ChangeFeed(
+        create_event_log(
+            settings.CHANGE_FEED_BACKEND,
+            max_events=settings.CHANGE_FEED_LOG_SIZE,
+            redis_url=settings.REDIS_URL,
+            prefix='changes:',
+        ),
+        keepalive=settings.CHANGE_FEED_KEEPALIVE_SECONDS,
+    )
+
+
+def get_change_feed(connection: HTTPConnection) -> ChangeFeed:
+    """The change feed built by `create_app`."""
+    return connection.app.state.change_feed
@@ -1,22 +1,108 @@
-import logfire
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
-from app.database import engine
-from app.routers import auth, todos, users
+from fastapi import FastAPI, Response
+
+from app.database import create_engine, warm_pool
+from app.events import create_change_feed
+from app.metrics import CONTENT_TYPE, SnapshotWriter, collect
+from app.profiling import QueryProfileMiddleware, RequestMetricsMiddleware
+from app.replicas import ReplicaSet, create_recent_writes
+from app.response_cache import create_response_cache
+from app.routers import auth, health, todos, users
 from app.schemas import Message
-from app.settings import settings
+from app.security import (
+    create_password_pool,
+    create_principal_cache,
+    create_token_issuer,
+    warm_up_auth,
+)
+from app.settings import Settings, settings
+from app.sharding import create_shards
+from app.telemetry import configure_telemetry, instrument_engine
+from app.tokens import create_token_keys, create_token_verifier
+
+
+def create_app(settings: Settings) -> FastAPI:
+    """Build the application; its lifespan owns the database engine.
+
+    Everything built from `settings` lives on `app.state` and reaches the
+    handlers through dependencies, so two apps never share a cache.
+    `/health/ready` answers 503 until the pool and the auth paths are
+    warm, and again once shutdown has begun.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.engine = engine = create_engine(settings)
+        app.state.replicas = replicas = ReplicaSet(
+            engine,
+            [
+                create_engine(
+                    settings.model_copy(update={'DATABASE_URL': url}),
+                    f'replica-{index}',
+                )
+                for index, url in enumerate(settings.DATABASE_REPLICA_URLS)
+            ],
+            settings.REPLICA_EJECTION_SECONDS,
+            app.state.recent_writes,
+        )
+        app.state.shards = shards = create_shards(settings)
+        for database in (engine, *replicas.replicas, *shards.engines.values()):
+            instrument_engine(database, settings)
+        try:
+            await warm_pool(engine, settings.DATABASE_POOL_WARM_CONNECTIONS)
+            await replicas.warm(settings.DATABASE_POOL_WARM_CONNECTIONS)
+            await shards.warm(settings.DATABASE_POOL_WARM_CONNECTIONS)
+            if settings.STARTUP_WARMUP:
+                await warm_up_auth(
+                    app.state.password_pool, app.state.token_issuer
+                )
+            app.state.ready = True
+            yield
+        finally:
+            app.state.ready = False
+            await replicas.dispose()
+            await shards.dispose()
+            await engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.ready = False
+    app.state.settings = settings
+    app.state.password_pool = create_password_pool(settings)
+    app.state.principal_cache = create_principal_cache(settings)
+    app.state.token_keys = keys = create_token_keys(settings)
+    app.state.token_verifier = create_token_verifier(settings, keys)
+    app.state.token_issuer = create_token_issuer(settings, keys)
+    app.state.response_cache = create_response_cache(settings)
+    app.state.recent_writes = create_recent_writes(settings)
+    app.state.change_feed = create_change_feed(settings)
+    app.add_middleware(QueryProfileMiddleware)
+    app.add_middleware(
+        RequestMetricsMiddleware,
+        snapshot_writer=SnapshotWriter(
+            settings.METRICS_MULTIPROC_DIR,
+            settings.METRICS_FLUSH_INTERVAL_SECONDS,
+        ),
+    )
+
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(todos.router)
+    app.include_router(health.router)
+
+    configure_telemetry(app, settings)
 
-app = FastAPI()
+    @app.get('/', response_model=Message)
+    async def root():
+        return {'message': 'Hello World'}
 
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(todos.router)
+    @app.get('/metrics', include_in_schema=False)
+    async def metrics():
+        return Response(
+            collect(settings.METRICS_MULTIPROC_DIR), media_type=CONTENT_TYPE
+        )
 
-logfire.configure(token=settings.LOGFIRE_TOKEN)
-logfire.instrument_fastapi(app)
-logfire.instrument_sqlalchemy(engine)
+    return app
 
 
-@app.get('/', response_model=Message)
-async def root():
-    return {'message': 'Hello World'}
+app = create_app(settings)
@@ -0,0 +1,375 @@
+"""In-process metrics, exposed in the Prometheus text format.
+
+Every worker only touches its own registry, so recording needs no
+locks. Under a multi-process server each worker also dumps its
+registry to `METRICS_MULTIPROC_DIR` now and then (`SnapshotWriter`);
+the worker answering `/metrics` merges those files with its own live
+values. Counters and histograms of exited workers are kept so totals
+never go backwards; their gauges are dropped.
+"""
+
+import json
+import os
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic
+from typing import Literal
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@dataclass
+class Counter:
+    """Monotonic in-process counter."""
+
+    name: str
+    documentation: str
+    value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+@dataclass
+class Gauge:
+    """In-process value that can go up and down.
+
+    `multiprocess_mode` says how the values of several workers combine:
+    added up (connections in use) or the largest one (saturation).
+    """
+
+    name: str
+    documentation: str
+    value: float = 0
+    multiprocess_mode: Literal['sum', 'max'] = 'sum'
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+
+@dataclass
+class Histogram:
+    """Histogram of observed values, bucketed by upper bound."""
+
+    name: str
+    documentation: str
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(init=False)
+    sum: float = field(init=False, default=0)
+    count: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+type Child = Counter | Gauge | Histogram
+
+
+@dataclass
+class Family[M: Child]:
+    """Metrics sharing a name, one per combination of label values."""
+
+    name: str
+    documentation: str
+    label_names: tuple[str, ...]
+    factory: Callable[[], M]
+    children: dict[tuple[str, ...], M] = field(default_factory=dict)
+
+    def labels(self, *values: str) -> M:
+        if (child := self.children.get(values)) is None:
+            child = self.children[values] = self.factory()
+        return child
+
+
+type Metric = Child | Family
+
+registry: dict[str, Metric] = {}
+
+
+def _register(name: str, factory: Callable[[], Metric]):
+    if name not in registry:
+        registry[name] = factory()
+    metric = registry[name]
+    if type(metric) is not type(factory()):
+        raise TypeError(f'{name} is already registered as another type')
+    return metric
+
+
+def counter(name: str, documentation: str) -> Counter:
+    """Return the counter called `name`, registering it on first use."""
+    return _register(name, lambda: Counter(name, documentation))
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    multiprocess_mode: Literal['sum', 'max'] = 'sum',
+) -> Gauge:
+    """Return the gauge called `name`, registering it on first use."""
+    return _register(
+        name,
+        lambda: Gauge(
+            name, documentation, multiprocess_mode=multiprocess_mode
+        ),
+    )
+
+
+def histogram(
+    name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+) -> Histogram:
+    """Return the histogram called `name`, registering it on first use."""
+    return _register(name, lambda: Histogram(name, documentation, buckets))
+
+
+def counter_family(
+    name: str, documentation: str, labels: tuple[str, ...]
+) -> Family[Counter]:
+    """Like `counter`, with one counter per combination of `labels`."""
+    return _register(
+        name,
+        lambda: Family(
+            name, documentation, labels, lambda: Counter(name, documentation)
+        ),
+    )
+
+
+def gauge_family(
+    name: str,
+    documentation: str,
+    labels: tuple[str, ...],
+    multiprocess_mode: Literal['sum', 'max'] = 'sum',
+) -> Family[Gauge]:
+    """Like `gauge`, with one gauge per combination of `labels`."""
+    return _register(
+        name,
+        lambda: Family(
+            name,
+            documentation,
+            labels,
+            lambda: Gauge(
+                name, documentation, multiprocess_mode=multiprocess_mode
+            ),
+        ),
+    )
+
+
+def histogram_family(
+    name: str,
+    documentation: str,
+    labels: tuple[str, ...],
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Family[Histogram]:
+    """Like `histogram`, with one histogram per combination of `labels`."""
+    return _register(
+        name,
+        lambda: Family(
+            name,
+            documentation,
+            labels,
+            lambda: Histogram(name, documentation, buckets),
+        ),
+    )
+
+
+def _samples(metric: Metric) -> Iterator[tuple[dict[str, str], Child]]:
+    if isinstance(metric, Family):
+        for values, child in metric.children.items():
+            yield dict(zip(metric.label_names, values, strict=True)), child
+    else:
+        yield {}, metric
+
+
+def snapshot(metrics: dict[str, Metric] | None = None) -> dict:
+    """JSON-serializable copy of `metrics` (the registry by default)."""
+    families = {}
+    for name, metric in (metrics or registry).items():
+        samples = []
+        kind = None
+        for labels, child in _samples(metric):
+            match child:
+                case Histogram():
+                    kind = {'type': 'histogram', 'buckets': child.buckets}
+                    sample = {
+                        'counts': child.counts,
+                        'sum': child.sum,
+                        'count': child.count,
+                    }
+                case Gauge():
+                    kind = {'type': 'gauge', 'mode': child.multiprocess_mode}
+                    sample = {'value': child.value}
+                case Counter():
+                    kind = {'type': 'counter'}
+                    sample = {'value': child.value}
+            samples.append({'labels': labels, **sample})
+
+        if kind is not None:
+            families[name] = {
+                'documentation': metric.documentation,
+                **kind,
+                'samples': samples,
+            }
+    return families
+
+
+def merge(snapshots: list[dict]) -> dict:
+    """Combine the snapshots of several workers into one."""
+    merged: dict = {}
+    for families in snapshots:
+        for name, family in families.items():
+            target = merged.setdefault(name, {**family, 'samples': []})
+            by_labels = {
+                tuple(sorted(sample['labels'].items())): sample
+                for sample in target['samples']
+            }
+            for sample in family['samples']:
+                key = tuple(sorted(sample['labels'].items()))
+                if (current := by_labels.get(key)) is None:
+                    copied = json.loads(json.dumps(sample))
+                    target['samples'].append(copied)
+                    by_labels[key] = copied
+                elif family['type'] == 'histogram':
+                    current['counts'] = [
+                        a + b
+                        for a, b in zip(
+                            current['counts'], sample['counts'], strict=True
+                        )
+                    ]
+                    current['sum'] += sample['sum']
+                    current['count'] += sample['count']
+                elif family.get('mode') == 'max':
+                    current['value'] = max(current['value'], sample['value'])
+                else:
+                    current['value'] += sample['value']
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    pairs = {**labels, **extra}
+    if not pairs:
+        return ''
+    rendered = (
+        f'{key}="{_escape(str(value))}"' for key, value in pairs.items()
+    )
+    return '{' + ','.join(rendered) + '}'
+
+
+def render(families: dict) -> str:
+    """Format a snapshot in the Prometheus text exposition format."""
+    lines = []
+    for name, family in families.items():
+        lines += [
+            f'# HELP {name} {family["documentation"]}',
+            f'# TYPE {name} {family["type"]}',
+        ]
+        for sample in family['samples']:
+            labels = sample['labels']
+            if family['type'] != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {sample["value"]}')
+                continue
+
+            cumulative = 0
+            bounds = [*map(str, family['buckets']), '+Inf']
+            for bound, count in zip(bounds, sample['counts'], strict=True):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+                )
+            lines += [
+                f'{name}_sum{_labels(labels)} {sample["sum"]}',
+                f'{name}_count{_labels(labels)} {sample["count"]}',
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory: str | None) -> str:
+    """Render this worker's metrics merged with its siblings' snapshots."""
+    own = snapshot()
+    if directory is None:
+        return render(own)
+
+    snapshots = [own]
+    for path in Path(directory).glob('*.json'):
+        pid = int(path.stem)
+        if pid == os.getpid():
+            continue
+        try:
+            families = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # removed or replaced while we were reading
+        if not _is_alive(pid):
+            families = {
+                name: family
+                for name, family in families.items()
+                if family['type'] != 'gauge'
+            }
+        snapshots.append(families)
+
+    return render(merge(snapshots))
+
+
+class SnapshotWriter:
+    """Dumps the registry for the other workers at most every `interval`.
+
+    The file is replaced atomically, so readers never see it half
+    written and no lock is needed.
+    """
+
+    def __init__(self, directory: str | None, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self.last_write = float('-inf')
+
+    def maybe_write(self) -> None:
+        if self.directory is None:
+            return
+        if monotonic() - self.last_write < self.interval:
+            return
+
+        self.last_write = monotonic()
+        path = Path(self.directory) / f'{os.getpid()}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(snapshot()))
+        temporary.replace(path)
@@ -1,13 +1,46 @@
+from collections.abc import Iterable
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import func
+from sqlalchemy import DDL, BigInteger, Index, Table, event, func
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
+from sqlalchemy.sql.functions import now
 from sqlalchemy.sql.schema import ForeignKey
 
 table_registry = registry()
 
 
+@compiles(now, 'sqlite')
+def sqlite_now(element, compiler, **kw):
+    """Millisecond `now()`: `CURRENT_TIMESTAMP` drops the fraction.
+
+    `updated_at` drives the ETags and timestamp syncs, so two writes
+    within the same second must still be told apart. The timestamps are
+    stamped by the INSERT itself (`insert_default`), since the tables
+    built by the migrations keep `CURRENT_TIMESTAMP` as server default.
+    """
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def register_ddl(
+    table: Table,
+    *,
+    sqlite: Iterable[str] = (),
+    postgresql: Iterable[str] = (),
+    when: str = 'after_create',
+) -> None:
+    """Run per-dialect DDL statements on the `when` event of `table`."""
+    for dialect, statements in (
+        ('sqlite', sqlite),
+        ('postgresql', postgresql),
+    ):
+        for statement in statements:
+            event.listen(
+                table, when, DDL(statement).execute_if(dialect=dialect)
+            )
+
+
 class TodoState(str, Enum):
     draft = 'draft'
     todo = 'todo'
@@ -25,20 +58,32 @@ class User:
     password: Mapped[str]
     email: Mapped[str] = mapped_column(unique=True)
     created_at: Mapped[datetime] = mapped_column(
-        init=False, server_default=func.now()
+        init=False, insert_default=func.now(), server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        init=False, server_default=func.now(), onupdate=func.now()
+        init=False,
+        insert_default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False,
+        cascade='all, delete-orphan',
+        lazy='raise',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index('ix_todos_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_todos_user_id_updated_at', 'user_id', 'updated_at'),
+        Index('ix_todos_user_id_version', 'user_id', 'version'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
@@ -46,8 +91,62 @@ class Todo:
     description: Mapped[str]
     state: Mapped[TodoState]
     created_at: Mapped[datetime] = mapped_column(
-        init=False, server_default=func.now()
+        init=False, insert_default=func.now(), server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        init=False, server_default=func.now(), onupdate=func.now()
+        init=False,
+        insert_default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+    # Stamped by the triggers in `app/sync.py` on every insert and update.
+    version: Mapped[int] = mapped_column(
+        BigInteger, init=False, server_default='0'
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoStateCount:
+    """How many todos a user has in each state.
+
+    Kept in step with `todos` by the triggers in `app/stats.py`.
+    """
+
+    __tablename__ = 'todo_state_counts'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int]
+
+
+@table_registry.mapped_as_dataclass
+class TodoVersion:
+    """Last version stamped on a user's todos or tombstones.
+
+    Syncs from before the horizon are refused: the tombstones they need
+    were pruned, or the user's todos were moved to another shard.
+    """
+
+    __tablename__ = 'todo_versions'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(BigInteger)
+    horizon_version: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default='0'
     )
+    horizon_at: Mapped[datetime | None] = mapped_column(default=None)
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """A deleted todo, kept for the delta syncs of `GET /todos/changes`."""
+
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index('ix_todo_tombstones_user_id_version', 'user_id', 'version'),
+    )
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[datetime] = mapped_column(server_default=func.now())
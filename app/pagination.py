@@ -0,0 +1,74 @@
+import base64
+import json
+from binascii import Error as BinasciiError
+from collections.abc import Sequence
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.schemas import FilterPage
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the keyset position of the last row returned to the client.
+
+    Args:
+        last_id (int): The primary key of the last row of the page.
+
+    Returns:
+        str: An opaque, url-safe cursor.
+    """
+    payload = json.dumps({'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Raises:
+        HTTPException: If the cursor was not issued by this API.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = payload['id']
+    except (BinasciiError, ValueError, TypeError, KeyError) as exc:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        ) from exc
+
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+
+    return last_id
+
+
+def paginate(
+    query: Select, key: InstrumentedAttribute, page: FilterPage
+) -> Select:
+    """Apply keyset pagination when a cursor is given, offset otherwise.
+
+    One extra row is requested so `next_page` can tell whether
+    another page exists without issuing a COUNT.
+    """
+    query = query.order_by(key)
+
+    if page.cursor is not None:
+        query = query.where(key > decode_cursor(page.cursor))
+    else:
+        query = query.offset(page.offset)
+
+    return query.limit(page.limit + 1)
+
+
+def next_page(rows: Sequence, page: FilterPage) -> tuple[Sequence, str | None]:
+    """Trim the look-ahead row and build the cursor for the next page."""
+    if len(rows) <= page.limit:
+        return rows, None
+
+    rows = rows[: page.limit]
+    return rows, encode_cursor(rows[-1].id)
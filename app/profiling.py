@@ -0,0 +1,171 @@
+"""Per-request latency and SQL profile.
+
+`instrument_queries` times every statement an engine runs and adds it
+to the profile of the request being served, which `QueryProfileMiddleware`
+opens for each HTTP request. The totals are sent back in the
+`Server-Timing` header and fed to in-process histograms.
+`RequestMetricsMiddleware` records the latency of every route.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import (
+    SnapshotWriter,
+    counter_family,
+    gauge,
+    histogram,
+    histogram_family,
+)
+
+requests_in_flight = gauge(
+    'http_requests_in_flight', 'HTTP requests being served.'
+)
+request_duration = histogram_family(
+    'http_request_duration_seconds',
+    'Time to serve an HTTP request, body included.',
+    labels=('method', 'route'),
+)
+requests_total = counter_family(
+    'http_requests_total',
+    'HTTP responses sent.',
+    labels=('method', 'route', 'status'),
+)
+
+request_queries = histogram(
+    'http_request_db_queries',
+    'SQL statements run while serving a request.',
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_db_time = histogram(
+    'http_request_db_seconds', 'Time spent in SQL while serving a request.'
+)
+query_duration = histogram(
+    'db_query_duration_seconds', 'Duration of a single SQL statement.'
+)
+
+
+@dataclass
+class QueryProfile:
+    count: int = 0
+    duration: float = 0
+    slowest: float = 0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        if elapsed >= self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+
+    @property
+    def server_timing(self) -> str:
+        return (
+            f'db;desc="{self.count} queries";dur={self.duration * 1000:.2f}, '
+            f'db-slowest;dur={self.slowest * 1000:.2f}'
+        )
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    'current_profile', default=None
+)
+
+
+def instrument_queries(engine: AsyncEngine) -> None:
+    """Time every statement `engine` runs."""
+
+    def before_cursor_execute(conn, cursor, statement, *_):
+        conn.info.setdefault('query_start', []).append(perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, *_):
+        elapsed = perf_counter() - conn.info['query_start'].pop()
+        query_duration.observe(elapsed)
+        if profile := current_profile.get():
+            profile.record(statement, elapsed)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    event.listen(
+        engine.sync_engine, 'after_cursor_execute', after_cursor_execute
+    )
+
+
+class QueryProfileMiddleware:
+    """Profile the SQL of each HTTP request.
+
+    `Server-Timing` reports the statements run before the response
+    starts; streamed bodies may run more, which only the histograms see.
+    The profile is left on `request.state.query_profile`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        profile = QueryProfile()
+        scope.setdefault('state', {})['query_profile'] = profile
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message: Message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', profile.server_timing.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            request_queries.observe(profile.count)
+            request_db_time.observe(profile.duration)
+
+
+class RequestMetricsMiddleware:
+    """Count and time HTTP requests per route.
+
+    Routes are labelled by their template (`/todos/{todo_id}`), and
+    requests matching no route share one label, so the number of series
+    stays bounded. `snapshot_writer` publishes the registry to the other
+    workers after each request.
+    """
+
+    def __init__(self, app: ASGIApp, snapshot_writer: SnapshotWriter):
+        self.app = app
+        self.snapshot_writer = snapshot_writer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        requests_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            requests_in_flight.dec()
+
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            request_duration.labels(scope['method'], route).observe(elapsed)
+            requests_total.labels(scope['method'], route, str(status)).inc()
+            self.snapshot_writer.maybe_write()
@@ -0,0 +1,181 @@
+"""Routing of read-only handlers to replica engines."""
+
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from itertools import count
+from time import monotonic
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.cache import CacheBackend, create_cache
+from app.database import checkout, warm_pool
+from app.metrics import counter, counter_family
+from app.response_cache import ResponseCache, get_response_cache
+from app.settings import Settings
+
+read_routes = counter_family(
+    'db_read_routes_total',
+    'Read-only sessions opened, by target.',
+    labels=('target',),
+)
+replica_ejections = counter(
+    'db_replica_ejections_total', 'Replicas taken out of rotation.'
+)
+
+STICKINESS_MAX_ENTRIES = 10_000
+
+
+class RecentWrites:
+    """Namespaces written within the last `window` seconds."""
+
+    def __init__(self, backend: CacheBackend, window: float):
+        self.backend = backend
+        self.window = window
+
+    async def record(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            await self.backend.set(namespace, b'1', self.window)
+
+    async def contains(self, namespace: str) -> bool:
+        return await self.backend.get(namespace) is not None
+
+
+def create_recent_writes(settings: Settings) -> RecentWrites:
+    return RecentWrites(
+        create_cache(
+            settings.REPLICA_STICKINESS_BACKEND,
+            max_entries=STICKINESS_MAX_ENTRIES,
+            redis_url=settings.REDIS_URL,
+            prefix='written:',
+        ),
+        window=settings.REPLICA_STICKINESS_SECONDS,
+    )
+
+
+def get_recent_writes(connection: HTTPConnection) -> RecentWrites:
+    """The write marks built by `create_app`."""
+    return connection.app.state.recent_writes
+
+
+class NamespaceWrites:
+    """Marks written namespaces and drops their cached pages.
+
+    Marking comes first, so a read racing the write stays on the primary
+    and cannot store lagging rows under the new generation.
+    """
+
+    def __init__(
+        self,
+        recent_writes: Annotated[RecentWrites, Depends(get_recent_writes)],
+        response_cache: Annotated[ResponseCache, Depends(get_response_cache)],
+    ):
+        self.recent_writes = recent_writes
+        self.response_cache = response_cache
+
+    async def written(self, *namespaces: str) -> None:
+        await self.recent_writes.record(*namespaces)
+        await self.response_cache.invalidate(*namespaces)
+
+
+class ReplicaSet:
+    """The primary engine and the replicas that can serve its reads.
+
+    Namespaces in `recent_writes` are read from the primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine],
+        ejection_seconds: float,
+        recent_writes: RecentWrites,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.ejection_seconds = ejection_seconds
+        self.recent_writes = recent_writes
+        self.ejected_until: dict[AsyncEngine, float] = {}
+        self._turn = count()
+
+    def healthy(self) -> list[AsyncEngine]:
+        now = monotonic()
+        return [
+            replica
+            for replica in self.replicas
+            if self.ejected_until.get(replica, 0) <= now
+        ]
+
+    def eject(self, replica: AsyncEngine) -> None:
+        self.ejected_until[replica] = monotonic() + self.ejection_seconds
+        replica_ejections.inc()
+
+    async def reader(self, namespace: str) -> AsyncEngine:
+        """Replica for reading `namespace`, in turn, or the primary."""
+        healthy = self.healthy()
+        if not healthy or await self.recent_writes.contains(namespace):
+            return self.primary
+        return healthy[next(self._turn) % len(healthy)]
+
+    async def warm(self, connections: int) -> None:
+        """Pre-open replica pools, ejecting the replicas that are down."""
+        for replica in self.replicas:
+            try:
+                await warm_pool(replica, connections)
+            except (DBAPIError, OSError):
+                self.eject(replica)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+def get_replicas(connection: HTTPConnection) -> ReplicaSet:
+    """The replica set opened by the application lifespan."""
+    return connection.app.state.replicas
+
+
+async def _open(engine: AsyncEngine) -> AsyncSession:
+    session = AsyncSession(engine, expire_on_commit=False)
+    try:
+        await checkout(session)
+    except BaseException:
+        await session.close()
+        raise
+    return session
+
+
+def on_replica(session: AsyncSession) -> bool:
+    """Whether `session` reads a replica, which may lag the primary."""
+    return session.info.get('replica', False)
+
+
+@asynccontextmanager
+async def read_session(
+    replicas: ReplicaSet, namespace: str, primary: AsyncSession
+) -> AsyncIterator[AsyncSession]:
+    """Session for a read-only handler of `namespace`.
+
+    Reads of the primary go through `primary`, the request's session, so
+    a request never holds two primary connections. A replica that cannot
+    be reached is ejected and the primary serves the request instead.
+    """
+    engine = await replicas.reader(namespace)
+    if engine is not replicas.primary:
+        try:
+            session = await _open(engine)
+        except (DBAPIError, OSError):
+            replicas.eject(engine)
+        else:
+            session.info['replica'] = True
+            read_routes.labels('replica').inc()
+            async with session:
+                yield session
+            return
+
+    primary.info['replica'] = False
+    read_routes.labels('primary').inc()
+    yield primary
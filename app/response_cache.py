@@ -0,0 +1,138 @@
+"""Cache of rendered GET responses, invalidated by the mutating routes.
+
+Entries live under a namespace (`users`, `todos:<user id>`) whose
+current generation is part of every key. Invalidating a namespace
+drops its generation, which orphans all of its entries at once on
+any backend; orphans are evicted by LRU or expire with the TTL.
+"""
+
+import json
+import secrets
+from email.utils import parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.requests import HTTPConnection
+
+from app.cache import CacheBackend, create_cache
+from app.conditional import Validators
+from app.metrics import counter
+from app.responses import FastJSONResponse
+from app.settings import Settings
+
+response_cache_hits = counter(
+    'response_cache_hits_total', 'GET responses served from the cache.'
+)
+response_cache_misses = counter(
+    'response_cache_misses_total', 'GET responses rendered by the handler.'
+)
+
+CACHED_HEADERS = ('etag', 'last-modified')
+USERS_NAMESPACE = 'users'
+
+
+def todos_namespace(user_id: int) -> str:
+    return f'todos:{user_id}'
+
+
+class CacheEntry:
+    """Slot of one request in the response cache."""
+
+    def __init__(self, cache: 'ResponseCache', request: Request, key: str):
+        self.cache = cache
+        self.request = request
+        self.key = key
+        self.cached: Response | None = None
+
+    async def load(self) -> Response | None:
+        """The cached response, or 304 if the client's copy is current.
+
+        The result is also kept in `cached`.
+        """
+        self.cached = await self._load()
+        return self.cached
+
+    async def _load(self) -> Response | None:
+        if not (cached := await self.cache.backend.get(self.key)):
+            response_cache_misses.inc()
+            return None
+
+        response_cache_hits.inc()
+        raw_headers, body = cached.split(b'\n', 1)
+        headers = json.loads(raw_headers)
+
+        validators = Validators(
+            etag=headers['etag'],
+            last_modified=parsedate_to_datetime(headers['last-modified'])
+            if 'last-modified' in headers
+            else None,
+        )
+        if validators.is_fresh(self.request):
+            return validators.not_modified()
+
+        return Response(body, media_type='application/json', headers=headers)
+
+    async def save(
+        self, response: FastJSONResponse, cacheable: bool = True
+    ) -> FastJSONResponse:
+        """Store `response`, unless it is not `cacheable`, and return it."""
+        if not cacheable:
+            return response
+
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        await self.cache.backend.set(
+            self.key,
+            json.dumps(headers).encode() + b'\n' + response.body,
+            self.cache.ttl,
+        )
+        return response
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def entry(self, request: Request, namespace: str) -> CacheEntry:
+        """Slot for `request`, keyed by path and normalized query string."""
+        generation_key = f'generation:{namespace}'
+
+        if generation := await self.backend.get(generation_key):
+            generation = generation.decode()
+        else:
+            # Random rather than a counter, so a generation lost to
+            # eviction can never bring back entries written under it.
+            generation = secrets.token_hex(8)
+            await self.backend.set(
+                generation_key, generation.encode(), self.ttl
+            )
+
+        query = sorted(request.query_params.multi_items())
+        key = f'{namespace}:{generation}:{request.url.path}?{query}'
+        return CacheEntry(self, request, key)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        await self.backend.delete(
+            *(f'generation:{namespace}' for namespace in namespaces)
+        )
+
+
+def create_response_cache(settings: Settings) -> ResponseCache:
+    return ResponseCache(
+        create_cache(
+            settings.RESPONSE_CACHE_BACKEND,
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            redis_url=settings.REDIS_URL,
+            prefix='response:',
+        ),
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    )
+
+
+def get_response_cache(connection: HTTPConnection) -> ResponseCache:
+    """The response cache built by `create_app`."""
+    return connection.app.state.response_cache
@@ -0,0 +1,31 @@
+from collections.abc import Iterable
+from typing import Any, override
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core instead of `json.dumps`.
+
+    Only needed when a handler builds its own response: for declared
+    response models FastAPI already dumps JSON with pydantic-core.
+    """
+
+    @override
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def as_dict(row, schema: type[BaseModel]) -> dict:
+    """Read the fields of `schema` straight off an ORM row.
+
+    Validation is skipped: the rows come from our own tables, whose
+    columns already have the types the schema declares.
+    """
+    return {field: getattr(row, field) for field in schema.model_fields}
+
+
+def as_dicts(rows: Iterable, schema: type[BaseModel]) -> list[dict]:
+    return [as_dict(row, schema) for row in rows]
@@ -8,26 +8,39 @@ from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from app.database import get_session
 from app.models import User
-from app.schemas import Token
-from app.security import create_access_token, get_current_user, verify_password
+from app.schemas import JWKSet, Token
+from app.security import (
+    PasswordHashPool,
+    TokenIssuer,
+    get_current_user,
+    get_password_pool,
+    get_token_issuer,
+)
+from app.tokens import TokenKeys, get_token_keys
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 OAuth2FormDep = Annotated[OAuth2PasswordRequestForm, Depends()]
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+PasswordPoolDep = Annotated[PasswordHashPool, Depends(get_password_pool)]
+TokenIssuerDep = Annotated[TokenIssuer, Depends(get_token_issuer)]
+TokenKeysDep = Annotated[TokenKeys, Depends(get_token_keys)]
 
 
 @router.post('/refresh_token', response_model=Token)
-async def refresh_access_token(user: CurrentUser):
-    new_access_token = create_access_token(data={'sub': user.email})
+async def refresh_access_token(user: CurrentUser, tokens: TokenIssuerDep):
+    new_access_token = tokens.create_access_token(data={'sub': user.email})
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
 
 
 @router.post('/token', response_model=Token)
 async def login_for_access_token(
-    form_data: OAuth2FormDep, session: AsyncSessionDep
+    form_data: OAuth2FormDep,
+    session: AsyncSessionDep,
+    passwords: PasswordPoolDep,
+    tokens: TokenIssuerDep,
 ):
     user = await session.scalar(
         select(User).where(User.email == form_data.username)
@@ -39,12 +52,17 @@ async def login_for_access_token(
             detail='Incorrect email or password',
         )
 
-    if not verify_password(form_data.password, user.password):
+    if not await passwords.verify(form_data.password, user.password):
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    access_token = tokens.create_access_token(data={'sub': user.email})
 
     return {'access_token': access_token, 'token_type': 'bearer'}
+
+
+@router.get('/jwks', response_model=JWKSet)
+async def read_jwks(keys: TokenKeysDep):
+    return keys.jwks
@@ -0,0 +1,62 @@
+import asyncio
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import get_engine, pool_status
+from app.schemas import Message, Readiness
+from app.settings import Settings, get_settings
+from app.sharding import ShardSet, get_shards
+
+router = APIRouter(prefix='/health', tags=['health'])
+
+EngineDep = Annotated[AsyncEngine, Depends(get_engine)]
+ShardsDep = Annotated[ShardSet, Depends(get_shards)]
+SettingsDep = Annotated[Settings, Depends(get_settings)]
+
+
+@router.get('/live', response_model=Message)
+async def liveness():
+    """The worker's event loop is serving requests."""
+    return {'message': 'alive'}
+
+
+@router.get(
+    '/ready',
+    response_model=Readiness,
+    responses={HTTPStatus.SERVICE_UNAVAILABLE: {'model': Readiness}},
+)
+async def readiness(
+    request: Request,
+    response: Response,
+    engine: EngineDep,
+    shards: ShardsDep,
+    settings: SettingsDep,
+):
+    """Warmup is done and every pool hands out a working connection in time.
+
+    A pool exhausted for longer than `READINESS_TIMEOUT_SECONDS` also
+    reports unavailable, so the balancer backs off a saturated worker.
+    Replicas are left out: reads fall back to the primary without them.
+    """
+    ready = request.app.state.ready
+    if ready:
+        try:
+            async with asyncio.timeout(settings.READINESS_TIMEOUT_SECONDS):
+                for database in (engine, *shards.engines.values()):
+                    async with database.connect() as conn:
+                        await conn.execute(text('SELECT 1'))
+        except (TimeoutError, SQLAlchemyError):
+            ready = False
+
+    if not ready:
+        response.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+
+    return {
+        'status': 'ready' if ready else 'unavailable',
+        'pool': pool_status(engine),
+    }
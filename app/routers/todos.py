@@ -1,79 +1,459 @@
+import csv
+import io
+from collections.abc import AsyncIterator
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Request
 from fastapi.exceptions import HTTPException
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import Select, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncScalarResult
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
+from app.conditional import collection_validators
 from app.database import get_session
+from app.events import ChangeFeed, get_change_feed
 from app.models import Todo, User
+from app.pagination import next_page, paginate
+from app.replicas import (
+    NamespaceWrites,
+    ReplicaSet,
+    get_replicas,
+    on_replica,
+    read_session,
+)
+from app.response_cache import (
+    CacheEntry,
+    ResponseCache,
+    get_response_cache,
+    todos_namespace,
+)
+from app.responses import FastJSONResponse, as_dict, as_dicts
 from app.schemas import (
     FilterTodo,
+    FilterTodoChanges,
+    FilterTodoExport,
+    FilterTodoFields,
     Message,
+    TodoBatchCreate,
+    TodoBatchDelete,
+    TodoBatchResponse,
+    TodoBatchUpdate,
+    TodoChanges,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
+from app.search import get_todo_search
 from app.security import get_current_user
+from app.sharding import (
+    ShardSet,
+    get_shards,
+    get_todo_session,
+    shard_session,
+)
+from app.stats import todo_stats
+from app.sync import todo_changes
 
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_session)]
+TodoSessionDep = Annotated[AsyncSession, Depends(get_todo_session)]
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
+ReplicasDep = Annotated[ReplicaSet, Depends(get_replicas)]
+ShardsDep = Annotated[ShardSet, Depends(get_shards)]
+NamespaceWritesDep = Annotated[NamespaceWrites, Depends()]
+ResponseCacheDep = Annotated[ResponseCache, Depends(get_response_cache)]
+ChangeFeedDep = Annotated[ChangeFeed, Depends(get_change_feed)]
+
+
+async def get_cache_entry(
+    request: Request, user: CurrentUserDep, response_cache: ResponseCacheDep
+) -> CacheEntry:
+    entry = await response_cache.entry(request, todos_namespace(user.id))
+    await entry.load()
+    return entry
+
+
+CacheEntryDep = Annotated[CacheEntry, Depends(get_cache_entry)]
+
+
+async def get_read_session(
+    replicas: ReplicasDep,
+    shards: ShardsDep,
+    user: CurrentUserDep,
+    primary: AsyncSessionDep,
+    entry: CacheEntryDep,
+):
+    """The user's shard when sharded, otherwise a replica of the primary.
+
+    No replica is opened for a cache hit, which reads nothing.
+    """
+    if entry.cached is not None:
+        yield primary
+        return
+
+    if (engine := shards.engine_for(user.id)) is not None:
+        async with shard_session(engine) as session:
+            yield session
+        return
+
+    async with read_session(
+        replicas, todos_namespace(user.id), primary
+    ) as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
+EXPORT_FIELDS = list(TodoPublic.model_fields)
+EXPORT_BATCH_SIZE = 500
+
+
+class TodoWrites:
+    """Announces committed writes to the current user's todos."""
+
+    def __init__(
+        self,
+        user: CurrentUserDep,
+        writes: NamespaceWritesDep,
+        change_feed: ChangeFeedDep,
+    ):
+        self.namespace = todos_namespace(user.id)
+        self.writes = writes
+        self.change_feed = change_feed
+
+    async def written(self, event: str, payloads: list[dict]) -> None:
+        """Publish `payloads` as `event` once they are committed."""
+        await self.writes.written(self.namespace)
+        for payload in payloads:
+            await self.change_feed.publish(self.namespace, event, payload)
+
+
+TodoWritesDep = Annotated[TodoWrites, Depends()]
+
+
+def filter_todos(
+    session: AsyncSession, user: User, todo_filter: FilterTodoFields
+) -> Select:
+    query = select(Todo).filter(Todo.user_id == user.id)
+
+    search = get_todo_search(session.get_bind().dialect.name)
+    query = search.filter(query, todo_filter.title, todo_filter.description)
+
+    if todo_filter.state:
+        query = query.filter(Todo.state == todo_filter.state)
+
+    return query
+
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=TodoPublic)
 async def create_todo(
     todo: TodoSchema,
-    session: AsyncSessionDep,
+    session: TodoSessionDep,
     current_user: CurrentUserDep,
+    writes: TodoWritesDep,
 ):
-    db_todo = Todo(**todo.model_dump(), user_id=current_user.id)
-    session.add(db_todo)
+    db_todo = await session.scalar(
+        insert(Todo)
+        .values(**todo.model_dump(), user_id=current_user.id)
+        .returning(Todo)
+    )
 
     await session.commit()
-    await session.refresh(db_todo)
+    await writes.written('created', [as_dict(db_todo, TodoPublic)])
 
     return db_todo
 
 
 @router.get('/', response_model=TodoList)
 async def list_todos(
-    session: AsyncSessionDep,
+    request: Request,
+    session: ReadSessionDep,
     user: CurrentUserDep,
+    entry: CacheEntryDep,
     todo_filter: Annotated[FilterTodo, Query()],
 ):
-    query = select(Todo).filter(Todo.user_id == user.id)
+    if entry.cached is not None:
+        return entry.cached
+
+    query = filter_todos(session, user, todo_filter)
 
-    if todo_filter.title:
-        query = query.filter(Todo.title.contains(todo_filter.title))
+    validators = await collection_validators(
+        session, query, Todo.updated_at, user.id
+    )
+    if validators.is_fresh(request):
+        return validators.not_modified()
 
-    if todo_filter.description:
-        query = query.filter(
-            Todo.description.contains(todo_filter.description)
+    if todo_filter.sort == 'rank':
+        search = get_todo_search(session.get_bind().dialect.name)
+        query = query.order_by(
+            search.rank(todo_filter.title, todo_filter.description)
         )
 
-    if todo_filter.state:
-        query = query.filter(Todo.state == todo_filter.state)
+    todos = await session.scalars(paginate(query, Todo.id, todo_filter))
+    todos, next_cursor = next_page(todos.all(), todo_filter)
+
+    if todo_filter.sort == 'rank':
+        next_cursor = None
+
+    return await entry.save(
+        FastJSONResponse(
+            {
+                'todos': as_dicts(todos, TodoPublic),
+                'next_cursor': next_cursor,
+            },
+            headers=validators.headers,
+        ),
+        cacheable=not on_replica(session),
+    )
+
+
+@router.get('/stats', response_model=TodoStats)
+async def read_todo_stats(session: TodoSessionDep, user: CurrentUserDep):
+    return await todo_stats(session, user.id)
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def list_todo_changes(
+    session: ReadSessionDep,
+    user: CurrentUserDep,
+    changes_filter: Annotated[FilterTodoChanges, Query()],
+):
+    """Todos changed or deleted since a version, for delta syncs.
+
+    Pass the returned `version` as `since` on the next call, at once
+    while `has_more` is set. 410 means the sync must restart from 0.
+    """
+    changes = await todo_changes(
+        session, user.id, changes_filter.since, changes_filter.limit
+    )
+    if changes is None:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Changes since then are gone, sync from version 0',
+        )
+
+    return FastJSONResponse(changes)
+
+
+@router.get('/stream', response_class=StreamingResponse)
+async def stream_todo_changes(
+    session: AsyncSessionDep,
+    user: CurrentUserDep,
+    change_feed: ChangeFeedDep,
+    last_event_id: Annotated[str | None, Header()] = None,
+):
+    """Push the user's todo changes as server-sent events.
+
+    Events are `created` and `updated`, carrying the todo, and
+    `deleted`, carrying its id. Reconnecting with `Last-Event-ID`
+    replays the missed events, or sends `reset` when they are gone.
+    """
+    # The stream lasts until the client leaves; authentication is done,
+    # so give the connection back to the pool instead of holding it.
+    await session.close()
+
+    return StreamingResponse(
+        change_feed.stream(todos_namespace(user.id), last_event_id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get('/export')
+async def export_todos(
+    session: TodoSessionDep,
+    user: CurrentUserDep,
+    export_filter: Annotated[FilterTodoExport, Query()],
+):
+    """Stream every matching todo as NDJSON or CSV.
+
+    Rows are read through a server-side cursor in batches of
+    `EXPORT_BATCH_SIZE`, so memory does not grow with the row count.
+    """
+    todos = await session.stream_scalars(
+        filter_todos(session, user, export_filter)
+        .order_by(Todo.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    if export_filter.format == 'csv':
+        return StreamingResponse(
+            csv_lines(todos),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=todos.csv'},
+        )
 
-    todos = await session.scalars(
-        query.offset(todo_filter.offset).limit(todo_filter.limit)
+    return StreamingResponse(
+        ndjson_lines(todos), media_type='application/x-ndjson'
     )
 
-    return {'todos': todos.all()}
+
+async def ndjson_lines(todos: AsyncScalarResult) -> AsyncIterator[bytes]:
+    async for batch in todos.partitions():
+        yield b''.join(
+            to_json(row) + b'\n' for row in as_dicts(batch, TodoPublic)
+        )
+
+
+async def csv_lines(todos: AsyncScalarResult) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    async for batch in todos.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            TodoPublic.model_validate(todo).model_dump(mode='json')
+            for todo in batch
+        )
+        yield buffer.getvalue()
+
+
+@router.post(
+    '/batch', status_code=HTTPStatus.CREATED, response_model=TodoBatchResponse
+)
+async def create_todos_batch(
+    batch: TodoBatchCreate,
+    session: TodoSessionDep,
+    current_user: CurrentUserDep,
+    writes: TodoWritesDep,
+):
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [
+            todo.model_dump() | {'user_id': current_user.id}
+            for todo in batch.todos
+        ],
+    )
+    results = [
+        {'id': db_todo.id, 'status': HTTPStatus.CREATED, 'todo': db_todo}
+        for db_todo in db_todos
+    ]
+
+    await session.commit()
+    await writes.written(
+        'created',
+        [as_dict(result['todo'], TodoPublic) for result in results],
+    )
+
+    return {'results': results}
+
+
+@router.patch('/batch', response_model=TodoBatchResponse)
+async def patch_todos_batch(
+    batch: TodoBatchUpdate,
+    session: TodoSessionDep,
+    current_user: CurrentUserDep,
+    writes: TodoWritesDep,
+):
+    requested = {item.id for item in batch.todos}
+    owned = set(
+        await session.scalars(
+            select(Todo.id).where(
+                Todo.user_id == current_user.id, Todo.id.in_(requested)
+            )
+        )
+    )
+
+    changes = [
+        item.model_dump(exclude_unset=True)
+        for item in batch.todos
+        if item.id in owned and item.model_fields_set - {'id'}
+    ]
+    if changes:
+        await session.execute(update(Todo), changes)
+
+    db_todos = {
+        db_todo.id: db_todo
+        for db_todo in await session.scalars(
+            select(Todo)
+            .where(Todo.id.in_(owned))
+            .execution_options(populate_existing=True)
+        )
+    }
+
+    await session.commit()
+    await writes.written(
+        'updated',
+        [as_dict(db_todos[change['id']], TodoPublic) for change in changes],
+    )
+
+    return {
+        'results': [_batch_result(item.id, db_todos) for item in batch.todos]
+    }
+
+
+@router.delete('/batch', response_model=TodoBatchResponse)
+async def delete_todos_batch(
+    batch: TodoBatchDelete,
+    session: TodoSessionDep,
+    current_user: CurrentUserDep,
+    writes: TodoWritesDep,
+):
+    deleted = set(
+        await session.scalars(
+            delete(Todo)
+            .where(Todo.user_id == current_user.id, Todo.id.in_(batch.ids))
+            .returning(Todo.id)
+        )
+    )
+
+    await session.commit()
+    await writes.written(
+        'deleted',
+        [{'id': todo_id} for todo_id in sorted(deleted)],
+    )
+
+    return {
+        'results': [
+            {'id': todo_id, 'status': HTTPStatus.OK}
+            if todo_id in deleted
+            else _not_found(todo_id)
+            for todo_id in batch.ids
+        ]
+    }
+
+
+def _batch_result(todo_id: int, db_todos: dict[int, Todo]) -> dict:
+    if todo_id not in db_todos:
+        return _not_found(todo_id)
+
+    return {'id': todo_id, 'status': HTTPStatus.OK, 'todo': db_todos[todo_id]}
+
+
+def _not_found(todo_id: int) -> dict:
+    return {
+        'id': todo_id,
+        'status': HTTPStatus.NOT_FOUND,
+        'detail': 'Task not found',
+    }
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
 async def patch_todo(
     todo_id: int,
-    session: AsyncSessionDep,
+    session: TodoSessionDep,
     current_user: CurrentUserDep,
+    writes: TodoWritesDep,
     todo: TodoUpdate,
 ):
+    query = select(Todo)
+
+    # TODO: 'value' can be None. I'll handle it later.
+    if changes := todo.model_dump(exclude_unset=True):
+        query = update(Todo).values(**changes).returning(Todo)
+
     db_todo = await session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id)
+        query.where(Todo.id == todo_id, Todo.user_id == current_user.id),
+        execution_options={'populate_existing': True},
     )
 
     if not db_todo:
@@ -81,13 +461,11 @@ async def patch_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
         )
 
-    for field, value in todo.model_dump(exclude_unset=True).items():
-        # TODO: 'value' can be None. I'll handle it later.
-        setattr(db_todo, field, value)
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
+    await writes.written(
+        'updated',
+        [as_dict(db_todo, TodoPublic)] if changes else [],
+    )
 
     return db_todo
 
@@ -95,19 +473,22 @@ async def patch_todo(
 @router.delete('/{todo_id}', response_model=Message)
 async def delete_todo(
     todo_id: int,
-    session: AsyncSessionDep,
+    session: TodoSessionDep,
     current_user: CurrentUserDep,
+    writes: TodoWritesDep,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id)
+    deleted_id = await session.scalar(
+        delete(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+        .returning(Todo.id)
     )
 
-    if not db_todo:
+    if deleted_id is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found'
         )
 
-    await session.delete(db_todo)
     await session.commit()
+    await writes.written('deleted', [{'id': deleted_id}])
 
     return {'message': 'Task has been deleted successfully'}
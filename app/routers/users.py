@@ -1,14 +1,31 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.exceptions import HTTPException
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
+from app.conditional import Validators, collection_validators
 from app.database import get_session
-from app.models import User
+from app.models import Todo, TodoTombstone, TodoVersion, User
+from app.pagination import next_page, paginate
+from app.replicas import (
+    NamespaceWrites,
+    ReplicaSet,
+    get_replicas,
+    on_replica,
+    read_session,
+)
+from app.response_cache import (
+    USERS_NAMESPACE,
+    CacheEntry,
+    ResponseCache,
+    get_response_cache,
+    todos_namespace,
+)
+from app.responses import FastJSONResponse, as_dict, as_dicts
 from app.schemas import (
     FilterPage,
     Message,
@@ -17,66 +34,194 @@ from app.schemas import (
     UserSchema,
 )
 from app.security import (
+    PasswordHashPool,
+    PrincipalCache,
     get_current_user,
-    get_password_hash,
+    get_password_pool,
+    get_principal_cache,
 )
+from app.sharding import get_todo_session
 
 router = APIRouter(prefix='/users', tags=['users'])
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_session)]
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
+TodoSessionDep = Annotated[AsyncSession, Depends(get_todo_session)]
+ReplicasDep = Annotated[ReplicaSet, Depends(get_replicas)]
+NamespaceWritesDep = Annotated[NamespaceWrites, Depends()]
+ResponseCacheDep = Annotated[ResponseCache, Depends(get_response_cache)]
+PasswordPoolDep = Annotated[PasswordHashPool, Depends(get_password_pool)]
+PrincipalCacheDep = Annotated[PrincipalCache, Depends(get_principal_cache)]
+
+
+class UserWrites:
+    """Hashes new passwords and announces committed writes to users."""
+
+    def __init__(
+        self,
+        passwords: PasswordPoolDep,
+        principals: PrincipalCacheDep,
+        writes: NamespaceWritesDep,
+    ):
+        self.passwords = passwords
+        self.principals = principals
+        self.writes = writes
+
+    async def hash_password(self, password: str) -> str:
+        return await self.passwords.hash(password)
+
+    async def written(
+        self, *namespaces: str, subjects: tuple[str, ...] = ()
+    ) -> None:
+        """Forget the principals of `subjects`, then mark `namespaces`."""
+        if subjects:
+            await self.principals.invalidate(*subjects)
+        await self.writes.written(*namespaces)
+
+
+UserWritesDep = Annotated[UserWrites, Depends()]
+
+
+async def get_cache_entry(
+    request: Request, response_cache: ResponseCacheDep
+) -> CacheEntry:
+    entry = await response_cache.entry(request, USERS_NAMESPACE)
+    await entry.load()
+    return entry
+
+
+CacheEntryDep = Annotated[CacheEntry, Depends(get_cache_entry)]
+
+
+async def get_read_session(
+    replicas: ReplicasDep, primary: AsyncSessionDep, entry: CacheEntryDep
+):
+    if entry.cached is not None:
+        yield primary
+        return
+
+    async with read_session(replicas, USERS_NAMESPACE, primary) as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-async def create_user(user: UserSchema, session: AsyncSessionDep):
-    db_user = await session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
-        )
-    )
+async def create_user(
+    user: UserSchema,
+    session: AsyncSessionDep,
+    writes: UserWritesDep,
+):
+    # Hashing is the expensive part, so duplicates are turned away first.
+    if conflict := await _user_conflict(session, user):
+        raise conflict
 
-    if db_user:
-        if user.username == db_user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Username already exists',
-            )
-        if user.email == db_user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT, detail='Email already exists'
+    password = await writes.hash_password(user.password)
+
+    try:
+        db_user = await session.scalar(
+            insert(User)
+            .values(
+                username=user.username, password=password, email=user.email
             )
+            .returning(User)
+        )
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        conflict = await _user_conflict(session, user)
+        raise conflict or HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Username or Email already exists',
+        ) from exc
 
-    db_user = User(  # pyrefly: ignore
-        username=user.username,
-        password=get_password_hash(user.password),
-        email=user.email,
+    await writes.written(USERS_NAMESPACE)
+
+    return db_user
+
+
+async def _user_conflict(
+    session: AsyncSession, user: UserSchema
+) -> HTTPException | None:
+    """The conflict with an existing user that `user` runs into, if any."""
+    username = await session.scalar(
+        select(User.username).where(
+            (User.username == user.username) | (User.email == user.email)
+        )
     )
 
-    session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
+    if username is None:
+        return None
 
-    return db_user
+    if username == user.username:
+        return HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Username already exists',
+        )
+
+    return HTTPException(
+        status_code=HTTPStatus.CONFLICT, detail='Email already exists'
+    )
 
 
 @router.get('/', response_model=UserList)
 async def read_users(
-    session: AsyncSessionDep,
+    request: Request,
+    session: ReadSessionDep,
+    entry: CacheEntryDep,
     filter_users: Annotated[FilterPage, Query()],
 ):
+    if entry.cached is not None:
+        return entry.cached
+
+    validators = await collection_validators(
+        session, select(User), User.updated_at
+    )
+    if validators.is_fresh(request):
+        return validators.not_modified()
+
     users = await session.scalars(
-        select(User).offset(filter_users.offset).limit(filter_users.limit)
+        paginate(select(User), User.id, filter_users)
+    )
+    users, next_cursor = next_page(users.all(), filter_users)
+
+    return await entry.save(
+        FastJSONResponse(
+            {
+                'users': as_dicts(users, UserPublic),
+                'next_cursor': next_cursor,
+            },
+            headers=validators.headers,
+        ),
+        cacheable=not on_replica(session),
     )
-    return {'users': users.all()}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-async def read_user(user_id: int, session: AsyncSessionDep):
+async def read_user(
+    user_id: int,
+    request: Request,
+    session: ReadSessionDep,
+    entry: CacheEntryDep,
+):
+    if entry.cached is not None:
+        return entry.cached
+
     if not (user := await session.get(User, user_id)):
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
 
-    return user
+    validators = Validators.build(user.updated_at, user.id)
+    if validators.is_fresh(request):
+        return validators.not_modified()
+
+    return await entry.save(
+        FastJSONResponse(
+            as_dict(user, UserPublic), headers=validators.headers
+        ),
+        cacheable=not on_replica(session),
+    )
 
 
 @router.put('/{user_id}', response_model=UserPublic)
@@ -85,37 +230,72 @@ async def update_user(
     user: UserSchema,
     session: AsyncSessionDep,
     current_user: CurrentUserDep,
+    writes: UserWritesDep,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
+    previous_email = current_user.email
+    password = await writes.hash_password(user.password)
+
     try:
-        current_user.username = user.username
-        current_user.password = get_password_hash(user.password)
-        current_user.email = user.email
+        db_user = await session.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                username=user.username, password=password, email=user.email
+            )
+            .returning(User),
+            execution_options={'populate_existing': True},
+        )
         await session.commit()
-        await session.refresh(current_user)
-
-        return current_user
     except IntegrityError as exc:
+        await session.rollback()
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='Username or Email already exists',
         ) from exc
 
+    await writes.written(
+        USERS_NAMESPACE, subjects=(previous_email, user.email)
+    )
+
+    return db_user
+
 
 @router.delete('/{user_id}', response_model=Message)
 async def delete_user(
-    user_id: int, session: AsyncSessionDep, current_user: CurrentUserDep
+    user_id: int,
+    session: AsyncSessionDep,
+    todo_session: TodoSessionDep,
+    current_user: CurrentUserDep,
+    writes: UserWritesDep,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
-    await session.delete(current_user)
+    await todo_session.execute(delete(Todo).where(Todo.user_id == user_id))
+    # Nobody is left to sync the deletions to.
+    await todo_session.execute(
+        delete(TodoTombstone).where(TodoTombstone.user_id == user_id)
+    )
+    await todo_session.execute(
+        delete(TodoVersion).where(TodoVersion.user_id == user_id)
+    )
+    if todo_session is not session:
+        # On a shard: not atomic with the user's deletion, so the todos
+        # go first and a failure never leaves them without a user.
+        await todo_session.commit()
+    await session.execute(delete(User).where(User.id == user_id))
     await session.commit()
+    await writes.written(
+        USERS_NAMESPACE,
+        todos_namespace(user_id),
+        subjects=(current_user.email,),
+    )
 
     return {'message': 'User deleted'}
@@ -1,10 +1,12 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Literal, Self
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 
 from app.models import TodoState
 
+MAX_BATCH_SIZE = 1000
+
 
 class Message(BaseModel):
     message: str
@@ -27,6 +29,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -34,17 +37,52 @@ class Token(BaseModel):
     token_type: str
 
 
+class JWKSet(BaseModel):
+    keys: list[dict]
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+
+class Readiness(BaseModel):
+    status: Literal['ready', 'unavailable']
+    pool: PoolStatus | None
+
+
 class FilterPage(BaseModel):
     offset: Annotated[int, Field(default=0, ge=0)]
     limit: Annotated[int, Field(default=100, ge=1, le=100)]
+    cursor: str | None = None
 
 
-class FilterTodo(FilterPage):
+class FilterTodoFields(BaseModel):
     title: str | None = Field(default=None, min_length=3, max_length=20)
     description: str | None = Field(default=None, min_length=3, max_length=20)
     state: TodoState | None = None
 
 
+class FilterTodo(FilterPage, FilterTodoFields):
+    sort: Literal['id', 'rank'] = 'id'
+
+    @model_validator(mode='after')
+    def check_rank_sort(self) -> Self:
+        if self.sort != 'rank':
+            return self
+        if self.cursor is not None:
+            raise ValueError('cursor pagination requires sort=id')
+        if not (self.title or self.description):
+            raise ValueError('sort=rank requires a title or description')
+        return self
+
+
+class FilterTodoExport(FilterTodoFields):
+    format: Literal['ndjson', 'csv'] = 'ndjson'
+
+
 class TodoSchema(BaseModel):
     title: str
     description: str
@@ -53,15 +91,76 @@ class TodoSchema(BaseModel):
 
 class TodoPublic(TodoSchema):
     id: int
+    model_config = ConfigDict(from_attributes=True)
     created_at: datetime
     updated_at: datetime
 
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class FilterTodoChanges(BaseModel):
+    since: int | datetime = 0
+    limit: Annotated[int, Field(default=100, ge=1, le=MAX_BATCH_SIZE)]
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[int]
+    version: int
+    has_more: bool
+
+
+class TodoStats(BaseModel):
+    total: int
+    states: dict[TodoState, int]
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+    @model_validator(mode='after')
+    def check_not_null(self) -> Self:
+        if nulls := [
+            field
+            for field in self.model_fields_set
+            if getattr(self, field) is None
+        ]:
+            raise ValueError(f'{", ".join(sorted(nulls))} cannot be null')
+        return self
+
+
+class TodoBatchCreate(BaseModel):
+    todos: Annotated[
+        list[TodoSchema], Field(min_length=1, max_length=MAX_BATCH_SIZE)
+    ]
+
+
+class TodoBatchUpdate(BaseModel):
+    todos: Annotated[
+        list[TodoBatchUpdateItem],
+        Field(min_length=1, max_length=MAX_BATCH_SIZE),
+    ]
+
+
+class TodoBatchDelete(BaseModel):
+    ids: Annotated[list[int], Field(min_length=1, max_length=MAX_BATCH_SIZE)]
+
+
+class TodoBatchResult(BaseModel):
+    id: int
+    status: int
+    todo: TodoPublic | None = None
+    detail: str | None = None
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
@@ -0,0 +1,195 @@
+from abc import ABC, abstractmethod
+from functools import reduce
+from typing import cast, override
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    Table,
+    column,
+    func,
+    inspect,
+    literal_column,
+    table,
+)
+
+from app.models import Todo, register_ddl
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+# Inlined rather than bound so queries match the GIN index expressions.
+TS_CONFIG = literal_column("'simple'")
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description,
+        content='todos', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description ON todos
+    BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    CREATE INDEX ix_todos_title_tsv ON todos
+    USING gin (to_tsvector('simple', title))
+    """,
+    """
+    CREATE INDEX ix_todos_description_tsv ON todos
+    USING gin (to_tsvector('simple', description))
+    """,
+)
+
+todos = cast(Table, inspect(Todo, raiseerr=True).local_table)
+register_ddl(todos, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+register_ddl(
+    todos,
+    sqlite=['DROP TABLE IF EXISTS todos_fts'],
+    when='before_drop',
+)
+
+
+class TodoSearch(ABC):
+    """Strategy that turns the text filters of `FilterTodo` into SQL."""
+
+    @abstractmethod
+    def filter(
+        self, query: Select, title: str | None, description: str | None
+    ) -> Select:
+        """Restrict `query` to todos matching the text filters."""
+
+    @abstractmethod
+    def rank(
+        self, title: str | None, description: str | None
+    ) -> ColumnElement:
+        """Ordering expression that puts the best matches first."""
+
+
+class LikeTodoSearch(TodoSearch):
+    """Substring search with `LIKE`, used when no index-backed mode exists."""
+
+    @override
+    def filter(
+        self, query: Select, title: str | None, description: str | None
+    ) -> Select:
+        if title:
+            query = query.where(Todo.title.contains(title))
+
+        if description:
+            query = query.where(Todo.description.contains(description))
+
+        return query
+
+    @override
+    def rank(
+        self, title: str | None, description: str | None
+    ) -> ColumnElement:
+        return Todo.id.expression
+
+
+class SQLiteTodoSearch(TodoSearch):
+    """FTS5 search over the `todos_fts` trigram index.
+
+    The trigram tokenizer matches any substring of three or more
+    characters, so results are the same as the `LIKE` filters.
+    """
+
+    @override
+    def filter(
+        self, query: Select, title: str | None, description: str | None
+    ) -> Select:
+        terms = [
+            f'{name} : {self._phrase(value)}'
+            for name, value in (('title', title), ('description', description))
+            if value
+        ]
+
+        if not terms:
+            return query
+
+        return query.join(todos_fts, todos_fts.c.rowid == Todo.id).where(
+            column('todos_fts').op('MATCH')(' AND '.join(terms))
+        )
+
+    @override
+    def rank(
+        self, title: str | None, description: str | None
+    ) -> ColumnElement:
+        return todos_fts.c.rank
+
+    @staticmethod
+    def _phrase(value: str) -> str:
+        return '"{}"'.format(value.replace('"', '""'))
+
+
+class PostgresTodoSearch(TodoSearch):
+    """`tsvector` search backed by the GIN expression indexes.
+
+    Every word of the filter is matched as a prefix.
+    """
+
+    @override
+    def filter(
+        self, query: Select, title: str | None, description: str | None
+    ) -> Select:
+        for document, tsquery in self._matches(title, description):
+            query = query.where(document.bool_op('@@')(tsquery))
+
+        return query
+
+    @override
+    def rank(
+        self, title: str | None, description: str | None
+    ) -> ColumnElement:
+        ranks = [
+            func.ts_rank(document, tsquery)
+            for document, tsquery in self._matches(title, description)
+        ]
+        return -reduce(lambda total, rank: total + rank, ranks)
+
+    @staticmethod
+    def _matches(title: str | None, description: str | None):
+        for target, value in (
+            (Todo.title, title),
+            (Todo.description, description),
+        ):
+            if value:
+                words = ''.join(c if c.isalnum() else ' ' for c in value)
+                yield (
+                    func.to_tsvector(TS_CONFIG, target),
+                    func.to_tsquery(
+                        TS_CONFIG, ' & '.join(f'{w}:*' for w in words.split())
+                    ),
+                )
+
+
+SEARCH_BACKENDS: dict[str, TodoSearch] = {
+    'sqlite': SQLiteTodoSearch(),
+    'postgresql': PostgresTodoSearch(),
+}
+
+
+def get_todo_search(dialect_name: str) -> TodoSearch:
+    """Pick the search backend for the dialect, falling back to `LIKE`."""
+    return SEARCH_BACKENDS.get(dialect_name, LikeTodoSearch())
@@ -1,20 +1,31 @@
+import asyncio
+import json
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from typing import Annotated
 from zoneinfo import ZoneInfo
 
 from fastapi import Depends, HTTPException
+from fastapi.requests import HTTPConnection
 from fastapi.security.oauth2 import OAuth2PasswordBearer
-from jwt import DecodeError, ExpiredSignatureError, decode, encode
+from jwt import InvalidTokenError
 from pwdlib import PasswordHash
-from sqlalchemy import select
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.cache import CacheBackend, create_cache
 from app.database import get_session
+from app.metrics import counter, gauge
 from app.models import User
-from app.settings import settings
+from app.settings import Settings
+from app.tokens import TokenKeys, TokenVerifier, get_token_verifier
 
-pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl='auth/token', refreshUrl='auth/refresh_token'
 )
@@ -22,10 +33,84 @@ oauth2_scheme = OAuth2PasswordBearer(
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
 AsyncSessionDep = Annotated[AsyncSession, Depends(get_session)]
 
+principal_cache_hits = counter(
+    'principal_cache_hits_total', 'Authenticated users served from cache.'
+)
+principal_cache_misses = counter(
+    'principal_cache_misses_total', 'Authenticated users loaded from the DB.'
+)
+password_hash_queue = gauge(
+    'password_hash_queue_depth', 'argon2 jobs running or waiting for a thread.'
+)
+
+PRINCIPAL_FIELDS = ('id', 'username', 'email', 'created_at', 'updated_at')
+PRINCIPAL_DATES = ('created_at', 'updated_at')
+
+
+class PrincipalCache:
+    """Authenticated users by token subject, for `ttl` seconds."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def store(self, user: User) -> None:
+        """Store the public columns of `user` under its token subject.
+
+        The password hash is left out so it never reaches a shared cache.
+        """
+        snapshot = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        for field in PRINCIPAL_DATES:
+            snapshot[field] = snapshot[field].isoformat()
+
+        await self.backend.set(
+            user.email, json.dumps(snapshot).encode(), self.ttl
+        )
+
+    async def load(self, session: AsyncSession, subject: str) -> User | None:
+        """Rebuild the cached user for `subject` inside `session`."""
+        if not (cached := await self.backend.get(subject)):
+            principal_cache_misses.inc()
+            return None
+
+        principal_cache_hits.inc()
+        snapshot = json.loads(cached)
+        for field in PRINCIPAL_DATES:
+            snapshot[field] = datetime.fromisoformat(snapshot[field])
+
+        user = inspect(User, raiseerr=True).class_manager.new_instance()
+        for field, value in snapshot.items():
+            set_committed_value(user, field, value)
+        make_transient_to_detached(user)
+
+        return await session.merge(user, load=False)
+
+    async def invalidate(self, *subjects: str) -> None:
+        await self.backend.delete(*subjects)
+
+
+def create_principal_cache(settings: Settings) -> PrincipalCache:
+    return PrincipalCache(
+        create_cache(
+            settings.PRINCIPAL_CACHE_BACKEND,
+            max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+            redis_url=settings.REDIS_URL,
+            prefix='principal:',
+        ),
+        ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    )
+
+
+def get_principal_cache(connection: HTTPConnection) -> PrincipalCache:
+    """The principal cache built by `create_app`."""
+    return connection.app.state.principal_cache
+
 
 async def get_current_user(
     session: AsyncSessionDep,
     token: TokenDep,
+    verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
+    principals: Annotated[PrincipalCache, Depends(get_principal_cache)],
 ):
     credentials_exception = HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
@@ -34,18 +119,15 @@ async def get_current_user(
     )
 
     try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-
-        if not (subject_email := payload.get('sub')):
-            raise credentials_exception
-
-    except DecodeError as exc:
+        payload = await verifier.verify(token)
+    except InvalidTokenError as exc:
         raise credentials_exception from exc
 
-    except ExpiredSignatureError as exc:
-        raise credentials_exception from exc
+    if not (subject_email := payload.get('sub')):
+        raise credentials_exception
+
+    if user := await principals.load(session, subject_email):
+        return user
 
     if not (
         user := await session.scalar(
@@ -54,30 +136,115 @@ async def get_current_user(
     ):
         raise credentials_exception
 
+    await principals.store(user)
+
     return user
 
 
-def create_access_token(data: dict) -> str:
-    to_encode = data.copy()
-    expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    )
-    to_encode.update({'exp': expire})
-    return encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+class TokenIssuer:
+    """Signs access tokens valid for `expire_minutes`."""
+
+    def __init__(self, keys: TokenKeys, expire_minutes: int):
+        self.keys = keys
+        self.expire_minutes = expire_minutes
+
+    def create_access_token(self, data: dict) -> str:
+        to_encode = data.copy()
+        expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
+            minutes=self.expire_minutes
+        )
+        to_encode.update({'exp': expire})
+        return self.keys.encode(to_encode)
+
+
+def create_token_issuer(settings: Settings, keys: TokenKeys) -> TokenIssuer:
+    return TokenIssuer(keys, settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
 
+def get_token_issuer(connection: HTTPConnection) -> TokenIssuer:
+    """The token issuer built by `create_app`."""
+    return connection.app.state.token_issuer
+
+
+class PasswordHashPool:
+    """Runs argon2 off the event loop on a fixed set of threads.
+
+    Jobs beyond `queue_limit` (running plus waiting) are rejected with
+    503 so a login storm cannot grow an unbounded backlog. By default one
+    core is left free for the event loop.
+    """
+
+    def __init__(
+        self, context: PasswordHash, workers: int | None, queue_limit: int
+    ):
+        self.context = context
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or max(1, (os.cpu_count() or 1) - 1),
+            thread_name_prefix='argon2',
+        )
+
+    async def run[T](self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.queue_limit:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Server is busy, try again later',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        password_hash_queue.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            password_hash_queue.dec()
+
+    async def hash(self, password: str) -> str:
+        return await self.run(self.context.hash, password)
+
+    async def verify(self, password: str, pwd_hash: str) -> bool:
+        """Verify the password against the hash.
+
+        Raises:
+            HTTPException: 503 when the hashing queue is full.
+        """
+        return await self.run(self.context.verify, password, pwd_hash)
+
+
+def create_password_hash(settings: Settings) -> PasswordHash:
+    return PasswordHash((
+        Argon2Hasher(
+            time_cost=settings.ARGON2_TIME_COST,
+            memory_cost=settings.ARGON2_MEMORY_COST,
+            parallelism=settings.ARGON2_PARALLELISM,
+        ),
+    ))
+
+
+def create_password_pool(settings: Settings) -> PasswordHashPool:
+    return PasswordHashPool(
+        create_password_hash(settings),
+        workers=settings.PASSWORD_HASH_WORKERS,
+        queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+    )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
 
+def get_password_pool(connection: HTTPConnection) -> PasswordHashPool:
+    """The password hashing pool built by `create_app`."""
+    return connection.app.state.password_pool
 
-def verify_password(password: str, pwd_hash: str) -> bool:
-    """Verify the password against the hash.
 
-    Args:
-        password (str): The plain password to verify.
-        pwd_hash (str): The hash of the password.
+async def warm_up_auth(
+    passwords: PasswordHashPool, tokens: TokenIssuer
+) -> None:
+    """Hash, verify and sign once, so the first login pays no setup.
 
-    Returns:
-        bool: True if the password is valid, False otherwise.
+    Starts an argon2 thread and loads the signing and verifying keys
+    into the crypto backend.
     """
-    return pwd_context.verify(password, pwd_hash)
+    pwd_hash = await passwords.hash('warm-up')
+    await passwords.verify('warm-up', pwd_hash)
+    tokens.keys.decode(tokens.create_access_token({'sub': 'warm-up'}))
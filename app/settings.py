@@ -1,13 +1,58 @@
+from typing import Literal
+
+from fastapi.requests import HTTPConnection
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    LOGFIRE_TOKEN: str
+    LOGFIRE_TOKEN: str | None = None
+    TELEMETRY_MODE: Literal['off', 'sampled', 'full'] = 'off'
+    TELEMETRY_SAMPLE_RATE: float = 0.1
     DATABASE_LOWER_LIMIT: int = 1
     DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_POOL_WARM_CONNECTIONS: int = 2
+    DATABASE_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_SHARDS: dict[str, str] = {}
+    REPLICA_STICKINESS_SECONDS: float = 5
+    REPLICA_STICKINESS_BACKEND: Literal['none', 'memory', 'redis'] = 'memory'
+    REPLICA_EJECTION_SECONDS: float = 30
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = False
+    SQLITE_JOURNAL_MODE: str = 'WAL'
+    SQLITE_SYNCHRONOUS: str = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    JWT_PRIVATE_KEY_FILE: str | None = None
+    JWT_PUBLIC_KEY_FILE: str | None = None
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+    REDIS_URL: str | None = None
+    PRINCIPAL_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'none'
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'none'
+    RESPONSE_CACHE_TTL_SECONDS: float = 30
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CHANGE_FEED_BACKEND: Literal['memory', 'redis'] = 'memory'
+    CHANGE_FEED_LOG_SIZE: int = 1000
+    CHANGE_FEED_KEEPALIVE_SECONDS: float = 15
+    TOMBSTONE_RETENTION_DAYS: int = 30
+    METRICS_MULTIPROC_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 1
+    STARTUP_WARMUP: bool = True
+    READINESS_TIMEOUT_SECONDS: float = 1
 
     model_config = SettingsConfigDict(
         env_file='.env', env_file_encoding='utf-8', extra='ignore'
@@ -15,3 +60,8 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+
+def get_settings(connection: HTTPConnection) -> Settings:
+    """The settings the application was built with."""
+    return connection.app.state.settings
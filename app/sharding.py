@@ -0,0 +1,248 @@
+"""Horizontal sharding of todos by `user_id` over `DATABASE_SHARDS`.
+
+Migrate every database, then move the todos of users whose shard
+changed:
+
+    python -m app.sharding migrate upgrade head
+    python -m app.sharding rebalance
+"""
+
+import argparse
+import asyncio
+from bisect import bisect
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from hashlib import blake2b
+from typing import Annotated
+
+from alembic import command
+from alembic.config import Config
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database import (
+    create_engine,
+    each_database,
+    get_session,
+    warm_pool,
+)
+from app.models import Todo, TodoTombstone, TodoVersion, User
+from app.security import get_current_user
+from app.settings import Settings, settings
+
+VIRTUAL_NODES = 64
+MOVE_COLUMNS = (
+    'title',
+    'description',
+    'state',
+    'user_id',
+    'created_at',
+    'updated_at',
+)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest())
+
+
+class HashRing:
+    """Consistent hash ring with `VIRTUAL_NODES` points per shard."""
+
+    def __init__(self, names: list[str], virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (_hash(f'{name}#{index}'), name)
+            for name in names
+            for index in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.names = [name for _, name in points]
+
+    def node(self, user_id: int) -> str:
+        index = bisect(self.hashes, _hash(str(user_id))) % len(self.hashes)
+        return self.names[index]
+
+
+class ShardSet:
+    """Named shard engines and the ring that spreads users over them."""
+
+    def __init__(self, engines: Mapping[str, AsyncEngine]):
+        self.engines = dict(engines)
+        self.ring = HashRing(list(self.engines)) if self.engines else None
+
+    def name_for(self, user_id: int) -> str | None:
+        return self.ring.node(user_id) if self.ring else None
+
+    def engine_for(self, user_id: int) -> AsyncEngine | None:
+        """Engine holding the todos of `user_id`; None when unsharded."""
+        name = self.name_for(user_id)
+        return self.engines[name] if name else None
+
+    async def warm(self, connections: int) -> None:
+        for engine in self.engines.values():
+            await warm_pool(engine, connections)
+
+    async def dispose(self) -> None:
+        for engine in self.engines.values():
+            await engine.dispose()
+
+
+def create_shards(settings: Settings) -> ShardSet:
+    return ShardSet({
+        name: create_engine(
+            settings.model_copy(update={'DATABASE_URL': url}), f'shard-{name}'
+        )
+        for name, url in settings.DATABASE_SHARDS.items()
+    })
+
+
+def get_shards(connection: HTTPConnection) -> ShardSet:
+    """The shards opened by the application lifespan."""
+    return connection.app.state.shards
+
+
+@asynccontextmanager
+async def shard_session(engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_todo_session(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user: Annotated[User, Depends(get_current_user)],
+    shards: Annotated[ShardSet, Depends(get_shards)],
+):
+    """Session on the shard holding the current user's todos."""
+    if (engine := shards.engine_for(user.id)) is None:
+        yield session
+        return
+
+    async with shard_session(engine) as todo_session:
+        yield todo_session
+
+
+async def move_user(
+    source: AsyncEngine, target: AsyncEngine, user_id: int
+) -> int:
+    """Copy the todos of `user_id` to `target`, then delete them.
+
+    Rows get new ids on `target`, since each shard numbers its own, so
+    the user's sync horizon moves past the copies and delta syncs start
+    over. The copy is committed before the delete, so an interrupted
+    move leaves duplicates on `target` rather than losing rows.
+    """
+    columns = [getattr(Todo, column) for column in MOVE_COLUMNS]
+    owned = TodoVersion.user_id == user_id
+    async with AsyncSession(source) as source_session:
+        rows = (
+            await source_session.execute(
+                select(*columns)
+                .where(Todo.user_id == user_id)
+                .order_by(Todo.id)
+            )
+        ).all()
+        if not rows:
+            return 0
+        version = await source_session.scalar(
+            select(TodoVersion.version).where(owned)
+        )
+
+        async with AsyncSession(target) as target_session:
+            # Keep handing out versions above the ones clients have seen.
+            version = max(
+                version or 0,
+                await target_session.scalar(
+                    select(TodoVersion.version).where(owned)
+                )
+                or 0,
+            )
+            await target_session.execute(delete(TodoVersion).where(owned))
+            await target_session.execute(
+                insert(TodoVersion).values(user_id=user_id, version=version)
+            )
+            await target_session.execute(
+                insert(Todo), [row._asdict() for row in rows]
+            )
+            await target_session.execute(
+                update(TodoVersion)
+                .where(owned)
+                .values(
+                    horizon_version=TodoVersion.version, horizon_at=func.now()
+                )
+            )
+            await target_session.commit()
+
+        for model in (Todo, TodoTombstone, TodoVersion):
+            await source_session.execute(
+                delete(model).where(model.user_id == user_id)
+            )
+        await source_session.commit()
+
+    return len(rows)
+
+
+async def rebalance(primary: AsyncEngine, shards: ShardSet) -> dict[int, int]:
+    """Move every user's todos to the shard the ring now assigns.
+
+    The primary is scanned too, for todos written before sharding was
+    enabled. Returns the number of rows moved per user.
+    """
+    locations = {'primary': primary, **shards.engines}
+    moved = {}
+    for name, engine in locations.items():
+        async with AsyncSession(engine) as session:
+            user_ids = list(
+                await session.scalars(select(Todo.user_id).distinct())
+            )
+
+        for user_id in user_ids:
+            home = shards.name_for(user_id) or 'primary'
+            if home != name:
+                moved[user_id] = await move_user(
+                    engine, locations[home], user_id
+                )
+    return moved
+
+
+def migrate(settings: Settings, *alembic_args: str) -> None:
+    """Run an Alembic command against the primary and every shard."""
+    for name, database_settings in each_database(settings):
+        print(f'{name}:')
+        config = Config('alembic.ini')
+        config.attributes['database_url'] = database_settings.DATABASE_URL
+        config.attributes['shard'] = name != 'primary'
+        command_name, *arguments = alembic_args
+        getattr(command, command_name)(config, *arguments)
+
+
+async def rebalance_main(settings: Settings) -> None:  # pragma: no cover
+    primary = create_engine(settings)
+    shards = create_shards(settings)
+    try:
+        moved = await rebalance(primary, shards)
+    finally:
+        await shards.dispose()
+        await primary.dispose()
+
+    for user_id, rows in moved.items():
+        print(f'user {user_id}: moved {rows} todos')
+    print(f'Moved {sum(moved.values())} todos of {len(moved)} users')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Manage the todo shards.')
+    subcommands = parser.add_subparsers(dest='action', required=True)
+    migrate_parser = subcommands.add_parser(
+        'migrate', help='run an alembic command on every database'
+    )
+    migrate_parser.add_argument('alembic_args', nargs='+')
+    subcommands.add_parser(
+        'rebalance', help="move todos to their user's shard"
+    )
+    args = parser.parse_args()
+
+    if args.action == 'migrate':
+        migrate(settings, *args.alembic_args)
+    else:
+        asyncio.run(rebalance_main(settings))
@@ -0,0 +1,157 @@
+"""Per-user todo counts by state, maintained by database triggers.
+
+Every write path (single, batch, `delete_user`) goes through the
+triggers, so handlers stay single statements. Rebuild the counters
+from `todos`, on the primary and every shard, with:
+
+    python -m app.stats
+"""
+
+import asyncio
+from typing import cast
+
+from sqlalchemy import (
+    CursorResult,
+    Table,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import create_engine, each_database
+from app.models import Todo, TodoState, TodoStateCount, register_ddl
+from app.schemas import TodoStats
+from app.settings import settings
+
+SQLITE_DDL = (
+    """
+    CREATE TRIGGER todo_state_counts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_state_counts_ad AFTER DELETE ON todos BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        DELETE FROM todo_state_counts
+        WHERE user_id = old.user_id AND state = old.state AND count = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_state_counts_au AFTER UPDATE OF user_id, state
+    ON todos WHEN old.user_id != new.user_id OR old.state != new.state
+    BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        DELETE FROM todo_state_counts
+        WHERE user_id = old.user_id AND state = old.state AND count = 0;
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    CREATE FUNCTION todo_state_counts_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE todo_state_counts SET count = count - 1
+            WHERE user_id = OLD.user_id AND state = OLD.state;
+            DELETE FROM todo_state_counts
+            WHERE user_id = OLD.user_id AND state = OLD.state
+                AND count = 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO todo_state_counts (user_id, state, count)
+            VALUES (NEW.user_id, NEW.state, 1)
+            ON CONFLICT (user_id, state)
+            DO UPDATE SET count = todo_state_counts.count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER todo_state_counts_aid AFTER INSERT OR DELETE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_state_counts_sync()
+    """,
+    """
+    CREATE TRIGGER todo_state_counts_au AFTER UPDATE OF user_id, state
+    ON todos FOR EACH ROW
+    WHEN (OLD.user_id, OLD.state) IS DISTINCT FROM (NEW.user_id, NEW.state)
+    EXECUTE FUNCTION todo_state_counts_sync()
+    """,
+)
+
+todos = cast(Table, inspect(Todo, raiseerr=True).local_table)
+register_ddl(todos, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+register_ddl(
+    todos,
+    postgresql=['DROP FUNCTION IF EXISTS todo_state_counts_sync()'],
+    when='after_drop',
+)
+
+
+async def todo_stats(session: AsyncSession, user_id: int) -> TodoStats:
+    """Read a user's counters; states without todos count as zero."""
+    counts = dict(
+        (
+            await session.execute(
+                select(TodoStateCount.state, TodoStateCount.count).where(
+                    TodoStateCount.user_id == user_id
+                )
+            )
+        ).all()
+    )
+    states = {state: counts.get(state, 0) for state in TodoState}
+
+    return TodoStats(total=sum(states.values()), states=states)
+
+
+async def rebuild_todo_stats(session: AsyncSession) -> int:
+    """Recount every user's todos, discarding drifted counters.
+
+    Returns:
+        int: How many counter rows were written.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        # Hold off writers so their triggers cannot race the recount.
+        await session.execute(text('LOCK TABLE todos IN SHARE MODE'))
+
+    await session.execute(delete(TodoStateCount))
+    result = cast(
+        CursorResult,
+        await session.execute(
+            insert(TodoStateCount).from_select(
+                ['user_id', 'state', 'count'],
+                select(Todo.user_id, Todo.state, func.count()).group_by(
+                    Todo.user_id, Todo.state
+                ),
+            )
+        ),
+    )
+    await session.commit()
+
+    return result.rowcount
+
+
+async def main():  # pragma: no cover
+    for name, database_settings in each_database(settings):
+        engine = create_engine(database_settings, name)
+        async with AsyncSession(engine) as session:
+            rows = await rebuild_todo_stats(session)
+
+        await engine.dispose()
+        print(f'{name}: rebuilt {rows} todo state counters')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    asyncio.run(main())
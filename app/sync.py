@@ -0,0 +1,265 @@
+"""Delta sync of todos, versioned per user by database triggers.
+
+Prune expired tombstones on the primary and every shard with:
+
+    python -m app.sync
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import cast
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    CursorResult,
+    Table,
+    delete,
+    false,
+    func,
+    inspect,
+    literal,
+    null,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import create_engine, each_database
+from app.models import Todo, TodoTombstone, TodoVersion, register_ddl
+from app.settings import settings
+
+SQLITE_NEXT_VERSION = """
+    INSERT INTO todo_versions (user_id, version, horizon_version)
+    VALUES ({user}.user_id, 1, 0)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+"""
+
+SQLITE_DDL = (
+    f"""
+    CREATE TRIGGER todo_versions_ai AFTER INSERT ON todos BEGIN
+        {SQLITE_NEXT_VERSION.format(user='new')}
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER todo_versions_au AFTER UPDATE ON todos
+    WHEN new.version = old.version BEGIN
+        {SQLITE_NEXT_VERSION.format(user='new')}
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos BEGIN
+        {SQLITE_NEXT_VERSION.format(user='old')}
+        INSERT INTO todo_tombstones (user_id, id, version, deleted_at)
+        SELECT old.user_id, old.id, version,
+            STRFTIME('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+        FROM todo_versions WHERE user_id = old.user_id
+        ON CONFLICT (user_id, id) DO UPDATE SET
+            version = excluded.version, deleted_at = excluded.deleted_at;
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    CREATE FUNCTION todo_versions_next(owner integer) RETURNS bigint AS $$
+    DECLARE
+        next_version bigint;
+    BEGIN
+        INSERT INTO todo_versions (user_id, version, horizon_version)
+        VALUES (owner, 1, 0)
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1
+        RETURNING version INTO next_version;
+        RETURN next_version;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION todo_versions_stamp() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := todo_versions_next(NEW.user_id);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION todo_tombstones_record() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO todo_tombstones (user_id, id, version, deleted_at)
+        VALUES (OLD.user_id, OLD.id, todo_versions_next(OLD.user_id), now())
+        ON CONFLICT (user_id, id) DO UPDATE SET
+            version = EXCLUDED.version, deleted_at = EXCLUDED.deleted_at;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER todo_versions_biu BEFORE INSERT OR UPDATE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_versions_stamp()
+    """,
+    """
+    CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_tombstones_record()
+    """,
+)
+
+todos = cast(Table, inspect(Todo, raiseerr=True).local_table)
+register_ddl(todos, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+register_ddl(
+    todos,
+    postgresql=[
+        'DROP FUNCTION IF EXISTS todo_versions_stamp(), '
+        'todo_tombstones_record(), todo_versions_next(integer)'
+    ],
+    when='after_drop',
+)
+
+CHANGE_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'state',
+    'created_at',
+    'updated_at',
+)
+
+
+async def todo_changes(
+    session: AsyncSession, user_id: int, since: int | datetime, limit: int
+) -> dict | None:
+    """Todos changed and deleted after `since`, in version order.
+
+    `since` is a version, or a timestamp for clients that have none
+    yet; the returned `version` is where the next sync starts. Returns
+    None when `since` is behind the user's horizon.
+    """
+    sync_state = (
+        await session.execute(
+            select(
+                TodoVersion.version,
+                TodoVersion.horizon_version,
+                TodoVersion.horizon_at,
+            ).where(TodoVersion.user_id == user_id)
+        )
+    ).first()
+    current, horizon_version, horizon_at = sync_state or (0, 0, None)
+
+    if isinstance(since, datetime):
+        if since.tzinfo is not None:  # stored naive, in UTC
+            since = since.astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
+        if horizon_at is not None and since < horizon_at:
+            return None
+        changed = Todo.updated_at > since
+        deleted = TodoTombstone.deleted_at > since
+    else:
+        if 0 < since < horizon_version:
+            return None
+        changed = Todo.version > since
+        deleted = TodoTombstone.version > since
+
+    # Versions up to `current` are committed: the row lock that hands
+    # them out is held by each writer until it commits.
+    changes = (
+        (
+            await session.execute(
+                union_all(
+                    select(
+                        *(getattr(Todo, column) for column in CHANGE_COLUMNS),
+                        Todo.version,
+                        false().label('deleted'),
+                    ).where(
+                        Todo.user_id == user_id,
+                        changed,
+                        Todo.version <= current,
+                    ),
+                    select(
+                        TodoTombstone.id,
+                        *(null() for _ in CHANGE_COLUMNS[1:]),
+                        TodoTombstone.version,
+                        literal(True).label('deleted'),
+                    ).where(
+                        TodoTombstone.user_id == user_id,
+                        deleted,
+                        TodoTombstone.version <= current,
+                    ),
+                )
+                .order_by('version')
+                .limit(limit + 1)
+            )
+        )
+        .mappings()
+        .all()
+    )
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return {
+        'todos': [
+            {column: row[column] for column in CHANGE_COLUMNS}
+            for row in changes
+            if not row['deleted']
+        ],
+        'deleted': [row['id'] for row in changes if row['deleted']],
+        'version': changes[-1]['version'] if has_more else current,
+        'has_more': has_more,
+    }
+
+
+async def prune_tombstones(session: AsyncSession, older_than: datetime) -> int:
+    """Drop the tombstones deleted before `older_than`.
+
+    The horizon of their users moves past them first, so a sync that
+    would have needed them is told to start over instead.
+
+    Returns:
+        int: How many tombstones were dropped.
+    """
+    expired = (TodoTombstone.user_id == TodoVersion.user_id) & (
+        TodoTombstone.deleted_at < older_than
+    )
+    await session.execute(
+        update(TodoVersion)
+        .where(select(TodoTombstone.id).where(expired).exists())
+        .values(
+            horizon_version=select(func.max(TodoTombstone.version))
+            .where(expired)
+            .scalar_subquery(),
+            horizon_at=select(func.max(TodoTombstone.deleted_at))
+            .where(expired)
+            .scalar_subquery(),
+        )
+    )
+    result = cast(
+        CursorResult,
+        await session.execute(
+            delete(TodoTombstone).where(TodoTombstone.deleted_at < older_than)
+        ),
+    )
+    await session.commit()
+
+    return result.rowcount
+
+
+async def main():  # pragma: no cover
+    older_than = datetime.now(tz=ZoneInfo('UTC')).replace(
+        tzinfo=None
+    ) - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    for name, database_settings in each_database(settings):
+        engine = create_engine(database_settings, name)
+        async with AsyncSession(engine) as session:
+            rows = await prune_tombstones(session, older_than)
+
+        await engine.dispose()
+        print(f'{name}: pruned {rows} todo tombstones')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    asyncio.run(main())
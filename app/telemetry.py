@@ -0,0 +1,47 @@
+"""Optional export of traces to Logfire.
+
+`logfire` and the OpenTelemetry stack behind it are only imported when
+`TELEMETRY_MODE` is not `off`, so workers and test sessions that do
+not trace skip their import and configuration cost. Logfire's pydantic
+plugin is loaded by pydantic itself, before any setting is read; set
+`PYDANTIC_DISABLE_PLUGINS=logfire-plugin` in the environment to skip
+it as well.
+"""
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.settings import Settings
+
+
+def configure_telemetry(app: FastAPI, settings: Settings) -> None:
+    """Trace `app` as `settings.TELEMETRY_MODE` asks.
+
+    `sampled` keeps a `TELEMETRY_SAMPLE_RATE` share of the traces,
+    decided once at their root span, so every kept trace is complete.
+    """
+    if settings.TELEMETRY_MODE == 'off':
+        return
+
+    import logfire  # noqa: PLC0415
+
+    sampling = None
+    if settings.TELEMETRY_MODE == 'sampled':
+        sampling = logfire.SamplingOptions(head=settings.TELEMETRY_SAMPLE_RATE)
+
+    logfire.configure(
+        token=settings.LOGFIRE_TOKEN,
+        send_to_logfire='if-token-present',
+        sampling=sampling,
+    )
+    logfire.instrument_fastapi(app)
+
+
+def instrument_engine(engine: AsyncEngine, settings: Settings) -> None:
+    """Trace the statements of `engine`, once telemetry is configured."""
+    if settings.TELEMETRY_MODE == 'off':
+        return
+
+    import logfire  # noqa: PLC0415
+
+    logfire.instrument_sqlalchemy(engine)
@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from time import time
+from typing import Any
+
+from fastapi.requests import HTTPConnection
+from jwt import decode, encode, get_algorithm_by_name
+
+from app.cache import CacheBackend, MemoryCache
+from app.metrics import counter
+from app.settings import Settings
+
+token_cache_hits = counter(
+    'token_cache_hits_total', 'Access tokens whose verification was cached.'
+)
+token_cache_misses = counter(
+    'token_cache_misses_total', 'Access tokens verified cryptographically.'
+)
+
+# RFC 7638 members hashed into a key thumbprint, per key type.
+THUMBPRINT_MEMBERS = {
+    'RSA': ('e', 'kty', 'n'),
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+}
+
+
+@dataclass(frozen=True)
+class TokenKeys:
+    """Key objects for one JWT algorithm, parsed once.
+
+    HMAC algorithms sign and verify with `SECRET_KEY`. Asymmetric ones
+    (RS256, ES256, EdDSA...) sign with the private key and publish the
+    public key through `jwks`, so other services can verify our tokens
+    offline. They need the `crypto` extra.
+    """
+
+    algorithm: str
+    signing_key: Any
+    verifying_key: Any
+    kid: str | None = None
+
+    @classmethod
+    def load(
+        cls,
+        algorithm: str,
+        secret_key: str,
+        private_key_file: str | None = None,
+        public_key_file: str | None = None,
+    ) -> 'TokenKeys':
+        """Parse the keys `algorithm` needs.
+
+        Raises:
+            ValueError: If an asymmetric algorithm has no private key.
+            NotImplementedError: If `cryptography` is not installed.
+        """
+        jwt_algorithm = get_algorithm_by_name(algorithm)
+
+        if algorithm.startswith('HS'):
+            key = jwt_algorithm.prepare_key(secret_key)
+            return cls(algorithm=algorithm, signing_key=key, verifying_key=key)
+
+        if private_key_file is None:
+            raise ValueError(f'{algorithm} needs JWT_PRIVATE_KEY_FILE')
+
+        private_key = jwt_algorithm.prepare_key(
+            Path(private_key_file).read_bytes()
+        )
+        public_key = (
+            jwt_algorithm.prepare_key(Path(public_key_file).read_bytes())
+            if public_key_file
+            else private_key.public_key()
+        )
+        jwk = jwt_algorithm.to_jwk(public_key, as_dict=True)
+
+        return cls(
+            algorithm=algorithm,
+            signing_key=private_key,
+            verifying_key=public_key,
+            kid=_thumbprint(jwk),
+        )
+
+    @property
+    def jwks(self) -> dict:
+        """The public keys as a JWK Set; empty for shared secrets."""
+        if self.kid is None:
+            return {'keys': []}
+
+        jwk = get_algorithm_by_name(self.algorithm).to_jwk(
+            self.verifying_key, as_dict=True
+        )
+        jwk.update(kid=self.kid, alg=self.algorithm, use='sig')
+        return {'keys': [jwk]}
+
+    def encode(self, claims: dict) -> str:
+        headers = {'kid': self.kid} if self.kid else None
+        return encode(
+            claims, self.signing_key, algorithm=self.algorithm, headers=headers
+        )
+
+    def decode(self, token: str) -> dict:
+        return decode(token, self.verifying_key, algorithms=[self.algorithm])
+
+
+def _thumbprint(jwk: dict) -> str:
+    members = {name: jwk[name] for name in THUMBPRINT_MEMBERS[jwk['kty']]}
+    canonical = json.dumps(members, separators=(',', ':'), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+class TokenVerifier:
+    """Verifies access tokens, remembering the ones already checked.
+
+    Entries are keyed by the SHA-256 of the whole token, signature
+    included, and expire with the token's `exp` claim. The cache is
+    always local to the worker: verified claims must not be shared.
+    """
+
+    def __init__(self, keys: TokenKeys, cache: CacheBackend):
+        self.keys = keys
+        self.cache = cache
+
+    async def verify(self, token: str) -> dict:
+        """Return the claims of a valid token.
+
+        Raises:
+            jwt.InvalidTokenError: If the token is malformed, forged
+                or expired.
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+
+        if cached := await self.cache.get(key):
+            token_cache_hits.inc()
+            return json.loads(cached)
+
+        token_cache_misses.inc()
+        claims = self.keys.decode(token)
+
+        if (ttl := claims.get('exp', 0) - time()) > 0:
+            await self.cache.set(key, json.dumps(claims).encode(), ttl)
+
+        return claims
+
+
+def create_token_keys(settings: Settings) -> TokenKeys:
+    return TokenKeys.load(
+        settings.ALGORITHM,
+        settings.SECRET_KEY,
+        settings.JWT_PRIVATE_KEY_FILE,
+        settings.JWT_PUBLIC_KEY_FILE,
+    )
+
+
+def create_token_verifier(
+    settings: Settings, keys: TokenKeys
+) -> TokenVerifier:
+    return TokenVerifier(keys, MemoryCache(settings.TOKEN_CACHE_MAX_ENTRIES))
+
+
+def get_token_keys(connection: HTTPConnection) -> TokenKeys:
+    """The signing keys built by `create_app`."""
+    return connection.app.state.token_keys
+
+
+def get_token_verifier(connection: HTTPConnection) -> TokenVerifier:
+    """The token verifier built by `create_app`."""
+    return connection.app.state.token_verifier
@@ -0,0 +1,157 @@
+"""Per-request cost of authenticating a bearer token.
+
+For each algorithm, compares verifying from the raw key material
+(the previous behaviour), with preloaded key objects, and through
+the verified-token cache; then times the whole `get_current_user`
+dependency with warm caches. RS256/EdDSA need the `crypto` extra.
+
+Usage:
+    python -m benchmarks.auth --repeat 2000
+"""
+
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+from statistics import median
+from time import perf_counter, time
+
+from jwt import decode, encode
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import MemoryCache
+from app.security import (
+    create_principal_cache,
+    create_token_issuer,
+    get_current_user,
+)
+from app.settings import settings
+from app.tokens import (
+    TokenKeys,
+    TokenVerifier,
+    create_token_keys,
+    create_token_verifier,
+)
+from benchmarks.client import create_user
+from benchmarks.database import temporary_engine
+
+
+def write_private_key(algorithm: str, tmp: Path) -> str | None:
+    """Generate a PEM key for asymmetric algorithms, as deployed."""
+    if algorithm.startswith('HS'):
+        return None
+
+    from cryptography.hazmat.primitives import serialization  # noqa: PLC0415
+    from cryptography.hazmat.primitives.asymmetric import (  # noqa: PLC0415
+        ed25519,
+        rsa,
+    )
+
+    if algorithm == 'RS256':
+        key = rsa.generate_private_key(65537, 2048)
+    else:
+        key = ed25519.Ed25519PrivateKey.generate()
+
+    path = tmp / f'{algorithm}.pem'
+    path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return str(path)
+
+
+def raw_keys(keys: TokenKeys, private_key_file: str | None) -> tuple:
+    """Signing and verifying keys as stored, before any parsing."""
+    if private_key_file is None:
+        return settings.SECRET_KEY, settings.SECRET_KEY
+
+    from cryptography.hazmat.primitives import serialization  # noqa: PLC0415
+
+    return Path(
+        private_key_file
+    ).read_bytes(), keys.verifying_key.public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+
+
+async def micros(call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = call()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append(perf_counter() - start)
+    return median(timings) * 1_000_000
+
+
+async def compare_algorithm(algorithm: str, tmp: Path, repeat: int):
+    private_key_file = write_private_key(algorithm, tmp)
+    keys = TokenKeys.load(algorithm, settings.SECRET_KEY, private_key_file)
+    signing, verifying = raw_keys(keys, private_key_file)
+    verifier = TokenVerifier(keys, MemoryCache(max_entries=10))
+    claims = {'sub': 'bench@bench.com', 'exp': int(time()) + 3600}
+    token = keys.encode(claims)
+    await verifier.verify(token)
+
+    rows = {
+        'encode, raw key': lambda: encode(claims, signing, algorithm),
+        'encode, preloaded': lambda: keys.encode(claims),
+        'verify, raw key': lambda: decode(
+            token, verifying, algorithms=[algorithm]
+        ),
+        'verify, preloaded': lambda: keys.decode(token),
+        'verify, cached': lambda: verifier.verify(token),
+    }
+    for name, call in rows.items():
+        print(f'{algorithm:>6} {name:>20} {await micros(call, repeat):>10.1f}')
+
+
+async def time_dependency(repeat: int):
+    async with temporary_engine() as engine:
+        user = await create_user(engine, 'bench')
+        keys = create_token_keys(settings)
+        token = create_token_issuer(settings, keys).create_access_token({
+            'sub': user.email
+        })
+        verifier = create_token_verifier(settings, keys)
+        principals = create_principal_cache(
+            settings.model_copy(update={'PRINCIPAL_CACHE_BACKEND': 'memory'})
+        )
+
+        async def authenticate():
+            await get_current_user(session, token, verifier, principals)
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            await authenticate()
+            dependency = await micros(authenticate, repeat)
+
+    print(
+        f'{settings.ALGORITHM:>6} {"get_current_user":>20} {dependency:>10.1f}'
+    )
+
+
+async def main(repeat: int):
+    print(f'median of {repeat} runs')
+    print(f'{"alg":>6} {"step":>20} {"us":>10}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for algorithm in ('HS256', 'RS256', 'EdDSA'):
+            try:
+                await compare_algorithm(algorithm, Path(tmp), repeat)
+            except (ImportError, NotImplementedError):
+                print(f'{algorithm:>6} skipped: install the crypto extra')
+
+    await time_dependency(repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.repeat))
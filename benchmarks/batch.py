@@ -0,0 +1,94 @@
+"""Compare per-item todo endpoints with the batch endpoints.
+
+Usage:
+    python -m benchmarks.batch --items 1000
+"""
+
+import argparse
+import asyncio
+from time import perf_counter
+
+from httpx import AsyncClient
+
+from benchmarks.client import api_client, create_user, login
+from benchmarks.database import temporary_engine
+
+
+def payload(i: int) -> dict:
+    return {'title': f'Todo {i}', 'description': 'bench', 'state': 'todo'}
+
+
+async def per_item(client: AsyncClient, headers: dict, items: int):
+    ids = []
+    for i in range(items):
+        response = await client.post(
+            '/todos/', headers=headers, json=payload(i)
+        )
+        ids.append(response.json()['id'])
+    yield 'create'
+
+    for todo_id in ids:
+        await client.patch(
+            f'/todos/{todo_id}', headers=headers, json={'state': 'done'}
+        )
+    yield 'update'
+
+    for todo_id in ids:
+        await client.delete(f'/todos/{todo_id}', headers=headers)
+    yield 'delete'
+
+
+async def batched(client: AsyncClient, headers: dict, items: int):
+    response = await client.post(
+        '/todos/batch',
+        headers=headers,
+        json={'todos': [payload(i) for i in range(items)]},
+    )
+    ids = [result['id'] for result in response.json()['results']]
+    yield 'create'
+
+    await client.patch(
+        '/todos/batch',
+        headers=headers,
+        json={'todos': [{'id': i, 'state': 'done'} for i in ids]},
+    )
+    yield 'update'
+
+    await client.request(
+        'DELETE', '/todos/batch', headers=headers, json={'ids': ids}
+    )
+    yield 'delete'
+
+
+async def timed(steps) -> dict[str, float]:
+    timings = {}
+    start = perf_counter()
+    async for step in steps:
+        timings[step] = (perf_counter() - start) * 1000
+        start = perf_counter()
+    return timings
+
+
+async def main(items: int):
+    async with temporary_engine() as engine:
+        user = await create_user(engine, 'batch')
+        async with api_client(engine) as client:
+            headers = await login(client, user)
+            single = await timed(per_item(client, headers, items))
+            batch = await timed(batched(client, headers, items))
+
+    print(f'{items} items')
+    print(f'{"step":>7} {"per-item ms":>12} {"batch ms":>10} {"speedup":>8}')
+    for step in ('create', 'update', 'delete'):
+        print(
+            f'{step:>7} {single[step]:>12.1f} {batch[step]:>10.1f} '
+            f'{single[step] / batch[step]:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.items))
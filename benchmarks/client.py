@@ -0,0 +1,150 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
+from httpx import (
+    AsyncBaseTransport,
+    AsyncByteStream,
+    AsyncClient,
+    Request,
+    Response,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.database import get_engine, get_session
+from app.main import app
+from app.models import User
+from app.replicas import ReplicaSet, get_replicas
+from app.sharding import ShardSet, get_shards
+
+
+class StreamingBody(AsyncByteStream):
+    """Body chunks as the app sends them; closing disconnects."""
+
+    def __init__(self, chunks: asyncio.Queue, gone: asyncio.Event, task):
+        self.chunks = chunks
+        self.gone = gone
+        self.task = task
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while (chunk := await self.chunks.get()) is not None:
+            yield chunk
+
+    async def aclose(self) -> None:
+        self.gone.set()
+        with suppress(asyncio.CancelledError):
+            await self.task
+
+
+class StreamingASGITransport(AsyncBaseTransport):
+    """In-process transport that returns once the response has started.
+
+    httpx's `ASGITransport` waits for the whole body, which never comes
+    for `/todos/stream`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def handle_async_request(self, request: Request) -> Response:
+        body = await request.aread()
+        chunks = asyncio.Queue()
+        gone = asyncio.Event()
+        started = asyncio.get_running_loop().create_future()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': body}
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                started.set_result(message)
+            elif message['type'] == 'http.response.body':
+                if message.get('body'):
+                    await chunks.put(message['body'])
+                if not message.get('more_body'):
+                    await chunks.put(None)
+
+        scope = {
+            'type': 'http',
+            # 2.3 makes Starlette watch for the disconnect while streaming.
+            'asgi': {'version': '3.0', 'spec_version': '2.3'},
+            'http_version': '1.1',
+            'method': request.method,
+            'headers': [(k.lower(), v) for k, v in request.headers.raw],
+            'scheme': request.url.scheme,
+            'path': request.url.path,
+            'raw_path': request.url.raw_path.split(b'?')[0],
+            'query_string': request.url.query,
+            'server': (request.url.host, request.url.port),
+            'client': ('127.0.0.1', 123),
+            'root_path': '',
+        }
+        task = asyncio.create_task(self.app(scope, receive, send))
+        await asyncio.wait(
+            {task, started}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not started.done():
+            task.result()  # raises what the app raised
+
+        start = started.result()
+        return Response(
+            start['status'],
+            headers=start.get('headers', []),
+            stream=StreamingBody(chunks, gone, task),
+        )
+
+
+@asynccontextmanager
+async def api_client(engine: AsyncEngine) -> AsyncIterator[AsyncClient]:
+    """In-process client for the app, with sessions bound to `engine`."""
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_replicas] = lambda: ReplicaSet(
+        engine, [], 0, app.state.recent_writes
+    )
+    app.dependency_overrides[get_shards] = lambda: ShardSet({})
+    # The lifespan does not run, so stand in for what it would open.
+    app.dependency_overrides[get_engine] = lambda: engine
+    app.state.ready = True
+    try:
+        async with AsyncClient(
+            transport=StreamingASGITransport(app), base_url='http://bench'
+        ) as client:
+            yield client
+    finally:
+        app.state.ready = False
+        app.dependency_overrides.clear()
+
+
+async def create_user(
+    engine: AsyncEngine, username: str, password: str = 'secret'
+) -> User:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            username=username,
+            email=f'{username}@bench.com',
+            password=app.state.password_pool.context.hash(password),
+        )
+        session.add(user)
+        await session.commit()
+        return user
+
+
+async def login(
+    client: AsyncClient, user: User, password: str = 'secret'
+) -> dict:
+    """Return the Authorization header for `user`."""
+    response = await client.post(
+        '/auth/token', data={'username': user.email, 'password': password}
+    )
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
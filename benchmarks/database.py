@@ -0,0 +1,71 @@
+import random
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+
+import app.search  # noqa: F401  (registers the search index DDL)
+from app.models import Todo, TodoState, User, table_registry
+
+WORDS = (
+    'buy milk walk dog call mom pay rent fix bike read book write report '
+    'clean house plan trip cook dinner water plants review code'
+).split()
+
+
+@asynccontextmanager
+async def temporary_engine() -> AsyncIterator[AsyncEngine]:
+    """Engine for a throwaway SQLite file with the full schema."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.create_all)
+
+        yield engine
+
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def temporary_session() -> AsyncIterator[AsyncSession]:
+    async with (
+        temporary_engine() as engine,
+        AsyncSession(engine, expire_on_commit=False) as session,
+    ):
+        yield session
+
+
+async def seed_todos(
+    session: AsyncSession, rows: int, batch_size: int = 50_000
+) -> int:
+    """Insert one user owning `rows` todos and return the user id."""
+    rng = random.Random(0)
+    user = User(username='bench', password='bench', email='bench@bench.com')
+    session.add(user)
+    await session.flush()
+    user_id = user.id
+
+    for start in range(0, rows, batch_size):
+        await session.execute(
+            insert(Todo),
+            [
+                {
+                    'user_id': user_id,
+                    'title': f'{" ".join(rng.choices(WORDS, k=3))} #{i}',
+                    'description': ' '.join(rng.choices(WORDS, k=8)),
+                    'state': rng.choice(list(TodoState)),
+                }
+                for i in range(start, min(start + batch_size, rows))
+            ],
+        )
+    await session.commit()
+    return user_id
@@ -0,0 +1,75 @@
+"""Peak memory of the streaming todo export at increasing row counts.
+
+`buffered` loads every row before serialising, as a single page of
+`list_todos` does; `streamed` is the `/todos/export` path.
+
+Usage:
+    python -m benchmarks.export --rows 10000 100000
+"""
+
+import argparse
+import asyncio
+import tracemalloc
+from time import perf_counter
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Todo
+from app.routers.todos import EXPORT_BATCH_SIZE, ndjson_lines
+from app.schemas import TodoPublic
+from benchmarks.database import seed_todos, temporary_engine
+
+
+async def buffered(session: AsyncSession) -> int:
+    todos = (await session.scalars(select(Todo).order_by(Todo.id))).all()
+    body = ''.join(
+        TodoPublic.model_validate(todo).model_dump_json() + '\n'
+        for todo in todos
+    )
+    return len(body)
+
+
+async def streamed(session: AsyncSession) -> int:
+    todos = await session.stream_scalars(
+        select(Todo)
+        .order_by(Todo.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    return sum([len(chunk) async for chunk in ndjson_lines(todos)])
+
+
+async def measure(engine, export) -> tuple[float, float]:
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        start = perf_counter()
+        await export(session)
+        elapsed = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+
+async def main(row_counts: list[int]):
+    print(f'{"rows":>8} {"mode":>9} {"peak MiB":>9} {"seconds":>8}')
+    for rows in row_counts:
+        async with temporary_engine() as engine:
+            async with AsyncSession(engine) as session:
+                await seed_todos(session, rows)
+
+            for export in (buffered, streamed):
+                peak, elapsed = await measure(engine, export)
+                print(
+                    f'{rows:>8} {export.__name__:>9} '
+                    f'{peak:>9.1f} {elapsed:>8.2f}'
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows))
@@ -0,0 +1,519 @@
+"""Drive every endpoint with concurrent clients and record latencies.
+
+Users and todos are seeded through the API from `UserFactory` and
+`TodoFactory` payloads. Then `--concurrency` clients, each logged in as
+one of the seeded users, send a weighted mix of requests for
+`--duration` seconds. Throughput and p50/p95/p99 latency per endpoint
+are printed and, with `--output`, saved as JSON along with the commit.
+Pass `--baseline` to compare against an earlier run; the exit status
+is 1 when some endpoint's p95 regressed beyond `--tolerance`.
+
+By default the app runs in-process on a throwaway SQLite database;
+`--url` targets a running server instead.
+
+Usage:
+    python -m benchmarks.load --users 20 --todos 50 --concurrency 16 \\
+        --duration 30 --output before.json
+    python -m benchmarks.load --baseline before.json --output after.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+
+import factory.random
+from httpx import AsyncClient, Response
+
+from app.models import TodoState
+from benchmarks.client import api_client
+from benchmarks.database import temporary_engine
+from tests.conftest import TodoFactory, UserFactory
+
+BATCH_SIZE = 10
+
+
+@dataclass
+class VirtualUser:
+    id: int
+    email: str
+    username: str
+    password: str
+    headers: dict = field(default_factory=dict)
+    todo_ids: list[int] = field(default_factory=list)
+    words: list[str] = field(default_factory=list)
+    sync_version: int = 0
+
+
+class Recorder:
+    """Collects the latency of every request, keyed by route."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request: Awaitable[Response]) -> Response:
+        start = perf_counter()
+        response = await request
+        self.latencies[name].append((perf_counter() - start) * 1000)
+        if response.is_error:
+            self.errors[name] += 1
+        return response
+
+
+def user_payload() -> dict:
+    user = UserFactory.build()
+    return {
+        'username': user.username,
+        'email': user.email,
+        'password': user.password,
+    }
+
+
+def todo_payload() -> dict:
+    todo = TodoFactory.build()
+    return {
+        'title': todo.title,
+        'description': todo.description,
+        'state': TodoState(todo.state).value,
+    }
+
+
+async def login(client: AsyncClient, user: VirtualUser) -> Response:
+    response = await client.post(
+        '/auth/token', data={'username': user.email, 'password': user.password}
+    )
+    user.headers = {
+        'Authorization': f'Bearer {response.json()["access_token"]}'
+    }
+    return response
+
+
+async def seed(
+    client: AsyncClient, users: int, todos: int
+) -> list[VirtualUser]:
+    """Create `users` users owning `todos` todos each, via the API."""
+
+    async def seed_user() -> VirtualUser:
+        payload = user_payload()
+        created = (await client.post('/users/', json=payload)).json()
+        user = VirtualUser(id=created['id'], **payload)
+        await login(client, user)
+
+        for start in range(0, todos, 1000):
+            batch = [todo_payload() for _ in range(min(1000, todos - start))]
+            results = (
+                await client.post(
+                    '/todos/batch', headers=user.headers, json={'todos': batch}
+                )
+            ).json()['results']
+            user.todo_ids += [result['id'] for result in results]
+            user.words += [
+                word
+                for todo in batch
+                for word in re.findall(r'[a-z]{3,20}', todo['title'].lower())
+            ]
+
+        return user
+
+    return list(await asyncio.gather(*(seed_user() for _ in range(users))))
+
+
+type Operation = Callable[
+    [AsyncClient, Recorder, VirtualUser, list[VirtualUser], random.Random],
+    Awaitable[None],
+]
+
+
+async def read_root(client, recorder, user, population, rng):
+    await recorder.call('GET /', client.get('/'))
+
+
+async def read_users(client, recorder, user, population, rng):
+    params = {'limit': 20, 'offset': rng.randrange(len(population))}
+    await recorder.call('GET /users/', client.get('/users/', params=params))
+
+
+async def read_user(client, recorder, user, population, rng):
+    other = rng.choice(population)
+    await recorder.call('GET /users/{id}', client.get(f'/users/{other.id}'))
+
+
+async def update_user(client, recorder, user, population, rng):
+    payload = {
+        'username': user.username,
+        'email': user.email,
+        'password': user.password,
+    }
+    await recorder.call(
+        'PUT /users/{id}',
+        client.put(f'/users/{user.id}', headers=user.headers, json=payload),
+    )
+
+
+async def user_lifecycle(client, recorder, user, population, rng):
+    payload = user_payload()
+    created = await recorder.call(
+        'POST /users/', client.post('/users/', json=payload)
+    )
+    throwaway = VirtualUser(id=created.json()['id'], **payload)
+    await recorder.call('POST /auth/token', login(client, throwaway))
+    await recorder.call(
+        'DELETE /users/{id}',
+        client.delete(f'/users/{throwaway.id}', headers=throwaway.headers),
+    )
+
+
+async def relogin(client, recorder, user, population, rng):
+    await recorder.call('POST /auth/token', login(client, user))
+
+
+async def refresh_token(client, recorder, user, population, rng):
+    await recorder.call(
+        'POST /auth/refresh_token',
+        client.post('/auth/refresh_token', headers=user.headers),
+    )
+
+
+async def read_jwks(client, recorder, user, population, rng):
+    await recorder.call('GET /auth/jwks', client.get('/auth/jwks'))
+
+
+async def list_todos(client, recorder, user, population, rng):
+    params = rng.choice([
+        {'limit': 20},
+        {'limit': 20, 'state': rng.choice(list(TodoState)).value},
+        {'limit': 20, 'title': rng.choice(user.words or ['xyz'])},
+        {
+            'limit': 20,
+            'title': rng.choice(user.words or ['xyz']),
+            'sort': 'rank',
+        },
+    ])
+    await recorder.call(
+        'GET /todos/',
+        client.get('/todos/', headers=user.headers, params=params),
+    )
+
+
+async def read_stats(client, recorder, user, population, rng):
+    await recorder.call(
+        'GET /todos/stats', client.get('/todos/stats', headers=user.headers)
+    )
+
+
+async def sync_todos(client, recorder, user, population, rng):
+    response = await recorder.call(
+        'GET /todos/changes',
+        client.get(
+            '/todos/changes',
+            headers=user.headers,
+            params={'since': user.sync_version},
+        ),
+    )
+    if response.is_success:
+        user.sync_version = response.json()['version']
+    else:
+        user.sync_version = 0
+
+
+async def stream_todos(client, recorder, user, population, rng):
+    async def open_stream() -> Response:
+        response = await client.send(
+            client.build_request('GET', '/todos/stream', headers=user.headers),
+            stream=True,
+        )
+        try:
+            await anext(response.aiter_raw())  # the `retry:` preamble
+        finally:
+            await response.aclose()
+        return response
+
+    await recorder.call('GET /todos/stream', open_stream())
+
+
+async def export_todos(client, recorder, user, population, rng):
+    await recorder.call(
+        'GET /todos/export',
+        client.get('/todos/export', headers=user.headers),
+    )
+
+
+async def create_todo(client, recorder, user, population, rng):
+    response = await recorder.call(
+        'POST /todos/',
+        client.post('/todos/', headers=user.headers, json=todo_payload()),
+    )
+    if response.is_success:
+        user.todo_ids.append(response.json()['id'])
+
+
+async def patch_todo(client, recorder, user, population, rng):
+    if not user.todo_ids:
+        return await create_todo(client, recorder, user, population, rng)
+
+    todo_id = rng.choice(user.todo_ids)
+    await recorder.call(
+        'PATCH /todos/{id}',
+        client.patch(
+            f'/todos/{todo_id}',
+            headers=user.headers,
+            json={'state': rng.choice(list(TodoState)).value},
+        ),
+    )
+
+
+async def delete_todo(client, recorder, user, population, rng):
+    if not user.todo_ids:
+        return await create_todo(client, recorder, user, population, rng)
+
+    todo_id = user.todo_ids.pop(rng.randrange(len(user.todo_ids)))
+    await recorder.call(
+        'DELETE /todos/{id}',
+        client.delete(f'/todos/{todo_id}', headers=user.headers),
+    )
+
+
+async def batch_lifecycle(client, recorder, user, population, rng):
+    created = await recorder.call(
+        'POST /todos/batch',
+        client.post(
+            '/todos/batch',
+            headers=user.headers,
+            json={'todos': [todo_payload() for _ in range(BATCH_SIZE)]},
+        ),
+    )
+    ids = [result['id'] for result in created.json()['results']]
+    await recorder.call(
+        'PATCH /todos/batch',
+        client.patch(
+            '/todos/batch',
+            headers=user.headers,
+            json={'todos': [{'id': i, 'state': 'done'} for i in ids]},
+        ),
+    )
+    await recorder.call(
+        'DELETE /todos/batch',
+        client.request(
+            'DELETE', '/todos/batch', headers=user.headers, json={'ids': ids}
+        ),
+    )
+
+
+async def probe_health(client, recorder, user, population, rng):
+    await recorder.call('GET /health/live', client.get('/health/live'))
+    await recorder.call('GET /health/ready', client.get('/health/ready'))
+
+
+async def scrape_metrics(client, recorder, user, population, rng):
+    await recorder.call('GET /metrics', client.get('/metrics'))
+
+
+# Read-heavy, like the dashboards; argon2-bound calls are kept rare.
+OPERATIONS: dict[Operation, int] = {
+    read_root: 5,
+    read_users: 8,
+    read_user: 10,
+    update_user: 1,
+    user_lifecycle: 1,
+    relogin: 1,
+    refresh_token: 5,
+    read_jwks: 2,
+    list_todos: 30,
+    read_stats: 10,
+    sync_todos: 10,
+    stream_todos: 2,
+    export_todos: 3,
+    create_todo: 8,
+    patch_todo: 8,
+    delete_todo: 6,
+    batch_lifecycle: 2,
+    probe_health: 2,
+    scrape_metrics: 1,
+}
+
+
+async def drive(  # noqa: PLR0913, PLR0917
+    client: AsyncClient,
+    recorder: Recorder,
+    user: VirtualUser,
+    population: list[VirtualUser],
+    rng: random.Random,
+    deadline: float,
+):
+    operations, weights = list(OPERATIONS), list(OPERATIONS.values())
+    while perf_counter() < deadline:
+        (operation,) = rng.choices(operations, weights)
+        await operation(client, recorder, user, population, rng)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    def stats(latencies: list[float], errors: int) -> dict:
+        ordered = sorted(latencies)
+        return {
+            'requests': len(ordered),
+            'errors': errors,
+            'throughput': len(ordered) / elapsed,
+            'p50_ms': percentile(ordered, 0.50),
+            'p95_ms': percentile(ordered, 0.95),
+            'p99_ms': percentile(ordered, 0.99),
+        }
+
+    endpoints = {
+        name: stats(latencies, recorder.errors[name])
+        for name, latencies in sorted(recorder.latencies.items())
+    }
+    every = [
+        ms for latencies in recorder.latencies.values() for ms in latencies
+    ]
+
+    return {
+        'total': stats(every, sum(recorder.errors.values())),
+        'endpoints': endpoints,
+    }
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    commit = subprocess.run(
+        ['git', 'rev-parse', 'HEAD'],  # noqa: S607
+        capture_output=True,
+        text=True,
+        check=False,
+    ).stdout.strip()
+
+    return {
+        'commit': commit or None,
+        'started_at': datetime.now(UTC).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': {
+            name: getattr(args, name)
+            for name in ('users', 'todos', 'concurrency', 'duration', 'seed')
+        }
+        | {'url': args.url or 'in-process'},
+    }
+
+
+def print_results(results: dict):
+    print(
+        f'{"endpoint":<26} {"reqs":>7} {"err":>5} {"req/s":>8} '
+        f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}'
+    )
+    rows = {**results['endpoints'], 'TOTAL': results['total']}
+    for name, row in rows.items():
+        print(
+            f'{name:<26} {row["requests"]:>7} {row["errors"]:>5} '
+            f'{row["throughput"]:>8.1f} {row["p50_ms"]:>8.2f} '
+            f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f}'
+        )
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """Print p95 and throughput changes; return the regressed endpoints."""
+    print(f'\nagainst {baseline["meta"]["commit"] or "baseline"}')
+    print(
+        f'{"endpoint":<26} {"p95 before":>10} {"p95 after":>10} {"change":>8}'
+    )
+    regressed = []
+    rows = {**results['endpoints'], 'TOTAL': results['total']}
+    before_rows = {**baseline['endpoints'], 'TOTAL': baseline['total']}
+    for name, row in rows.items():
+        if not (before := before_rows.get(name)):
+            continue
+        change = row['p95_ms'] / before['p95_ms'] - 1
+        flag = ''
+        if change > tolerance:
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print(
+            f'{name:<26} {before["p95_ms"]:>10.2f} {row["p95_ms"]:>10.2f} '
+            f'{change:>+8.1%}{flag}'
+        )
+    return regressed
+
+
+@asynccontextmanager
+async def target(url: str | None) -> AsyncIterator[AsyncClient]:
+    if url:
+        async with AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+
+    async with temporary_engine() as engine, api_client(engine) as client:
+        yield client
+
+
+async def run(args: argparse.Namespace) -> dict:
+    factory.random.reseed_random(args.seed)
+    meta = metadata(args)
+
+    async with target(args.url) as client:
+        population = await seed(client, args.users, args.todos)
+        recorder = Recorder()
+
+        start = perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(
+                drive(
+                    client,
+                    recorder,
+                    population[worker % len(population)],
+                    population,
+                    random.Random(args.seed + worker),
+                    deadline,
+                )
+                for worker in range(args.concurrency)
+            )
+        )
+        elapsed = perf_counter() - start
+
+    return {'meta': meta, **summarize(recorder, elapsed)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--todos', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='running server; default in-process')
+    parser.add_argument('--output', type=Path, help='write results as JSON')
+    parser.add_argument('--baseline', type=Path, help='earlier JSON results')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if compare(baseline, results, args.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
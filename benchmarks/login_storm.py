@@ -0,0 +1,99 @@
+"""Latency of an unrelated endpoint while a burst of logins is hashed.
+
+`inline` hashes on the event loop (the previous behaviour), `pool`
+uses the bounded argon2 thread pool.
+
+Usage:
+    python -m benchmarks.login_storm --logins 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+from typing import override
+
+from httpx import AsyncClient
+
+from app.main import app
+from app.security import PasswordHashPool
+from benchmarks.client import api_client, create_user
+from benchmarks.database import temporary_engine
+
+
+class InlinePool(PasswordHashPool):
+    @override
+    async def run(self, func, *args):
+        return func(*args)
+
+
+async def login_storm(client: AsyncClient, logins: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with slots:
+            await client.post(
+                '/auth/token',
+                data={'username': 'storm@bench.com', 'password': 'secret'},
+            )
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def probe(client: AsyncClient, done: asyncio.Event) -> list[float]:
+    """Call `GET /` on a fixed schedule.
+
+    Latency is measured from the scheduled start, so time spent waiting
+    for a blocked event loop is counted too.
+    """
+    interval = 0.01
+    latencies = []
+    scheduled = perf_counter()
+    while not done.is_set():
+        await asyncio.sleep(max(0, scheduled - perf_counter()))
+        await client.get('/')
+        latencies.append((perf_counter() - scheduled) * 1000)
+        scheduled += interval
+    return latencies
+
+
+async def run(mode: str, logins: int, concurrency: int):
+    original_pool = app.state.password_pool
+    if mode == 'inline':
+        app.state.password_pool = InlinePool(original_pool.context, 1, logins)
+
+    try:
+        async with temporary_engine() as engine:
+            await create_user(engine, 'storm')
+
+            async with api_client(engine) as client:
+                done = asyncio.Event()
+                probing = asyncio.create_task(probe(client, done))
+                start = perf_counter()
+                await login_storm(client, logins, concurrency)
+                elapsed = perf_counter() - start
+                done.set()
+                latencies = await probing
+    finally:
+        app.state.password_pool = original_pool
+
+    cuts = quantiles(latencies, n=100)
+    print(
+        f'{mode:>7} {logins / elapsed:>11.1f} '
+        f'{cuts[49]:>9.2f} {cuts[98]:>9.2f}'
+    )
+
+
+async def main(logins: int, concurrency: int):
+    print(f'{"mode":>7} {"logins/s":>11} {"GET / p50":>9} {"p99 ms":>9}')
+    for mode in ('inline', 'pool'):
+        await run(mode, logins, concurrency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.concurrency))
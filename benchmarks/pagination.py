@@ -0,0 +1,60 @@
+"""Compare offset and keyset pagination latency at increasing page depth.
+
+Usage:
+    python -m benchmarks.pagination --rows 100000 --limit 10
+"""
+
+import argparse
+import asyncio
+from statistics import median
+from time import perf_counter
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Todo
+from app.pagination import encode_cursor, paginate
+from app.schemas import FilterPage
+from benchmarks.database import seed_todos, temporary_session
+
+
+async def time_page(
+    session: AsyncSession, user_id: int, page: FilterPage, repeat: int
+) -> float:
+    query = select(Todo).where(Todo.user_id == user_id)
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        (await session.scalars(paginate(query, Todo.id, page))).all()
+        timings.append(perf_counter() - start)
+        session.expunge_all()
+    return median(timings) * 1000
+
+
+async def main(rows: int, limit: int, repeat: int):
+    async with temporary_session() as session:
+        user_id = await seed_todos(session, rows)
+        last_page = rows // limit
+
+        print(f'{rows} todos, {limit} per page (median of {repeat} runs)')
+        print(f'{"page":>8} {"offset ms":>10} {"cursor ms":>10}')
+        for number in (1, last_page // 10, last_page):
+            skipped = (number - 1) * limit
+            offset = FilterPage(offset=skipped, limit=limit)
+            cursor = FilterPage(
+                cursor=encode_cursor(skipped) if skipped else None,
+                limit=limit,
+            )
+            offset_ms = await time_page(session, user_id, offset, repeat)
+            cursor_ms = await time_page(session, user_id, cursor, repeat)
+            print(f'{number:>8} {offset_ms:>10.3f} {cursor_ms:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.limit, args.repeat))
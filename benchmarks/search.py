@@ -0,0 +1,71 @@
+"""Compare `LIKE` and full-text search latency for todo text filters.
+
+Usage:
+    python -m benchmarks.search --rows 1000000
+"""
+
+import argparse
+import asyncio
+from statistics import median
+from time import perf_counter
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Todo
+from app.search import LikeTodoSearch, SQLiteTodoSearch
+from benchmarks.database import seed_todos, temporary_session
+
+FILTERS = (
+    {'title': '#77777', 'description': None},
+    {'title': 'milk', 'description': None},
+    {'title': None, 'description': 'review code'},
+    {'title': 'bike', 'description': 'trip'},
+)
+
+
+async def time_query(session: AsyncSession, query: Select, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        (await session.scalars(query.limit(100))).all()
+        timings.append(perf_counter() - start)
+        session.expunge_all()
+    return median(timings) * 1000
+
+
+async def main(rows: int, repeat: int):
+    async with temporary_session() as session:
+        start = perf_counter()
+        user_id = await seed_todos(session, rows)
+        print(f'seeded {rows} todos in {perf_counter() - start:.1f}s')
+
+        base = select(Todo).where(Todo.user_id == user_id)
+        like, fts = LikeTodoSearch(), SQLiteTodoSearch()
+
+        print(f'{"filter":>28} {"like ms":>9} {"fts ms":>9} {"ranked ms":>9}')
+        for filters in FILTERS:
+            like_query = like.filter(base, **filters).order_by(Todo.id)
+            fts_query = fts.filter(base, **filters)
+
+            like_ms = await time_query(session, like_query, repeat)
+            fts_ms = await time_query(
+                session, fts_query.order_by(Todo.id), repeat
+            )
+            ranked_ms = await time_query(
+                session, fts_query.order_by(fts.rank(**filters)), repeat
+            )
+
+            label = ' '.join(f'{k}={v}' for k, v in filters.items() if v)
+            print(
+                f'{label:>28} {like_ms:>9.2f} {fts_ms:>9.2f} {ranked_ms:>9.2f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.repeat))
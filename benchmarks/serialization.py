@@ -0,0 +1,85 @@
+"""Compare ways of turning a page of ORM todos into JSON bytes.
+
+Usage:
+    python -m benchmarks.serialization --rows 100 --repeat 200
+"""
+
+import argparse
+import asyncio
+import json
+from statistics import median
+from time import perf_counter
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import select
+
+from app.models import Todo
+from app.responses import as_dicts
+from app.schemas import TodoList, TodoPublic
+from benchmarks.database import seed_todos, temporary_session
+
+
+def validate_dump_dumps(todos: list[Todo]) -> bytes:
+    """Before FastAPI 0.127: validate, dump to dicts, then `json.dumps`."""
+    page = TodoList.model_validate(
+        {'todos': todos, 'next_cursor': None}, from_attributes=True
+    )
+    return json.dumps(page.model_dump(mode='json')).encode()
+
+
+ADAPTER = TypeAdapter(TodoList)
+
+
+def validate_dump_json(todos: list[Todo]) -> bytes:
+    """FastAPI's response model path: validate, then dump in pydantic-core."""
+    page = ADAPTER.validate_python(
+        {'todos': todos, 'next_cursor': None}, from_attributes=True
+    )
+    return ADAPTER.dump_json(page)
+
+
+def dicts_to_json(todos: list[Todo]) -> bytes:
+    """`list_todos`: read the columns and encode without validating."""
+    return to_json({'todos': as_dicts(todos, TodoPublic), 'next_cursor': None})
+
+
+STRATEGIES = (validate_dump_dumps, validate_dump_json, dicts_to_json)
+
+
+def time_strategy(strategy, todos: list[Todo], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        strategy(todos)
+        timings.append(perf_counter() - start)
+    return median(timings) * 1_000_000
+
+
+async def main(rows: int, repeat: int):
+    async with temporary_session() as session:
+        user_id = await seed_todos(session, rows)
+        todos = list(
+            await session.scalars(select(Todo).where(Todo.user_id == user_id))
+        )
+
+    outputs = {
+        json.loads(strategy(todos)) == json.loads(dicts_to_json(todos))
+        for strategy in STRATEGIES
+    }
+    assert outputs == {True}, 'strategies disagree on the payload'
+
+    print(f'{rows} todos per page (median of {repeat} runs)')
+    print(f'{"strategy":>22} {"us":>10}')
+    for strategy in STRATEGIES:
+        micros = time_strategy(strategy, todos, repeat)
+        print(f'{strategy.__name__:>22} {micros:>10.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.repeat))
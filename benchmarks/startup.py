@@ -0,0 +1,66 @@
+"""Cold start of a worker: importing `app.main` per telemetry mode.
+
+Each sample is a fresh interpreter, as a new worker or test session
+would be. `full` configures Logfire at import like the app always did
+before `TELEMETRY_MODE`; `off` never imports it.
+
+Logfire's pydantic plugin still loads its integration module when the
+first model is defined; `--no-pydantic-plugin` shows the cost of that
+too (`PYDANTIC_DISABLE_PLUGINS=logfire-plugin`).
+
+Usage:
+    python -m benchmarks.startup --repeat 10
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+PROBE = """
+from time import perf_counter
+start = perf_counter()
+import app.main
+print(perf_counter() - start)
+"""
+
+
+def cold_start(mode: str, pydantic_plugin: bool) -> tuple[float, float]:
+    """Seconds spent importing `app.main`, and for the whole process."""
+    env = {**os.environ, 'TELEMETRY_MODE': mode}
+    if not pydantic_plugin:
+        env['PYDANTIC_DISABLE_PLUGINS'] = 'logfire-plugin'
+
+    start = perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.split()[-1]), perf_counter() - start
+
+
+def main(repeat: int, pydantic_plugin: bool):
+    print(f'{"mode":>8} {"import ms":>10} {"process ms":>11}')
+    for mode in ('full', 'sampled', 'off'):
+        samples = [cold_start(mode, pydantic_plugin) for _ in range(repeat)]
+        imports, processes = zip(*samples, strict=True)
+        print(
+            f'{mode:>8} {median(imports) * 1000:>10.1f} '
+            f'{median(processes) * 1000:>11.1f}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument(
+        '--no-pydantic-plugin', dest='pydantic_plugin', action='store_false'
+    )
+    args = parser.parse_args()
+
+    main(args.repeat, args.pydantic_plugin)
@@ -10,15 +10,50 @@ from app.models import table_registry
 from app.settings import settings
 
 config = context.config
-config.set_main_option('sqlalchemy.url', settings.DATABASE_URL)
+# `python -m app.sharding migrate` runs this once per database.
+config.set_main_option(
+    'sqlalchemy.url',
+    config.attributes.get('database_url', settings.DATABASE_URL),
+)
 
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 target_metadata = table_registry.metadata
 
+# Search indexes live outside the ORM metadata (see app/search.py).
+UNMANAGED_TABLE_PREFIXES = ('todos_fts',)
+UNMANAGED_INDEXES = {'ix_todos_title_tsv', 'ix_todos_description_tsv'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith(UNMANAGED_TABLE_PREFIXES):
+        return False
+    if type_ == 'index' and name in UNMANAGED_INDEXES:
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Print the SQL for the configured URL's dialect (`alembic ... --sql`)."""
+    context.configure(
+        url=config.get_main_option('sqlalchemy.url'),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 def do_run_migrations(connection: Connection):
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
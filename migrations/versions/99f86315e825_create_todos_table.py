@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 
 # revision identifiers, used by Alembic.
@@ -18,13 +19,21 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+# Postgres gets a native enum type, created and dropped explicitly so a
+# downgrade followed by an upgrade does not find it already there.
+todo_state = postgresql.ENUM(
+    'draft', 'todo', 'doing', 'done', 'trash', name='todostate'
+)
+
+
 def upgrade() -> None:
     """Upgrade schema."""
+    todo_state.create(op.get_bind(), checkfirst=True)
     op.create_table('todos',
     sa.Column('id', sa.Integer(), nullable=False),
     sa.Column('title', sa.String(), nullable=False),
     sa.Column('description', sa.String(), nullable=False),
-    sa.Column('state', sa.Enum('draft', 'todo', 'doing', 'done', 'trash', name='todostate'), nullable=False),
+    sa.Column('state', sa.Enum('draft', 'todo', 'doing', 'done', 'trash', name='todostate').with_variant(postgresql.ENUM(name='todostate', create_type=False), 'postgresql'), nullable=False),
     sa.Column('user_id', sa.Integer(), nullable=False),
     sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
     sa.PrimaryKeyConstraint('id')
@@ -34,3 +43,4 @@ def upgrade() -> None:
 def downgrade() -> None:
     """Downgrade schema."""
     op.drop_table('todos')
+    todo_state.drop(op.get_bind(), checkfirst=True)
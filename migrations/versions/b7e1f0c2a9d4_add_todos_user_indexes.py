@@ -0,0 +1,30 @@
+"""add todos user indexes
+
+Revision ID: b7e1f0c2a9d4
+Revises: 4b62b34ddeac
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1f0c2a9d4'
+down_revision: Union[str, Sequence[str], None] = '4b62b34ddeac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'], unique=False)
+    op.create_index('ix_todos_user_id_created_at', 'todos', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_user_id_created_at', table_name='todos')
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos')
@@ -0,0 +1,79 @@
+"""add todos full text search
+
+Revision ID: c3a8d5e7f1b2
+Revises: b7e1f0c2a9d4
+Create Date: 2026-10-18 10:03:55.482117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8d5e7f1b2'
+down_revision: Union[str, Sequence[str], None] = 'b7e1f0c2a9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE todos_fts USING fts5("
+            "title, description, "
+            "content='todos', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description "
+            "ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        op.create_index(
+            'ix_todos_title_tsv', 'todos',
+            [sa.text("to_tsvector('simple', title)")],
+            postgresql_using='gin',
+        )
+        op.create_index(
+            'ix_todos_description_tsv', 'todos',
+            [sa.text("to_tsvector('simple', description)")],
+            postgresql_using='gin',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
+
+    elif dialect == 'postgresql':
+        op.drop_index('ix_todos_description_tsv', table_name='todos')
+        op.drop_index('ix_todos_title_tsv', table_name='todos')
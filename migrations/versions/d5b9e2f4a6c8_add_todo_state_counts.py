@@ -0,0 +1,120 @@
+"""add todo state counts
+
+Revision ID: d5b9e2f4a6c8
+Revises: c3a8d5e7f1b2
+Create Date: 2026-10-18 11:20:41.905372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b9e2f4a6c8'
+down_revision: Union[str, Sequence[str], None] = 'c3a8d5e7f1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    state = sa.Enum(
+        'draft', 'todo', 'doing', 'done', 'trash', name='todostate'
+    ).with_variant(
+        postgresql.ENUM(name='todostate', create_type=False), 'postgresql'
+    )
+
+    op.create_table('todo_state_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', state, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_ai AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todo_state_counts (user_id, state, count) "
+            "VALUES (new.user_id, new.state, 1) "
+            "ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_ad AFTER DELETE ON todos BEGIN "
+            "UPDATE todo_state_counts SET count = count - 1 "
+            "WHERE user_id = old.user_id AND state = old.state; "
+            "DELETE FROM todo_state_counts "
+            "WHERE user_id = old.user_id AND state = old.state AND count = 0; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_au AFTER UPDATE OF user_id, state "
+            "ON todos WHEN old.user_id != new.user_id OR old.state != new.state "
+            "BEGIN "
+            "UPDATE todo_state_counts SET count = count - 1 "
+            "WHERE user_id = old.user_id AND state = old.state; "
+            "DELETE FROM todo_state_counts "
+            "WHERE user_id = old.user_id AND state = old.state AND count = 0; "
+            "INSERT INTO todo_state_counts (user_id, state, count) "
+            "VALUES (new.user_id, new.state, 1) "
+            "ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1; "
+            "END"
+        )
+
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE FUNCTION todo_state_counts_sync() RETURNS trigger AS $$ "
+            "BEGIN "
+            "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+            "UPDATE todo_state_counts SET count = count - 1 "
+            "WHERE user_id = OLD.user_id AND state = OLD.state; "
+            "DELETE FROM todo_state_counts "
+            "WHERE user_id = OLD.user_id AND state = OLD.state "
+            "AND count = 0; "
+            "END IF; "
+            "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+            "INSERT INTO todo_state_counts (user_id, state, count) "
+            "VALUES (NEW.user_id, NEW.state, 1) "
+            "ON CONFLICT (user_id, state) "
+            "DO UPDATE SET count = todo_state_counts.count + 1; "
+            "END IF; "
+            "RETURN NULL; "
+            "END "
+            "$$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_aid AFTER INSERT OR DELETE ON todos "
+            "FOR EACH ROW EXECUTE FUNCTION todo_state_counts_sync()"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_au AFTER UPDATE OF user_id, state "
+            "ON todos FOR EACH ROW "
+            "WHEN (OLD.user_id, OLD.state) IS DISTINCT FROM (NEW.user_id, NEW.state) "
+            "EXECUTE FUNCTION todo_state_counts_sync()"
+        )
+
+    op.execute(
+        'INSERT INTO todo_state_counts (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todo_state_counts_au')
+        op.execute('DROP TRIGGER IF EXISTS todo_state_counts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todo_state_counts_ai')
+
+    elif dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS todo_state_counts_au ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_state_counts_aid ON todos')
+        op.execute('DROP FUNCTION IF EXISTS todo_state_counts_sync()')
+
+    op.drop_table('todo_state_counts')
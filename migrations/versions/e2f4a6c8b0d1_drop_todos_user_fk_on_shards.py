@@ -0,0 +1,33 @@
+"""drop todos user fk on shards
+
+Revision ID: e2f4a6c8b0d1
+Revises: d5b9e2f4a6c8
+Create Date: 2026-10-18 15:20:07.514093
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f4a6c8b0d1'
+down_revision: Union[str, Sequence[str], None] = 'd5b9e2f4a6c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Users live on the primary only, so a shard's todos reference rows
+    # it does not have. SQLite does not enforce the key; Postgres does.
+    if not context.config.attributes.get('shard'):
+        return
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Not restored: the shard's todos would violate it.
@@ -0,0 +1,233 @@
+"""add todo versions and tombstones
+
+Revision ID: f3a5c7e9b1d2
+Revises: e2f4a6c8b0d1
+Create Date: 2026-10-18 16:42:19.283514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d2'
+down_revision: Union[str, Sequence[str], None] = 'e2f4a6c8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    op.add_column(
+        'todos',
+        sa.Column(
+            'version', sa.BigInteger(), server_default='0', nullable=False
+        ),
+    )
+    # Ids already grow with every insert; later writes go above them.
+    op.execute('UPDATE todos SET version = id')
+    op.create_index(
+        'ix_todos_user_id_updated_at',
+        'todos',
+        ['user_id', 'updated_at'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_todos_user_id_version', 'todos', ['user_id', 'version'], unique=False
+    )
+
+    op.create_table('todo_versions',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('horizon_version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('horizon_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('todo_tombstones',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'id')
+    )
+    op.create_index(
+        'ix_todo_tombstones_user_id_version',
+        'todo_tombstones',
+        ['user_id', 'version'],
+        unique=False,
+    )
+    op.execute(
+        'INSERT INTO todo_versions (user_id, version, horizon_version) '
+        'SELECT user_id, max(id), 0 FROM todos GROUP BY user_id'
+    )
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER todo_versions_ai AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todo_versions (user_id, version, horizon_version) "
+            "VALUES (new.user_id, 1, 0) "
+            "ON CONFLICT (user_id) DO UPDATE SET version = version + 1; "
+            "UPDATE todos SET version = ("
+            "SELECT version FROM todo_versions WHERE user_id = new.user_id"
+            ") WHERE id = new.id; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_versions_au AFTER UPDATE ON todos "
+            "WHEN new.version = old.version BEGIN "
+            "INSERT INTO todo_versions (user_id, version, horizon_version) "
+            "VALUES (new.user_id, 1, 0) "
+            "ON CONFLICT (user_id) DO UPDATE SET version = version + 1; "
+            "UPDATE todos SET version = ("
+            "SELECT version FROM todo_versions WHERE user_id = new.user_id"
+            ") WHERE id = new.id; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos BEGIN "
+            "INSERT INTO todo_versions (user_id, version, horizon_version) "
+            "VALUES (old.user_id, 1, 0) "
+            "ON CONFLICT (user_id) DO UPDATE SET version = version + 1; "
+            "INSERT INTO todo_tombstones (user_id, id, version, deleted_at) "
+            "SELECT old.user_id, old.id, version, "
+            "STRFTIME('%Y-%m-%d %H:%M:%f', 'now') "
+            "FROM todo_versions WHERE user_id = old.user_id "
+            "ON CONFLICT (user_id, id) DO UPDATE SET "
+            "version = excluded.version, deleted_at = excluded.deleted_at; "
+            "END"
+        )
+
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE FUNCTION todo_versions_next(owner integer) "
+            "RETURNS bigint AS $$ "
+            "DECLARE next_version bigint; "
+            "BEGIN "
+            "INSERT INTO todo_versions (user_id, version, horizon_version) "
+            "VALUES (owner, 1, 0) "
+            "ON CONFLICT (user_id) "
+            "DO UPDATE SET version = todo_versions.version + 1 "
+            "RETURNING version INTO next_version; "
+            "RETURN next_version; "
+            "END "
+            "$$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE FUNCTION todo_versions_stamp() RETURNS trigger AS $$ "
+            "BEGIN "
+            "NEW.version := todo_versions_next(NEW.user_id); "
+            "RETURN NEW; "
+            "END "
+            "$$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE FUNCTION todo_tombstones_record() RETURNS trigger AS $$ "
+            "BEGIN "
+            "INSERT INTO todo_tombstones (user_id, id, version, deleted_at) "
+            "VALUES (OLD.user_id, OLD.id, todo_versions_next(OLD.user_id), now()) "
+            "ON CONFLICT (user_id, id) DO UPDATE SET "
+            "version = EXCLUDED.version, deleted_at = EXCLUDED.deleted_at; "
+            "RETURN NULL; "
+            "END "
+            "$$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_versions_biu BEFORE INSERT OR UPDATE ON todos "
+            "FOR EACH ROW EXECUTE FUNCTION todo_versions_stamp()"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos "
+            "FOR EACH ROW EXECUTE FUNCTION todo_tombstones_record()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todo_tombstones_ad')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_au')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_ai')
+
+    elif dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS todo_tombstones_ad ON todos')
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_biu ON todos')
+        op.execute('DROP FUNCTION IF EXISTS todo_tombstones_record()')
+        op.execute('DROP FUNCTION IF EXISTS todo_versions_stamp()')
+        op.execute('DROP FUNCTION IF EXISTS todo_versions_next(integer)')
+
+    op.drop_index(
+        'ix_todo_tombstones_user_id_version', table_name='todo_tombstones'
+    )
+    op.drop_table('todo_tombstones')
+    op.drop_table('todo_versions')
+    op.drop_index('ix_todos_user_id_version', table_name='todos')
+    op.drop_index('ix_todos_user_id_updated_at', table_name='todos')
+    with op.batch_alter_table('todos', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    if dialect == 'sqlite':
+        # The batch copy rebuilt `todos`, and SQLite dropped every trigger
+        # on it; put back the search and state count ones and catch their
+        # tables up with the rows.
+        op.execute(
+            "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description "
+            "ON todos BEGIN "
+            "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO todos_fts(rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_ai AFTER INSERT ON todos BEGIN "
+            "INSERT INTO todo_state_counts (user_id, state, count) "
+            "VALUES (new.user_id, new.state, 1) "
+            "ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_ad AFTER DELETE ON todos BEGIN "
+            "UPDATE todo_state_counts SET count = count - 1 "
+            "WHERE user_id = old.user_id AND state = old.state; "
+            "DELETE FROM todo_state_counts "
+            "WHERE user_id = old.user_id AND state = old.state AND count = 0; "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER todo_state_counts_au AFTER UPDATE OF user_id, state "
+            "ON todos WHEN old.user_id != new.user_id OR old.state != new.state "
+            "BEGIN "
+            "UPDATE todo_state_counts SET count = count - 1 "
+            "WHERE user_id = old.user_id AND state = old.state; "
+            "DELETE FROM todo_state_counts "
+            "WHERE user_id = old.user_id AND state = old.state AND count = 0; "
+            "INSERT INTO todo_state_counts (user_id, state, count) "
+            "VALUES (new.user_id, new.state, 1) "
+            "ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1; "
+            "END"
+        )
+        op.execute('DELETE FROM todo_state_counts')
+        op.execute(
+            'INSERT INTO todo_state_counts (user_id, state, count) '
+            'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+        )
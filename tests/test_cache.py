@@ -0,0 +1,142 @@
+import asyncio
+import fnmatch
+from contextlib import suppress
+
+import pytest
+from freezegun import freeze_time
+
+from app.cache import MemoryCache, NullCache, RedisCache, create_cache
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of `redis.asyncio.Redis` we use."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.expiry_ms: dict[str, int] = {}
+        self.streams: dict[str, list[tuple[bytes, dict]]] = {}
+        self.last_id = 0
+        self.appended = asyncio.Condition()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value
+        self.expiry_ms[key] = px
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.streams.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in [*self.data, *self.streams]:
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def xadd(self, key, fields, maxlen, approximate=True):
+        self.last_id += 1
+        event_id = b'1-%d' % self.last_id
+        stream = self.streams.setdefault(key, [])
+        stream.append((
+            event_id,
+            {name.encode(): value for name, value in fields.items()},
+        ))
+        del stream[:-maxlen]
+        async with self.appended:
+            self.appended.notify_all()
+        return event_id
+
+    async def xrange(self, key, count):
+        return self.streams.get(key, [])[:count]
+
+    async def xrevrange(self, key, count):
+        return self.streams.get(key, [])[::-1][:count]
+
+    async def xread(self, streams, block):
+        ((key, after),) = streams.items()
+        after = tuple(map(int, after.split('-')))
+
+        def entries():
+            return [
+                (event_id, fields)
+                for event_id, fields in self.streams.get(key, ())
+                if tuple(map(int, event_id.split(b'-'))) > after
+            ]
+
+        async with self.appended:
+            with suppress(TimeoutError):
+                async with asyncio.timeout(block / 1000):
+                    await self.appended.wait_for(entries)
+        return [(key.encode(), found)] if (found := entries()) else []
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    await cache.set('a', b'1', ttl=60)
+    await cache.set('b', b'2', ttl=60)
+    await cache.get('a')
+    await cache.set('c', b'3', ttl=60)
+
+    assert await cache.get('a') == b'1'
+    assert await cache.get('b') is None
+    assert await cache.get('c') == b'3'
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_beyond_max_bytes():
+    cache = MemoryCache(max_entries=10, max_bytes=10)
+    await cache.set('a', b'1234', ttl=60)
+    await cache.set('b', b'1234', ttl=60)
+    await cache.set('a', b'12', ttl=60)
+    await cache.set('c', b'123', ttl=60)
+
+    assert await cache.get('b') is None
+    assert await cache.get('a') == b'12'
+    assert await cache.get('c') == b'123'
+    assert cache.size == 7  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_entries=10)
+
+    with freeze_time('2026-01-01 12:00:00') as frozen:
+        await cache.set('a', b'1', ttl=30)
+        frozen.tick(29)
+        assert await cache.get('a') == b'1'
+        frozen.tick(1)
+        assert await cache.get('a') is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_namespaces_keys():
+    client = FakeRedis()
+    client.data['other:a'] = b'foreign'
+    cache = RedisCache(client, prefix='principal:')
+
+    await cache.set('a', b'1', ttl=1.5)
+
+    assert client.data['principal:a'] == b'1'
+    assert client.expiry_ms['principal:a'] == 1500  # noqa: PLR2004
+    assert await cache.get('a') == b'1'
+
+    await cache.clear()
+
+    assert client.data == {'other:a': b'foreign'}
+
+
+@pytest.mark.asyncio
+async def test_null_cache_stores_nothing():
+    cache = create_cache('none', max_entries=1, redis_url=None, prefix='')
+    await cache.set('a', b'1', ttl=60)
+
+    assert isinstance(cache, NullCache)
+    assert await cache.get('a') is None
+
+
+def test_redis_cache_requires_url():
+    with pytest.raises(ValueError, match='REDIS_URL'):
+        create_cache('redis', max_entries=1, redis_url=None, prefix='')
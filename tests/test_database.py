@@ -1,10 +1,24 @@
 from dataclasses import asdict
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, text
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.session import Session
 
+from app.database import (
+    checkout,
+    create_engine,
+    each_database,
+    engine_options,
+    pool_checkout_wait,
+    pool_in_use,
+    pool_saturation,
+)
 from app.models import Todo, TodoState, User
+from app.settings import settings
+from tests.conftest import requires_sqlite
 
 
 @pytest.mark.asyncio
@@ -19,7 +33,11 @@ async def test_create_user(session, mock_db_time):
         session.add(new_user)
         await session.commit()
 
-    user = await session.scalar(select(User).where(User.username == 'john'))
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.username == 'john')
+    )
 
     assert asdict(user) == {
         'id': 1,
@@ -45,7 +63,9 @@ async def test_create_todo(session: Session, user: User, mock_db_time):
         session.add(new_todo)
         await session.commit()
 
-    todo = await session.scalar(select(Todo))
+    todo = await session.scalar(
+        select(Todo).execution_options(populate_existing=True)
+    )
 
     assert asdict(todo) == {
         'id': 1,
@@ -55,6 +75,7 @@ async def test_create_todo(session: Session, user: User, mock_db_time):
         'user_id': user.id,
         'created_at': time,
         'updated_at': time,
+        'version': 1,
     }
 
 
@@ -71,6 +92,159 @@ async def test_user_todo_relationship(session: Session, user: User):
     await session.commit()
     await session.refresh(user)
 
-    user = await session.scalar(select(User).where(User.id == user.id))
+    user = await session.scalar(
+        select(User)
+        .options(selectinload(User.todos))
+        .where(User.id == user.id)
+    )
 
     assert user.todos == [todo]
+
+
+@pytest.mark.asyncio
+async def test_user_todos_are_not_loaded_by_default(session, user: User):
+    session.expunge_all()
+    user = await session.scalar(select(User).where(User.id == user.id))
+
+    with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+        user.todos  # noqa: B018
+
+
+async def explain_query_plan(session, query) -> str:
+    compiled = query.compile(
+        dialect=session.bind.dialect, compile_kwargs={'literal_binds': True}
+    )
+    rows = await session.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))
+    return ' '.join(row.detail for row in rows)
+
+
+@requires_sqlite
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('query', 'index'),
+    [
+        (
+            select(Todo).where(Todo.user_id == 1).order_by(Todo.id),
+            'ix_todos_user_id_',
+        ),
+        (
+            select(Todo)
+            .where(Todo.user_id == 1, Todo.state == TodoState.done)
+            .order_by(Todo.id),
+            'ix_todos_user_id_state_id',
+        ),
+        (
+            select(Todo).where(Todo.user_id == 1).order_by(Todo.created_at),
+            'ix_todos_user_id_created_at',
+        ),
+    ],
+)
+async def test_todo_queries_use_user_indexes(session, query, index):
+    plan = await explain_query_plan(session, query)
+
+    assert f'USING INDEX {index}' in plan
+    assert 'SCAN todos' not in plan
+
+
+def test_engine_options_skip_pool_sizing_for_memory_sqlite():
+    memory = settings.model_copy(
+        update={'DATABASE_URL': 'sqlite+aiosqlite:///:memory:'}
+    )
+    file = settings.model_copy(
+        update={'DATABASE_URL': 'sqlite+aiosqlite:///app.db'}
+    )
+
+    assert 'pool_size' not in engine_options(memory)
+    assert engine_options(file)['pool_size'] == settings.DATABASE_POOL_SIZE
+
+
+def test_engine_options_cache_prepared_statements_on_asyncpg():
+    postgres = settings.model_copy(
+        update={
+            'DATABASE_URL': 'postgresql+asyncpg://app:secret@db/app',
+            'DATABASE_PREPARED_STATEMENT_CACHE_SIZE': 250,
+        }
+    )
+
+    options = engine_options(postgres)
+
+    assert options['connect_args'] == {'prepared_statement_cache_size': 250}
+    assert options['pool_size'] == settings.DATABASE_POOL_SIZE
+
+
+def test_each_database_visits_the_primary_then_every_shard():
+    sharded = settings.model_copy(
+        update={
+            'DATABASE_URL': 'sqlite+aiosqlite:///primary.db',
+            'DATABASE_SHARDS': {'a': 'sqlite+aiosqlite:///a.db'},
+        }
+    )
+
+    assert [
+        (name, database_settings.DATABASE_URL)
+        for name, database_settings in each_database(sharded)
+    ] == [
+        ('primary', 'sqlite+aiosqlite:///primary.db'),
+        ('shard-a', 'sqlite+aiosqlite:///a.db'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_engine_tunes_sqlite_connections(tmp_path):
+    engine = create_engine(
+        settings.model_copy(
+            update={
+                'DATABASE_URL': f'sqlite+aiosqlite:///{tmp_path / "app.db"}',
+                'SQLITE_BUSY_TIMEOUT_MS': 1234,
+            }
+        )
+    )
+
+    async with engine.connect() as conn:
+        journal_mode = await conn.scalar(text('PRAGMA journal_mode'))
+        synchronous = await conn.scalar(text('PRAGMA synchronous'))
+        busy_timeout = await conn.scalar(text('PRAGMA busy_timeout'))
+
+    await engine.dispose()
+
+    assert journal_mode == 'wal'
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 1234  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_follow_checkouts(tmp_path):
+    engines = [
+        create_engine(
+            settings.model_copy(
+                update={
+                    'DATABASE_URL': f'sqlite+aiosqlite:///{tmp_path / name}',
+                    'DATABASE_POOL_SIZE': 2,
+                    'DATABASE_MAX_OVERFLOW': 2,
+                }
+            ),
+            name,
+        )
+        for name in ('first', 'second')
+    ]
+    in_use = pool_in_use.labels('first')
+    saturation = pool_saturation.labels('first')
+    observed = pool_checkout_wait.count
+
+    async with (
+        AsyncSession(engines[0]) as session,
+        AsyncSession(engines[1]) as other_session,
+    ):
+        await checkout(session)
+        await checkout(other_session)
+
+        assert in_use.value == 1
+        assert saturation.value == 1 / 4
+        assert pool_in_use.labels('second').value == 1
+
+    for engine in engines:
+        await engine.dispose()
+
+    assert in_use.value == 0
+    assert saturation.value == 0
+    assert pool_checkout_wait.count == observed + 2
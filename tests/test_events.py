@@ -0,0 +1,238 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.events import (
+    ChangeFeed,
+    EventLog,
+    MemoryEventLog,
+    RedisEventLog,
+    create_event_log,
+)
+from app.models import User
+from app.response_cache import todos_namespace
+from tests.test_cache import FakeRedis
+
+
+async def take(stream: AsyncIterator[bytes], count: int) -> list[bytes]:
+    chunks = [await anext(stream) for _ in range(count)]
+    await stream.aclose()
+    return chunks
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_log(request) -> Callable[[int], EventLog]:
+    """Builds event logs of each backend from their `max_events`."""
+    if request.param == 'redis':
+        client = FakeRedis()
+        return lambda max_events: RedisEventLog(client, 'events:', max_events)
+    return MemoryEventLog
+
+
+@pytest.mark.asyncio
+async def test_log_reads_events_after_an_id(make_log):
+    log = make_log(10)
+    start = await log.latest('a')
+    first = await log.append('a', b'1')
+    await log.append('b', b'other channel')
+    second = await log.append('a', b'2')
+
+    assert await log.read('a', start, timeout=0) == [
+        (first, b'1'),
+        (second, b'2'),
+    ]
+    assert await log.read('a', first, timeout=0) == [(second, b'2')]
+    assert await log.read('a', second, timeout=0) == []
+
+
+@pytest.mark.asyncio
+async def test_log_only_covers_what_it_still_holds(make_log):
+    log = make_log(2)
+    first = await log.append('a', b'1')
+    second = await log.append('a', b'2')
+
+    assert await log.covers('a', first)
+
+    await log.append('a', b'3')
+
+    assert not await log.covers('a', first)
+    assert await log.covers('a', second)
+    assert not await log.covers('a', 'garbage')
+
+
+@pytest.mark.asyncio
+async def test_memory_log_ignores_ids_of_other_processes():
+    log = MemoryEventLog(max_events=2)
+    await log.append('a', b'1')
+
+    assert not await log.covers('a', f'{int(log.epoch) - 1}-1')
+
+
+@pytest.mark.asyncio
+async def test_memory_log_evicts_least_recently_written_channels():
+    log = MemoryEventLog(max_events=10, max_channels=1)
+    start = await log.latest('a')
+    first = await log.append('a', b'1')
+    seen = await log.append('a', b'2')
+    await log.append('b', b'3')
+
+    assert not await log.covers('a', start)
+    assert await log.covers('a', seen)
+    assert await log.read('a', start, timeout=0) == []
+
+    # Written again, `a` must not claim the events evicted with it.
+    latest = await log.append('a', b'4')
+
+    assert not await log.covers('a', first)
+    assert await log.covers('a', seen)
+    assert await log.read('a', seen, timeout=0) == [(latest, b'4')]
+
+
+@pytest.mark.asyncio
+async def test_log_wakes_waiting_readers(make_log):
+    log = make_log(10)
+    start = await log.latest('a')
+
+    reader = asyncio.create_task(log.read('a', start, timeout=5))
+    await asyncio.sleep(0)
+    event_id = await log.append('a', b'1')
+
+    assert await reader == [(event_id, b'1')]
+
+
+@pytest.mark.asyncio
+async def test_memory_log_forgets_finished_readers():
+    log = MemoryEventLog(max_events=10)
+
+    await log.read('a', await log.latest('a'), timeout=0)
+
+    assert log._waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_pushes_new_events_and_keeps_alive(make_log):
+    feed = ChangeFeed(make_log(10), keepalive=0.01)
+    stream = feed.stream('todos:1', None)
+
+    assert await anext(stream) == b'retry: 1000\n\n'
+    assert await anext(stream) == b': keepalive\n\n'
+
+    reader = asyncio.create_task(anext(stream))
+    await asyncio.sleep(0)
+    await feed.publish('todos:1', 'deleted', {'id': 3})
+    chunk = await reader
+    await stream.aclose()
+
+    assert chunk.startswith(b'id: ')
+    assert chunk.endswith(b'\nevent: deleted\ndata: {"id":3}\n\n')
+
+
+@pytest.mark.asyncio
+async def test_stream_resets_clients_behind_the_log(make_log):
+    feed = ChangeFeed(make_log(1), keepalive=0.01)
+    seen = await feed.log.append('todos:1', b'event: deleted\ndata: {}\n')
+    await feed.publish('todos:1', 'deleted', {'id': 1})
+    await feed.publish('todos:1', 'deleted', {'id': 2})
+    latest = await feed.log.latest('todos:1')
+
+    _, reset = await take(feed.stream('todos:1', seen), 2)
+
+    assert reset == b'id: %s\nevent: reset\ndata: {}\n\n' % latest.encode()
+
+
+def test_redis_event_log_requires_url():
+    with pytest.raises(ValueError, match='REDIS_URL'):
+        create_event_log('redis', max_events=1, redis_url=None, prefix='')
+
+
+def test_todo_writes_publish_changes(client: TestClient, user: User, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    channel = todos_namespace(user.id)
+
+    todo = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'a', 'description': 'b', 'state': 'todo'},
+    ).json()
+    client.patch(
+        f'/todos/{todo["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.delete(f'/todos/{todo["id"]}', headers=headers)
+
+    log = client.app.state.change_feed.log
+    events = [data for _, data in log._channels[channel]]
+    assert [event.split(b'\n')[0] for event in events] == [
+        b'event: created',
+        b'event: updated',
+        b'event: deleted',
+    ]
+    assert b'"state":"done"' in events[1]
+    assert events[2].endswith(b'data: {"id":%d}\n' % todo['id'])
+
+
+async def get_stream(
+    app: FastAPI, headers: dict[str, str], chunks: int
+) -> tuple[dict, list[bytes]]:
+    """Read `chunks` body chunks from `/todos/stream`, then disconnect."""
+    messages = []
+    enough = asyncio.Event()
+
+    async def receive():
+        await enough.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+        if message['type'] == 'http.response.body' and message['body']:
+            chunks_seen = len(messages) - 1
+            if chunks_seen == chunks:
+                enough.set()
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/todos/stream',
+        'raw_path': b'/todos/stream',
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+        'client': ('test', 1),
+        'server': ('test', 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    return messages[0], [message['body'] for message in messages[1:]]
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_resumes_from_last_event_id(
+    client: TestClient, user: User, token
+):
+    log = client.app.state.change_feed.log
+    start = await log.latest(todos_namespace(user.id))
+    client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'missed', 'description': '', 'state': 'todo'},
+    )
+
+    start_message, (retry, missed) = await get_stream(
+        client.app,
+        {'Authorization': f'Bearer {token}', 'Last-Event-ID': start},
+        chunks=2,
+    )
+
+    assert start_message['status'] == 200  # noqa: PLR2004
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in (
+        start_message['headers']
+    )
+    assert retry == b'retry: 1000\n\n'
+    assert b'event: created\ndata: {"title":"missed"' in missed
@@ -1,10 +1,117 @@
 from http import HTTPStatus
+from pathlib import Path
+from unittest.mock import AsyncMock
 
+import pytest
 from fastapi.testclient import TestClient
 
+from app.cache import MemoryCache, NullCache
+from app.database import create_engine
+from app.main import create_app
+from app.security import password_hash_queue, warm_up_auth
+from app.settings import settings
+
 
 def test_root(client: TestClient):
     response = client.get('/')
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Hello World'}
+
+
+def test_liveness(client: TestClient):
+    response = client.get('/health/live')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'alive'}
+
+
+def test_readiness_after_startup(client: TestClient):
+    response = client.get('/health/ready')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'status': 'ready', 'pool': None}
+
+
+def test_readiness_fails_while_shutting_down(client: TestClient):
+    client.app.state.ready = False
+
+    response = client.get('/health/ready')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json()['status'] == 'unavailable'
+
+
+def test_readiness_fails_when_the_database_is_unreachable(
+    client: TestClient, tmp_path: Path
+):
+    working = client.app.state.engine
+    client.app.state.engine = create_engine(
+        settings.model_copy(
+            update={
+                'DATABASE_URL': (
+                    f'sqlite+aiosqlite:///{tmp_path / "missing" / "db"}'
+                )
+            }
+        )
+    )
+
+    response = client.get('/health/ready')
+    client.app.state.engine = working
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+
+def test_lifespan_warms_and_disposes_the_pool(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    warm_up_auth = AsyncMock()
+    monkeypatch.setattr('app.main.warm_up_auth', warm_up_auth)
+    app = create_app(
+        settings.model_copy(
+            update={
+                'DATABASE_URL': f'sqlite+aiosqlite:///{tmp_path / "db"}',
+                'DATABASE_POOL_WARM_CONNECTIONS': 3,
+            }
+        )
+    )
+
+    with TestClient(app) as client:
+        pool = client.get('/health/ready').json()['pool']
+        engine = app.state.engine
+
+    assert pool['checked_in'] == 3  # noqa: PLR2004
+    assert pool['checked_out'] == 0
+    warm_up_auth.assert_awaited_once()
+    assert app.state.ready is False
+    assert engine.sync_engine.pool.checkedin() == 0
+
+
+def test_create_app_builds_its_state_from_its_settings():
+    cached = create_app(
+        settings.model_copy(
+            update={
+                'RESPONSE_CACHE_BACKEND': 'memory',
+                'ACCESS_TOKEN_EXPIRE_MINUTES': 5,
+            }
+        )
+    )
+    uncached = create_app(
+        settings.model_copy(update={'RESPONSE_CACHE_BACKEND': 'none'})
+    )
+
+    assert isinstance(cached.state.response_cache.backend, MemoryCache)
+    assert isinstance(uncached.state.response_cache.backend, NullCache)
+    assert cached.state.token_issuer.expire_minutes == 5  # noqa: PLR2004
+    assert cached.state.change_feed is not uncached.state.change_feed
+
+
+@pytest.mark.asyncio
+async def test_warm_up_auth_leaves_no_state_behind():
+    app = create_app(settings)
+    pending = password_hash_queue.value
+
+    await warm_up_auth(app.state.password_pool, app.state.token_issuer)
+
+    assert password_hash_queue.value == pending
+    assert app.state.token_verifier.cache.size == 0
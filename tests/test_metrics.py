@@ -0,0 +1,149 @@
+import json
+import os
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.metrics import (
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    SnapshotWriter,
+    collect,
+    counter,
+    gauge,
+    merge,
+    render,
+    snapshot,
+)
+from app.models import User
+from app.profiling import request_duration, requests_in_flight
+
+DEAD_PID = 2**22 + 1  # above the default pid_max
+
+
+def test_render_histogram_buckets_are_cumulative():
+    latency = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value)
+
+    text = render(snapshot({'latency_seconds': latency}))
+
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 'latency_seconds_count 4' in text
+
+
+def test_render_escapes_label_values():
+    families = {
+        'hits_total': {
+            'documentation': 'Hits.',
+            'type': 'counter',
+            'samples': [{'labels': {'path': 'a"b\\c'}, 'value': 1}],
+        }
+    }
+
+    assert 'hits_total{path="a\\"b\\\\c"} 1' in render(families)
+
+
+def test_register_returns_existing_or_rejects_another_type(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr('app.metrics.registry', {})
+
+    first = counter('jobs_total', 'Jobs.')
+
+    assert counter('jobs_total', 'Jobs.') is first
+    with pytest.raises(TypeError):
+        gauge('jobs_total', 'Jobs.')
+
+
+def test_merge_adds_counters_and_histograms():
+    first = Histogram('h', 'H.', buckets=(1,))
+    first.observe(0.5)
+    second = Histogram('h', 'H.', buckets=(1,))
+    second.observe(2)
+
+    merged = merge([
+        snapshot({'c': Counter('c', 'C.', value=2), 'h': first}),
+        snapshot({'c': Counter('c', 'C.', value=3), 'h': second}),
+    ])
+
+    assert merged['c']['samples'][0]['value'] == 5  # noqa: PLR2004
+    assert merged['h']['samples'][0]['counts'] == [1, 1]
+
+
+def test_merge_combines_gauges_by_mode():
+    def worker(in_use, saturation):
+        return snapshot({
+            'in_use': Gauge('in_use', 'I.', value=in_use),
+            'saturation': Gauge(
+                'saturation', 'S.', value=saturation, multiprocess_mode='max'
+            ),
+        })
+
+    merged = merge([worker(2, 0.2), worker(3, 0.9)])
+
+    assert merged['in_use']['samples'][0]['value'] == 5  # noqa: PLR2004
+    assert merged['saturation']['samples'][0]['value'] == 0.9  # noqa: PLR2004
+
+
+def test_collect_merges_other_workers(tmp_path: Path):
+    other = {'done_total': Counter('done_total', 'D.', value=7)}
+    dead = {
+        'done_total': Counter('done_total', 'D.', value=1),
+        'busy': Gauge('busy', 'B.', value=4),
+    }
+    (tmp_path / f'{os.getppid()}.json').write_text(json.dumps(snapshot(other)))
+    (tmp_path / f'{DEAD_PID}.json').write_text(json.dumps(snapshot(dead)))
+
+    text = collect(str(tmp_path))
+
+    assert 'done_total 8' in text
+    assert 'busy' not in text
+
+
+def test_snapshot_writer_throttles(tmp_path: Path):
+    writer = SnapshotWriter(str(tmp_path), interval=60)
+    path = tmp_path / f'{os.getpid()}.json'
+
+    writer.maybe_write()
+    path.unlink()
+    writer.maybe_write()
+
+    assert not path.exists()
+
+
+def test_metrics_endpoint_reports_routes(client: TestClient, user: User):
+    client.get(f'/users/{user.id}')
+    client.get('/does-not-exist')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == CONTENT_TYPE
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/users/{user_id}"}'
+    ) in response.text
+    assert (
+        'http_requests_total{method="GET",route="unmatched",status="404"}'
+    ) in response.text
+    assert 'password_hash_queue_depth' in response.text
+    assert 'db_pool_connections_in_use' in response.text
+    assert 'principal_cache_hits_total' in response.text
+
+
+def test_in_flight_requests_are_released(client: TestClient):
+    before = requests_in_flight.value
+    count = request_duration.labels('GET', '/').count
+
+    client.get('/')
+
+    assert requests_in_flight.value == before
+    assert request_duration.labels('GET', '/').count == count + 1
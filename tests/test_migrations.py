@@ -0,0 +1,78 @@
+import sqlite3
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, insert, text
+
+from app.models import Todo, TodoState
+
+SEARCH_TRIGGERS = {'todos_fts_ai', 'todos_fts_ad', 'todos_fts_au'}
+COUNT_TRIGGERS = {
+    'todo_state_counts_ai',
+    'todo_state_counts_ad',
+    'todo_state_counts_au',
+}
+SYNC_TRIGGERS = {'todo_versions_ai', 'todo_versions_au', 'todo_tombstones_ad'}
+
+
+def triggers(path: Path) -> set[str]:
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+        return {name for (name,) in rows}
+
+
+def migrated(path: Path) -> Config:
+    config = Config('alembic.ini')
+    config.attributes['database_url'] = f'sqlite+aiosqlite:///{path}'
+    command.upgrade(config, 'head')
+    return config
+
+
+def test_downgrading_sync_keeps_the_other_triggers(tmp_path: Path):
+    path = tmp_path / 'migrated.db'
+    config = migrated(path)
+
+    assert triggers(path) == SEARCH_TRIGGERS | COUNT_TRIGGERS | SYNC_TRIGGERS
+
+    command.downgrade(config, '-1')
+    assert triggers(path) == SEARCH_TRIGGERS | COUNT_TRIGGERS
+
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            'INSERT INTO todos (user_id, title, description, state) '
+            "VALUES (1, 'kept in step', '', 'todo')"
+        )
+        matches = conn.execute(
+            "SELECT rowid FROM todos_fts WHERE todos_fts MATCH 'step'"
+        ).fetchall()
+        counts = conn.execute(
+            'SELECT user_id, state, count FROM todo_state_counts'
+        ).fetchall()
+    assert matches == [(1,)]
+    assert counts == [(1, 'todo', 1)]
+
+    command.upgrade(config, 'head')
+    assert triggers(path) == SEARCH_TRIGGERS | COUNT_TRIGGERS | SYNC_TRIGGERS
+
+
+def test_migrated_todos_are_stamped_to_the_millisecond(tmp_path: Path):
+    path = tmp_path / 'migrated.db'
+    migrated(path)
+
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Todo).values(
+                user_id=1, title='', description='', state=TodoState.todo
+            )
+        )
+        stamps = conn.execute(
+            text('SELECT created_at, updated_at FROM todos')
+        ).one()
+    engine.dispose()
+
+    # CURRENT_TIMESTAMP, the migrated server default, has no fraction.
+    assert all('.' in stamp for stamp in stamps)
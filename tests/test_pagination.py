@@ -0,0 +1,17 @@
+import pytest
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    ['not-a-cursor', encode_cursor(1)[:-2], 'eyJpZCI6ICJ4In0', 'e30'],
+)
+def test_decode_cursor_rejects_foreign_values(cursor: str):
+    with pytest.raises(HTTPException, match='Invalid cursor'):
+        decode_cursor(cursor)
@@ -0,0 +1,74 @@
+import re
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User
+from app.profiling import QueryProfile, request_db_time, request_queries
+from tests.conftest import TodoFactory
+
+
+def server_timing(response) -> dict[str, dict[str, str]]:
+    metrics = {}
+    for entry in response.headers['Server-Timing'].split(','):
+        name, *params = (part.strip() for part in entry.split(';'))
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@pytest.mark.asyncio
+async def test_server_timing_reports_request_queries(
+    session: AsyncSession,
+    user: User,
+    client: TestClient,
+    token: str,
+    count_queries,
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    timing = server_timing(response)
+
+    assert timing['db']['desc'] == f'"{len(statements)} queries"'
+    assert float(timing['db']['dur']) >= float(timing['db-slowest']['dur'])
+
+
+def test_requests_without_sql_report_zero(client: TestClient):
+    response = client.get('/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert server_timing(response)['db'] == {
+        'desc': '"0 queries"',
+        'dur': '0.00',
+    }
+
+
+def test_requests_feed_the_histograms(client: TestClient, user: User):
+    requests, db_time = request_queries.count, request_db_time.count
+
+    client.get(f'/users/{user.id}')
+
+    assert request_queries.count == requests + 1
+    assert request_db_time.count == db_time + 1
+
+
+def test_profile_keeps_the_slowest_statement():
+    profile = QueryProfile()
+
+    profile.record('SELECT 1', 0.002)
+    profile.record('SELECT 2', 0.005)
+    profile.record('SELECT 3', 0.001)
+
+    assert profile.count == 3  # noqa: PLR2004
+    assert profile.slowest_statement == 'SELECT 2'
+    assert re.fullmatch(
+        r'db;desc="3 queries";dur=8\.00, db-slowest;dur=5\.00',
+        profile.server_timing,
+    )
@@ -0,0 +1,159 @@
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import NullCache
+from app.models import User
+from tests.conftest import TodoFactory, app
+
+
+@pytest.fixture(autouse=True)
+def without_response_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(app.state.response_cache, 'backend', NullCache())
+
+
+@pytest_asyncio.fixture
+async def user_with_todos(session: AsyncSession, user: User) -> User:
+    session.add_all(TodoFactory.create_batch(size=20, user_id=user.id))
+    await session.commit()
+    session.expunge_all()
+    return user
+
+
+@pytest.mark.parametrize(
+    ('method', 'url', 'expected'),
+    [
+        ('get', '/users/', 2),
+        ('get', '/users/1', 1),
+        ('post', '/auth/refresh_token', 1),
+        ('get', '/todos/', 3),
+    ],
+)
+def test_statements_per_request(  # noqa: PLR0913, PLR0917
+    client: TestClient,
+    user_with_todos: User,
+    token: str,
+    count_queries,
+    method: str,
+    url: str,
+    expected: int,
+):
+    with count_queries() as statements:
+        response = client.request(
+            method, url, headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected, statements
+
+
+@pytest.mark.parametrize(
+    ('method', 'url', 'budget'),
+    [
+        ('get', '/', 0),
+        ('get', '/auth/jwks', 0),
+        ('get', '/todos/stats', 2),
+        ('get', '/todos/changes?since=0', 3),
+        ('get', '/todos/export?format=csv', 2),
+        ('get', '/todos/?title=todo&sort=rank', 3),
+    ],
+)
+def test_query_budgets(  # noqa: PLR0913, PLR0917
+    client: TestClient,
+    user_with_todos: User,
+    token: str,
+    query_budget,
+    method: str,
+    url: str,
+    budget: int,
+):
+    with query_budget(budget):
+        response = client.request(
+            method, url, headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_not_modified_todos_are_not_loaded(
+    client: TestClient, user_with_todos: User, token: str, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert len(statements) == 1, statements
+    assert 'count(' in statements[0]
+
+
+def test_login_does_not_load_todos(
+    client: TestClient, user_with_todos: User, count_queries
+):
+    with count_queries() as statements:
+        response = client.post(
+            '/auth/token',
+            data={'username': user_with_todos.email, 'password': 'testtest'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize(
+    ('method', 'url', 'body'),
+    [
+        (
+            'post',
+            '/todos/',
+            {'title': 'Todo', 'description': 'd', 'state': 'draft'},
+        ),
+        ('patch', '/todos/1', {'state': 'done'}),
+        ('delete', '/todos/1', None),
+        (
+            'put',
+            '/users/1',
+            {'username': 'bob', 'email': 'bob@bob.com', 'password': 'pw'},
+        ),
+    ],
+)
+def test_writes_are_a_single_statement(  # noqa: PLR0913, PLR0917
+    client: TestClient,
+    user_with_todos: User,
+    token: str,
+    count_queries,
+    method: str,
+    url: str,
+    body: dict | None,
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)  # warm the cache
+
+    with count_queries() as statements:
+        response = client.request(method, url, headers=headers, json=body)
+
+    assert response.is_success
+    assert len(statements) == 1, statements
+
+
+def test_create_user_checks_for_duplicates_before_inserting(
+    client: TestClient, count_queries
+):
+    with count_queries() as statements:
+        response = client.post(
+            '/users/',
+            json={'username': 'amy', 'email': 'amy@amy.com', 'password': 'pw'},
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert [statement.split()[0] for statement in statements] == [
+        'SELECT',
+        'INSERT',
+    ], statements
@@ -0,0 +1,211 @@
+from collections.abc import Iterator
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine as create_sync_engine
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.cache import MemoryCache
+from app.main import create_app
+from app.models import User, table_registry
+from app.replicas import ReplicaSet, create_recent_writes, read_routes
+from app.response_cache import response_cache_hits
+from app.settings import settings
+
+
+def create_database(path: Path, username: str) -> str:
+    """SQLite file with the schema and one user named `username`."""
+    engine = create_sync_engine(f'sqlite:///{path}')
+    table_registry.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User).values(
+                username=username, email=f'{username}@test.com', password='x'
+            )
+        )
+    engine.dispose()
+    return f'sqlite+aiosqlite:///{path}'
+
+
+def build_app(primary: str, replicas: list[str]) -> FastAPI:
+    return create_app(
+        settings.model_copy(
+            update={
+                'DATABASE_URL': primary,
+                'DATABASE_REPLICA_URLS': replicas,
+                'STARTUP_WARMUP': False,
+            }
+        )
+    )
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> Iterator[TestClient]:
+    """The primary and the replica differ, to tell who answered."""
+    app = build_app(
+        create_database(tmp_path / 'primary.db', 'on-primary'),
+        [create_database(tmp_path / 'replica.db', 'on-replica')],
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def usernames(client: TestClient) -> list[str]:
+    users = client.get('/users/').json()['users']
+    return [user['username'] for user in users]
+
+
+def test_reads_go_to_the_replica(client: TestClient):
+    replica_reads = read_routes.labels('replica').value
+
+    assert usernames(client) == ['on-replica']
+    assert client.get('/users/1').json()['username'] == 'on-replica'
+    assert read_routes.labels('replica').value == replica_reads + 2
+
+
+def test_writes_go_to_the_primary_and_stick_for_a_while(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+):
+    response = client.post(
+        '/users/',
+        json={'username': 'new', 'email': 'new@test.com', 'password': 'pw'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert usernames(client) == ['on-primary', 'new']
+
+    monkeypatch.setattr(client.app.state.recent_writes, 'window', 0)
+    client.post(
+        '/users/',
+        json={
+            'username': 'newer',
+            'email': 'newer@test.com',
+            'password': 'pw',
+        },
+    )
+
+    assert usernames(client) == ['on-replica']
+
+
+def test_replica_reads_are_not_cached(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        client.app.state.response_cache, 'backend', MemoryCache(100)
+    )
+    hits = response_cache_hits.value
+
+    assert usernames(client) == usernames(client) == ['on-replica']
+    assert response_cache_hits.value == hits
+
+    client.post(
+        '/users/',
+        json={'username': 'new', 'email': 'new@test.com', 'password': 'pw'},
+    )
+
+    # Reads of the primary, sticky after the write, are cached.
+    assert usernames(client) == usernames(client) == ['on-primary', 'new']
+    assert response_cache_hits.value == hits + 1
+
+
+def test_cache_hits_open_no_replica_session(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        client.app.state.response_cache, 'backend', MemoryCache(100)
+    )
+    client.post(
+        '/users/',
+        json={'username': 'new', 'email': 'new@test.com', 'password': 'pw'},
+    )
+    assert usernames(client) == ['on-primary', 'new']
+
+    # The write is no longer sticky, but its page is still cached.
+    monkeypatch.setattr(
+        client.app.state.recent_writes, 'backend', MemoryCache(100)
+    )
+    replica_reads = read_routes.labels('replica').value
+
+    assert usernames(client) == ['on-primary', 'new']
+    assert read_routes.labels('replica').value == replica_reads
+
+
+def test_primary_reads_reuse_the_request_session(tmp_path: Path):
+    """One pooled connection is enough when the primary serves reads."""
+    app = create_app(
+        settings.model_copy(
+            update={
+                'DATABASE_URL': create_database(tmp_path / 'db', 'other'),
+                'DATABASE_POOL_SIZE': 1,
+                'DATABASE_MAX_OVERFLOW': 0,
+                'DATABASE_POOL_TIMEOUT': 1,
+                'STARTUP_WARMUP': False,
+            }
+        )
+    )
+    user = {'username': 'new', 'email': 'new@test.com', 'password': 'pw'}
+
+    with TestClient(app) as client:
+        client.post('/users/', json=user)
+        token = client.post(
+            '/auth/token',
+            data={'username': user['email'], 'password': user['password']},
+        ).json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        for path in ('/users/', '/todos/', '/todos/changes'):
+            assert client.get(path, headers=headers).status_code == (
+                HTTPStatus.OK
+            )
+
+
+def test_authentication_reads_the_primary(client: TestClient):
+    response = client.post(
+        '/auth/token',
+        data={'username': 'on-replica@test.com', 'password': 'x'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_unreachable_replica_is_ejected(tmp_path: Path):
+    primary = create_database(tmp_path / 'primary.db', 'on-primary')
+    missing = f'sqlite+aiosqlite:///{tmp_path / "missing" / "replica.db"}'
+    app = build_app(primary, [missing])
+
+    with TestClient(app) as client:
+        assert app.state.replicas.healthy() == []
+        assert usernames(client) == ['on-primary']
+
+
+def test_replica_failing_at_checkout_falls_back_to_the_primary(
+    client: TestClient, tmp_path: Path
+):
+    replicas: ReplicaSet = client.app.state.replicas
+    working = replicas.replicas[0]
+    replicas.replicas[0] = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "missing" / "replica.db"}'
+    )
+
+    try:
+        assert usernames(client) == ['on-primary']
+        assert replicas.healthy() == []
+    finally:
+        replicas.replicas[0] = working
+
+
+@pytest.mark.asyncio
+async def test_ejected_replicas_rejoin_after_the_ejection_window():
+    primary = create_async_engine('sqlite+aiosqlite://')
+    replica = create_async_engine('sqlite+aiosqlite://')
+    replicas = ReplicaSet(
+        primary, [replica], 0, create_recent_writes(settings)
+    )
+
+    replicas.eject(replica)
+
+    assert await replicas.reader('users') is replica
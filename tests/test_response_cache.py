@@ -0,0 +1,131 @@
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import MemoryCache, RedisCache
+from app.models import User
+from app.response_cache import response_cache_hits, response_cache_misses
+from tests.conftest import TodoFactory, app
+from tests.test_cache import FakeRedis
+
+
+@pytest.fixture(autouse=True)
+def memory_response_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(app.state.response_cache, 'backend', MemoryCache(100))
+
+
+@pytest_asyncio.fixture
+async def todos(session: AsyncSession, user: User):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+
+@pytest.mark.usefixtures('todos')
+def test_repeated_list_is_served_without_queries(
+    client: TestClient, token: str, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get('/todos/?limit=2&offset=0', headers=headers)
+    hits, misses = response_cache_hits.value, response_cache_misses.value
+
+    with count_queries() as statements:
+        second = client.get('/todos/?offset=0&limit=2', headers=headers)
+
+    assert second.json() == first.json()
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert statements == []
+    assert response_cache_hits.value == hits + 1
+    assert response_cache_misses.value == misses
+
+
+@pytest.mark.usefixtures('todos')
+def test_cached_list_answers_conditional_requests(
+    client: TestClient, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.usefixtures('todos')
+def test_todo_writes_invalidate_the_owner_lists(
+    client: TestClient, token: str
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'New', 'description': 'd', 'state': 'todo'},
+    )
+    created = client.get('/todos/', headers=headers).json()['todos']
+
+    client.delete(f'/todos/{created[0]["id"]}', headers=headers)
+    deleted = client.get('/todos/', headers=headers).json()['todos']
+
+    assert len(created) == 4  # noqa: PLR2004
+    assert len(deleted) == 3  # noqa: PLR2004
+
+
+@pytest.mark.usefixtures('todos')
+def test_lists_are_cached_per_user(
+    client: TestClient, token: str, other_user: User
+):
+    client.get('/todos/', headers={'Authorization': f'Bearer {token}'})
+    other_token = client.post(
+        '/auth/token',
+        data={'username': other_user.email, 'password': 'testtest'},
+    ).json()['access_token']
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {other_token}'}
+    )
+
+    assert response.json()['todos'] == []
+
+
+def test_user_update_invalidates_user_reads(
+    client: TestClient, user: User, token: str
+):
+    client.get(f'/users/{user.id}')
+    client.get('/users/')
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'bob', 'email': 'bob@bob.com', 'password': 'pw'},
+    )
+
+    assert client.get(f'/users/{user.id}').json()['username'] == 'bob'
+    assert client.get('/users/').json()['users'][0]['username'] == 'bob'
+
+
+def test_redis_backend_shares_generations(
+    client: TestClient, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    redis = FakeRedis()
+    monkeypatch.setattr(
+        client.app.state.response_cache,
+        'backend',
+        RedisCache(redis, prefix='response:'),
+    )
+
+    client.get(f'/users/{user.id}')
+    cached_keys = set(redis.data)
+    client.post(
+        '/users/',
+        json={'username': 'amy', 'email': 'amy@amy.com', 'password': 'pw'},
+    )
+
+    assert 'response:generation:users' in cached_keys
+    assert 'response:generation:users' not in redis.data
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.OK
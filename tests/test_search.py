@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from app.models import Todo, User
+from app.search import LikeTodoSearch, get_todo_search
+from tests.conftest import TodoFactory, requires_sqlite
+
+
+async def search(session: AsyncSession, **filters) -> list[int]:
+    todo_search = get_todo_search(session.bind.dialect.name)
+    query = todo_search.filter(
+        select(Todo.id),
+        filters.get('title'),
+        filters.get('description'),
+    )
+    return list(await session.scalars(query.order_by(Todo.id)))
+
+
+def test_unknown_dialect_falls_back_to_like():
+    assert type(get_todo_search('mssql')) is LikeTodoSearch
+
+
+@requires_sqlite
+@pytest.mark.asyncio
+async def test_fts_matches_substrings_like_the_like_filter(
+    session: AsyncSession, user: User
+):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='Buy milk', description='Market'),
+        TodoFactory(user_id=user.id, title='Walk dog', description='Park'),
+    ])
+    await session.commit()
+
+    assert await search(session, title='MILK') == [1]
+    assert await search(session, title='alk') == [2]
+    assert await search(session, title='milk', description='park') == []
+
+
+@pytest.mark.asyncio
+async def test_fts_index_follows_updates_and_deletes(
+    session: AsyncSession, user: User
+):
+    todo = TodoFactory(user_id=user.id, title='Buy milk')
+    session.add(todo)
+    await session.commit()
+
+    todo.title = 'Buy bread'
+    await session.commit()
+
+    assert await search(session, title='milk') == []
+    assert await search(session, title='bread') == [todo.id]
+
+    await session.delete(todo)
+    await session.commit()
+
+    assert await search(session, title='bread') == []
+
+
+@pytest.mark.asyncio
+async def test_list_todos_sort_by_rank(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    session.add_all([
+        TodoFactory(
+            user_id=user.id, title='x', description='milk ' + 'x' * 200
+        ),
+        TodoFactory(user_id=user.id, title='x', description='milk milk'),
+        TodoFactory(user_id=user.id, title='x', description='milk'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?description=milk&sort=rank',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [t['id'] for t in response.json()['todos']] == [2, 3, 1]
+    assert response.json()['next_cursor'] is None
+
+
+def test_list_todos_sort_by_rank_rejects_cursor(client: TestClient, token):
+    response = client.get(
+        '/todos/?title=milk&sort=rank&cursor=e30',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_list_todos_sort_by_rank_requires_text_filter(
+    client: TestClient, token
+):
+    response = client.get(
+        '/todos/?sort=rank',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -1,13 +1,27 @@
+import asyncio
+import threading
 from http import HTTPStatus
 
+import pytest
+from fastapi import HTTPException
 from jwt import decode
 
-from app.security import create_access_token, settings
+from app.security import (
+    PasswordHashPool,
+    create_password_hash,
+    create_password_pool,
+    create_token_issuer,
+    principal_cache_hits,
+    principal_cache_misses,
+)
+from app.settings import settings
+from app.tokens import create_token_keys
 
 
 def test_jwt():
     data = {'foo': 'bar'}
-    token = create_access_token(data)
+    issuer = create_token_issuer(settings, create_token_keys(settings))
+    token = issuer.create_access_token(data)
 
     decoded = decode(token, settings.SECRET_KEY, algorithms=['HS256'])
 
@@ -25,7 +39,9 @@ def test_jwt_invalid_token(client):
 
 
 def test_get_current_user_nonexistent_email(client):
-    token = create_access_token({'sub': 'nonexistent@example.com'})
+    token = client.app.state.token_issuer.create_access_token({
+        'sub': 'nonexistent@example.com'
+    })
 
     response = client.delete(
         '/users/1', headers={'Authorization': f'Bearer {token}'}
@@ -36,7 +52,7 @@ def test_get_current_user_nonexistent_email(client):
 
 
 def test_get_current_user_token_no_sub(client):
-    token = create_access_token({})
+    token = client.app.state.token_issuer.create_access_token({})
 
     response = client.delete(
         '/users/1', headers={'Authorization': f'Bearer {token}'}
@@ -44,3 +60,87 @@ def test_get_current_user_token_no_sub(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json()['detail'] == 'Could not validate credentials'
+
+
+def test_get_current_user_is_served_from_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    hits, misses = principal_cache_hits.value, principal_cache_misses.value
+
+    client.post('/auth/refresh_token', headers=headers)
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache_misses.value == misses + 1
+    assert principal_cache_hits.value == hits + 1
+
+
+def test_update_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'secret',
+        },
+    )
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    client.delete(f'/users/{user.id}', headers=headers)
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_round_trip():
+    pool = create_password_pool(settings)
+    pwd_hash = await pool.hash('secret')
+
+    assert await pool.verify('secret', pwd_hash)
+    assert not await pool.verify('wrong', pwd_hash)
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_jobs_beyond_queue_limit():
+    pool = PasswordHashPool(
+        create_password_hash(settings), workers=1, queue_limit=1
+    )
+    release = threading.Event()
+    running = asyncio.create_task(pool.run(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.run(str)
+
+    release.set()
+    await running
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc_info.value.headers == {'Retry-After': '1'}
+    assert pool.pending == 0
+
+
+def test_login_returns_503_when_hashing_pool_is_full(
+    client, user, monkeypatch
+):
+    pool = client.app.state.password_pool
+    monkeypatch.setattr(pool, 'pending', pool.queue_limit)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.json() == {'detail': 'Server is busy, try again later'}
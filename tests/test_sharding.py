@@ -0,0 +1,177 @@
+from collections import Counter
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine as create_sync_engine
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.main import create_app
+from app.models import Todo, TodoState, TodoVersion, table_registry
+from app.settings import settings
+from app.sharding import HashRing, ShardSet, migrate, rebalance
+
+USERS = range(1, 1001)
+
+
+def sqlite_urls(tmp_path: Path, *names: str) -> dict[str, str]:
+    return {
+        name: f'sqlite+aiosqlite:///{tmp_path / name}.db' for name in names
+    }
+
+
+def todo_owners(url: str) -> Counter:
+    """How many todos each user has in the database at `url`."""
+    engine = create_sync_engine(url.replace('+aiosqlite', ''))
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(Todo.user_id, func.count()).group_by(Todo.user_id)
+        )
+        owners = Counter(dict(rows.all()))
+    engine.dispose()
+    return owners
+
+
+def test_ring_spreads_users_evenly():
+    ring = HashRing(['a', 'b', 'c'])
+
+    shares = Counter(ring.node(user_id) for user_id in USERS)
+
+    assert set(shares) == {'a', 'b', 'c'}
+    assert min(shares.values()) > len(USERS) / 3 * 0.7
+
+
+def test_adding_a_shard_only_moves_users_to_it():
+    before = HashRing(['a', 'b', 'c'])
+    after = HashRing(['a', 'b', 'c', 'd'])
+
+    moved = [u for u in USERS if before.node(u) != after.node(u)]
+
+    assert {after.node(user_id) for user_id in moved} == {'d'}
+    assert len(moved) < len(USERS) / 4 * 1.5
+
+
+@pytest.fixture
+def sharded_settings(tmp_path: Path):
+    shards = sqlite_urls(tmp_path, 'a', 'b', 'c')
+    sharded = settings.model_copy(
+        update={
+            'DATABASE_URL': f'sqlite+aiosqlite:///{tmp_path / "primary.db"}',
+            'DATABASE_SHARDS': shards,
+            'STARTUP_WARMUP': False,
+        }
+    )
+    migrate(sharded, 'upgrade', 'head')
+    return sharded
+
+
+def test_migrate_upgrades_every_database(sharded_settings):
+    urls = [
+        sharded_settings.DATABASE_URL,
+        *sharded_settings.DATABASE_SHARDS.values(),
+    ]
+
+    for url in urls:
+        engine = create_sync_engine(url.replace('+aiosqlite', ''))
+        assert {'users', 'todos', 'todo_state_counts'} <= set(
+            inspect(engine).get_table_names()
+        )
+        engine.dispose()
+
+
+def test_todos_live_on_their_user_shard(sharded_settings):
+    shards = sharded_settings.DATABASE_SHARDS
+    ring = HashRing(list(shards))
+
+    headers = {}
+    with TestClient(create_app(sharded_settings)) as client:
+        for name in ('ann', 'bob', 'cid', 'dee'):
+            client.post(
+                '/users/',
+                json={
+                    'username': name,
+                    'email': f'{name}@test.com',
+                    'password': 'secret',
+                },
+            )
+            token = client.post(
+                '/auth/token',
+                data={'username': f'{name}@test.com', 'password': 'secret'},
+            ).json()['access_token']
+            headers[name] = {'Authorization': f'Bearer {token}'}
+            for state in ('todo', 'done'):
+                client.post(
+                    '/todos/',
+                    headers=headers[name],
+                    json={'title': name, 'description': '', 'state': state},
+                )
+
+            listed = client.get('/todos/', headers=headers[name])
+            stats = client.get('/todos/stats', headers=headers[name])
+
+            assert [t['title'] for t in listed.json()['todos']] == [name] * 2
+            assert stats.json()['total'] == 2  # noqa: PLR2004
+
+        owners = {name: todo_owners(url) for name, url in shards.items()}
+        for user_id in range(1, 5):
+            assert owners[ring.node(user_id)][user_id] == 2  # noqa: PLR2004
+        assert todo_owners(sharded_settings.DATABASE_URL) == Counter()
+
+        response = client.delete('/users/1', headers=headers['ann'])
+
+    assert response.status_code == HTTPStatus.OK
+    assert todo_owners(shards[ring.node(1)])[1] == 0
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_rows_to_the_new_home(tmp_path: Path):
+    urls = sqlite_urls(tmp_path, 'primary', 'a', 'b', 'c')
+    for url in urls.values():
+        engine = create_sync_engine(url.replace('+aiosqlite', ''))
+        table_registry.metadata.create_all(engine)
+        engine.dispose()
+
+    engines = {name: create_async_engine(url) for name, url in urls.items()}
+    async with engines['primary'].begin() as conn:
+        await conn.execute(
+            insert(Todo),
+            [
+                {
+                    'title': f'todo {user_id}',
+                    'description': '',
+                    'state': TodoState.todo,
+                    'user_id': user_id,
+                }
+                for user_id in range(1, 21)
+                for _ in range(3)
+            ],
+        )
+
+    two_shards = ShardSet({'a': engines['a'], 'b': engines['b']})
+    moved = await rebalance(engines['primary'], two_shards)
+
+    assert set(moved) == set(range(1, 21))
+    assert todo_owners(urls['primary']) == Counter()
+    for user_id in range(1, 21):
+        home = urls[two_shards.name_for(user_id)]
+        assert todo_owners(home)[user_id] == 3  # noqa: PLR2004
+
+    three_shards = ShardSet({name: engines[name] for name in ('a', 'b', 'c')})
+    moved = await rebalance(engines['primary'], three_shards)
+
+    assert moved
+    assert {three_shards.name_for(user_id) for user_id in moved} == {'c'}
+    assert sum(todo_owners(urls['c']).values()) == 3 * len(moved)
+
+    async with AsyncSession(engines['c']) as session:
+        versions = (await session.scalars(select(TodoVersion))).all()
+    # Versions keep growing on the new shard, past a horizon that sends
+    # every delta sync back to version 0.
+    assert {version.user_id for version in versions} == set(moved)
+    for version in versions:
+        assert version.version == version.horizon_version > 3  # noqa: PLR2004
+
+    for engine in engines.values():
+        await engine.dispose()
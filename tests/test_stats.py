@@ -0,0 +1,104 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from app.models import TodoState, TodoStateCount, User
+from app.stats import rebuild_todo_stats, todo_stats
+from tests.conftest import TodoFactory
+
+
+def stats(client: TestClient, token: str) -> dict:
+    response = client.get(
+        '/todos/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def test_stats_without_todos_are_zero(client: TestClient, token: str):
+    assert stats(client, token) == {
+        'total': 0,
+        'states': {state.value: 0 for state in TodoState},
+    }
+
+
+def test_stats_follow_every_write_path(client: TestClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 'Todo', 'description': 'd', 'state': 'draft'}
+    first = client.post('/todos/', headers=headers, json=todo).json()
+    batch = client.post(
+        '/todos/batch', headers=headers, json={'todos': [todo, todo, todo]}
+    ).json()['results']
+
+    client.patch(
+        f'/todos/{first["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.patch(
+        '/todos/batch',
+        headers=headers,
+        json={'todos': [{'id': batch[0]['id'], 'state': 'doing'}]},
+    )
+    client.request(
+        'DELETE',
+        '/todos/batch',
+        headers=headers,
+        json={'ids': [batch[1]['id']]},
+    )
+
+    assert stats(client, token) == {
+        'total': 3,
+        'states': {'draft': 1, 'todo': 0, 'doing': 1, 'done': 1, 'trash': 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_stats_are_per_user(
+    session: AsyncSession,
+    user: User,
+    other_user: User,
+    client: TestClient,
+    token: str,
+):
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=other_user.id, state='todo')
+    )
+    await session.commit()
+
+    assert stats(client, token)['total'] == 0
+    assert (await todo_stats(session, other_user.id)).total == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_deleting_user_drops_counters(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert not (await session.scalars(select(TodoStateCount))).all()
+
+
+@pytest.mark.asyncio
+async def test_rebuild_repairs_drifted_counters(
+    session: AsyncSession, user: User
+):
+    session.add_all([
+        *TodoFactory.create_batch(2, user_id=user.id, state='todo'),
+        TodoFactory(user_id=user.id, state='done'),
+    ])
+    await session.commit()
+    expected = await todo_stats(session, user.id)
+
+    await session.execute(update(TodoStateCount).values(count=42))
+    await session.commit()
+    rows = await rebuild_todo_stats(session)
+
+    assert rows == 2  # noqa: PLR2004
+    assert await todo_stats(session, user.id) == expected
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import TodoTombstone, TodoVersion, User
+from app.sync import prune_tombstones
+
+
+def changes(client: TestClient, token: str, **params) -> dict:
+    response = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+        params=params,
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def create_todos(client: TestClient, token: str, count: int) -> list[int]:
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'title': f'todo {n}', 'description': '', 'state': 'todo'}
+                for n in range(count)
+            ]
+        },
+    )
+    return [result['id'] for result in response.json()['results']]
+
+
+def test_changes_report_writes_and_deletes(client: TestClient, token: str):
+    headers = {'Authorization': f'Bearer {token}'}
+    kept, deleted = create_todos(client, token, 2)
+    start = changes(client, token)
+
+    client.patch(f'/todos/{kept}', headers=headers, json={'state': 'done'})
+    client.delete(f'/todos/{deleted}', headers=headers)
+    delta = changes(client, token, since=start['version'])
+
+    assert [todo['id'] for todo in start['todos']] == [kept, deleted]
+    assert start['version'] == 2  # noqa: PLR2004
+    assert [(todo['id'], todo['state']) for todo in delta['todos']] == [
+        (kept, 'done')
+    ]
+    assert delta['deleted'] == [deleted]
+    assert delta['version'] == 4  # noqa: PLR2004
+    assert changes(client, token, since=delta['version']) == {
+        'todos': [],
+        'deleted': [],
+        'version': 4,
+        'has_more': False,
+    }
+
+
+def test_changes_page_in_version_order(client: TestClient, token: str):
+    ids = create_todos(client, token, 5)
+
+    first = changes(client, token, limit=2)
+    second = changes(client, token, since=first['version'], limit=2)
+    last = changes(client, token, since=second['version'], limit=2)
+
+    assert first['has_more']
+    assert second['has_more']
+    assert not last['has_more']
+    pages = (first, second, last)
+    assert [todo['id'] for page in pages for todo in page['todos']] == ids
+
+
+def test_changes_since_a_timestamp(client: TestClient, token: str):
+    create_todos(client, token, 2)
+    now = datetime.now().astimezone()
+
+    before = changes(
+        client, token, since=(now - timedelta(days=1)).isoformat()
+    )
+    after = changes(client, token, since=(now + timedelta(days=1)).isoformat())
+
+    assert len(before['todos']) == 2  # noqa: PLR2004
+    assert after['todos'] == []
+    assert after['version'] == before['version']
+
+
+@pytest.mark.asyncio
+async def test_syncs_behind_pruned_tombstones_start_over(
+    client: TestClient, token: str, session: AsyncSession
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    first, second = create_todos(client, token, 2)
+    client.delete(f'/todos/{first}', headers=headers)
+    seen = changes(client, token)['version']
+    client.delete(f'/todos/{second}', headers=headers)
+
+    pruned = await prune_tombstones(
+        session, datetime.now() + timedelta(days=1)
+    )
+    response = client.get(
+        '/todos/changes',
+        headers=headers,
+        params={'since': seen},
+    )
+
+    assert pruned == 2  # noqa: PLR2004
+    assert response.status_code == HTTPStatus.GONE
+    assert changes(client, token, since=0)['deleted'] == []
+    assert changes(client, token, since=seen + 1)['version'] == seen + 1
+
+
+@pytest.mark.asyncio
+async def test_delete_user_drops_sync_state(
+    client: TestClient, user: User, token: str, session: AsyncSession
+):
+    create_todos(client, token, 2)
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert await session.scalar(select(TodoVersion)) is None
+    assert await session.scalar(select(TodoTombstone)) is None
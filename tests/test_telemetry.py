@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+
+from app.settings import settings
+from app.telemetry import configure_telemetry, instrument_engine
+
+
+@pytest.fixture
+def fake_logfire(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    logfire = MagicMock()
+    monkeypatch.setitem(sys.modules, 'logfire', logfire)
+    return logfire
+
+
+def test_off_mode_never_imports_logfire():
+    env = {
+        **os.environ,
+        'TELEMETRY_MODE': 'off',
+        'PYDANTIC_DISABLE_PLUGINS': 'logfire-plugin',
+    }
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            "import sys, app.main; print('logfire' in sys.modules)",
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == 'False'
+
+
+def test_sampled_mode_samples_at_the_root_span(fake_logfire: MagicMock):
+    app = FastAPI()
+    sampled = settings.model_copy(
+        update={'TELEMETRY_MODE': 'sampled', 'TELEMETRY_SAMPLE_RATE': 0.25}
+    )
+
+    configure_telemetry(app, sampled)
+    instrument_engine(engine := MagicMock(), sampled)
+
+    fake_logfire.SamplingOptions.assert_called_once_with(head=0.25)
+    assert (
+        fake_logfire.configure.call_args.kwargs['sampling']
+        is fake_logfire.SamplingOptions.return_value
+    )
+    fake_logfire.instrument_fastapi.assert_called_once_with(app)
+    fake_logfire.instrument_sqlalchemy.assert_called_once_with(engine)
+
+
+def test_full_mode_keeps_every_trace(fake_logfire: MagicMock):
+    configure_telemetry(
+        FastAPI(), settings.model_copy(update={'TELEMETRY_MODE': 'full'})
+    )
+
+    assert fake_logfire.configure.call_args.kwargs['sampling'] is None
+
+
+def test_off_mode_configures_nothing(fake_logfire: MagicMock):
+    off = settings.model_copy(update={'TELEMETRY_MODE': 'off'})
+
+    configure_telemetry(FastAPI(), off)
+    instrument_engine(MagicMock(), off)
+
+    fake_logfire.configure.assert_not_called()
+    fake_logfire.instrument_sqlalchemy.assert_not_called()
@@ -1,3 +1,8 @@
+import csv
+import io
+import json
+from datetime import UTC, datetime
+from email.utils import format_datetime
 from http import HTTPStatus
 
 import pytest
@@ -6,6 +11,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from app.models import Todo, TodoState, User
+from app.schemas import MAX_BATCH_SIZE
 from tests.conftest import TodoFactory
 
 
@@ -67,6 +73,27 @@ async def test_list_todos_pagination_should_return_2_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    session.add_all(TodoFactory.create_batch(size=3, user_id=user.id))
+    await session.commit()
+
+    first_page = client.get(
+        '/todos/?limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+    second_page = client.get(
+        f'/todos/?limit=2&cursor={first_page["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+
+    assert [t['id'] for t in first_page['todos']] == [1, 2]
+    assert [t['id'] for t in second_page['todos']] == [3]
+    assert second_page['next_cursor'] is None
+
+
 @pytest.mark.asyncio
 async def test_list_todos_filter_title_should_return_5_todos(
     session: AsyncSession, user: User, client: TestClient, token: str
@@ -261,3 +288,282 @@ async def test_todo_state_invalid_value(session: AsyncSession, user: User):
 
     with pytest.raises(LookupError, match='invalid_state'):
         await session.scalar(select(Todo).where(Todo.id == todo.id))
+
+
+def test_create_todos_batch(client: TestClient, token: str):
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'title': f'Todo {i}', 'description': 'd', 'state': 'draft'}
+                for i in range(3)
+            ]
+        },
+    )
+
+    results = response.json()['results']
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert [r['id'] for r in results] == [1, 2, 3]
+    assert {r['status'] for r in results} == {HTTPStatus.CREATED}
+    assert [r['todo']['title'] for r in results] == [
+        'Todo 0',
+        'Todo 1',
+        'Todo 2',
+    ]
+    assert results[0]['todo']['created_at']
+
+
+def test_create_todos_batch_enforces_size_cap(client: TestClient, token: str):
+    todo = {'title': 'Todo', 'description': 'd', 'state': 'draft'}
+
+    response = client.post(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': [todo] * (MAX_BATCH_SIZE + 1)},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    user: User,
+    other_user: User,
+    client: TestClient,
+    token: str,
+    mock_db_time,
+):
+    with mock_db_time(model=Todo):
+        session.add_all(TodoFactory.create_batch(size=2, user_id=user.id))
+        session.add(TodoFactory(user_id=other_user.id))
+        await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'todos': [
+                {'id': 1, 'title': 'New title'},
+                {'id': 2, 'state': 'done'},
+                {'id': 3, 'title': 'Not mine'},
+                {'id': 99, 'title': 'Missing'},
+            ]
+        },
+    )
+
+    results = response.json()['results']
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in results] == [200, 200, 404, 404]
+    assert results[0]['todo']['title'] == 'New title'
+    assert results[0]['todo']['updated_at'] != '2026-01-01T00:00:00'
+    assert results[1]['todo']['state'] == 'done'
+    assert results[2] == {
+        'id': 3,
+        'status': HTTPStatus.NOT_FOUND,
+        'todo': None,
+        'detail': 'Task not found',
+    }
+    not_mine = await session.get(Todo, 3, populate_existing=True)
+    assert not_mine.title != 'Not mine'
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_rejects_nulls(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'todos': [{'id': todo.id, 'title': None, 'state': 'done'}]},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert 'title cannot be null' in response.json()['detail'][0]['msg']
+    await session.refresh(todo)
+    assert todo.title is not None
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    session.add_all(TodoFactory.create_batch(size=2, user_id=user.id))
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'ids': [1, 2, 3]},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in response.json()['results']] == [
+        200,
+        200,
+        404,
+    ]
+    assert await session.scalar(select(Todo)) is None
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson_honors_filters(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    user: User,
+    other_user: User,
+    client: TestClient,
+    token: str,
+):
+    session.add_all(
+        TodoFactory.create_batch(size=3, user_id=user.id, state=TodoState.done)
+    )
+    session.add(TodoFactory(user_id=user.id, state=TodoState.draft))
+    session.add(TodoFactory(user_id=other_user.id, state=TodoState.done))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [line['id'] for line in lines] == [1, 2, 3]
+    assert {line['state'] for line in lines} == {'done'}
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    session.add_all(TodoFactory.create_batch(size=2, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert [row['id'] for row in rows] == ['1', '2']
+    assert list(rows[0]) == [
+        'title',
+        'description',
+        'state',
+        'id',
+        'created_at',
+        'updated_at',
+    ]
+
+
+def test_export_todos_csv_without_rows_has_header(
+    client: TestClient, token: str
+):
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.text.splitlines() == [
+        'title,description,state,id,created_at,updated_at'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_not_modified_until_a_todo_changes(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    todos = TodoFactory.create_batch(size=3, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/', headers=headers)
+    etag = first.headers['ETag']
+    cached = client.get('/todos/', headers={**headers, 'If-None-Match': etag})
+
+    client.patch(
+        f'/todos/{todos[0].id}', headers=headers, json={'state': 'done'}
+    )
+    patched = client.get('/todos/', headers={**headers, 'If-None-Match': etag})
+
+    client.delete(f'/todos/{todos[1].id}', headers=headers)
+    deleted = client.get(
+        '/todos/',
+        headers={**headers, 'If-None-Match': patched.headers['ETag']},
+    )
+
+    assert etag.startswith('W/"')
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert cached.headers['ETag'] == etag
+    assert not cached.content
+    assert patched.status_code == HTTPStatus.OK
+    assert patched.headers['ETag'] != etag
+    assert deleted.status_code == HTTPStatus.OK
+    assert len(deleted.json()['todos']) == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_list_todos_ignores_if_modified_since_after_a_delete(
+    session: AsyncSession, user: User, client: TestClient, token: str
+):
+    todos = TodoFactory.create_batch(size=2, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/', headers=headers)
+    client.delete(f'/todos/{todos[0].id}', headers=headers)
+    since = client.get(
+        '/todos/',
+        headers={
+            **headers,
+            'If-Modified-Since': format_datetime(
+                datetime.now(UTC), usegmt=True
+            ),
+        },
+    )
+
+    assert 'Last-Modified' not in first.headers
+    assert since.status_code == HTTPStatus.OK
+    assert [todo['id'] for todo in since.json()['todos']] == [todos[1].id]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_etag_is_per_user(
+    session: AsyncSession,
+    user: User,
+    other_user: User,
+    client: TestClient,
+    token: str,
+):
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    other_token = client.post(
+        '/auth/token',
+        data={'username': other_user.email, 'password': 'testtest'},
+    ).json()['access_token']
+
+    other = client.get(
+        '/todos/',
+        headers={
+            'Authorization': f'Bearer {other_token}',
+            'If-None-Match': response.headers['ETag'],
+        },
+    )
+
+    assert other.status_code == HTTPStatus.OK
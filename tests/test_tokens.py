@@ -0,0 +1,146 @@
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from freezegun import freeze_time
+from jwt import (
+    ExpiredSignatureError,
+    InvalidSignatureError,
+    PyJWK,
+    decode,
+    get_unverified_header,
+)
+
+from app.cache import MemoryCache
+from app.models import User
+from app.tokens import (
+    TokenKeys,
+    TokenVerifier,
+    token_cache_hits,
+    token_cache_misses,
+)
+
+
+@pytest.fixture
+def hmac_keys() -> TokenKeys:
+    return TokenKeys.load('HS256', 'test-secret-key-of-32-bytes-long')
+
+
+@pytest.fixture(params=['RS256', 'EdDSA'])
+def asymmetric_keys(request, tmp_path: Path) -> TokenKeys:
+    pytest.importorskip('cryptography')
+    from cryptography.hazmat.primitives import serialization  # noqa: PLC0415
+    from cryptography.hazmat.primitives.asymmetric import (  # noqa: PLC0415
+        ed25519,
+        rsa,
+    )
+
+    if request.param == 'RS256':
+        private_key = rsa.generate_private_key(65537, 2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+
+    pem = tmp_path / 'jwt.pem'
+    pem.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return TokenKeys.load(request.param, 'unused', str(pem))
+
+
+@pytest.mark.asyncio
+async def test_verifier_caches_valid_tokens(hmac_keys: TokenKeys):
+    verifier = TokenVerifier(hmac_keys, MemoryCache(max_entries=10))
+    token = hmac_keys.encode({'sub': 'a@a.com', 'exp': 2**32})
+    hits, misses = token_cache_hits.value, token_cache_misses.value
+
+    first = await verifier.verify(token)
+    second = await verifier.verify(token)
+
+    assert first == second == {'sub': 'a@a.com', 'exp': 2**32}
+    assert token_cache_misses.value == misses + 1
+    assert token_cache_hits.value == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_verifier_does_not_serve_tampered_tokens(hmac_keys: TokenKeys):
+    verifier = TokenVerifier(hmac_keys, MemoryCache(max_entries=10))
+    claims = {'sub': 'a@a.com', 'exp': 2**32}
+    await verifier.verify(hmac_keys.encode(claims))
+
+    forger = TokenKeys.load('HS256', 'someone-elses-key-of-32-bytes-long')
+    forged = forger.encode(claims)
+
+    with pytest.raises(InvalidSignatureError):
+        await verifier.verify(forged)
+
+
+@pytest.mark.asyncio
+async def test_cached_tokens_expire_with_exp(hmac_keys: TokenKeys, token_time):
+    verifier = TokenVerifier(hmac_keys, MemoryCache(max_entries=10))
+
+    with token_time() as time:
+        expiry = time['expired'].timestamp() - 30
+        token = hmac_keys.encode({'sub': 'a@a.com', 'exp': expiry})
+
+        with freeze_time(time['creation']):
+            await verifier.verify(token)
+
+        with (
+            freeze_time(time['expired']),
+            pytest.raises(ExpiredSignatureError),
+        ):
+            await verifier.verify(token)
+
+
+def test_hmac_keys_are_not_published(client: TestClient):
+    response = client.get('/auth/jwks')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'keys': []}
+
+
+def test_asymmetric_algorithm_requires_private_key():
+    with pytest.raises(ValueError, match='JWT_PRIVATE_KEY_FILE'):
+        TokenKeys.load('RS256', 'unused')
+
+
+def test_tokens_verify_offline_with_published_key(asymmetric_keys: TokenKeys):
+    token = asymmetric_keys.encode({'sub': 'a@a.com'})
+    (jwk,) = asymmetric_keys.jwks['keys']
+
+    public_key = PyJWK(jwk).key
+
+    assert get_unverified_header(token)['kid'] == jwk['kid']
+    assert decode(token, public_key, algorithms=[jwk['alg']]) == {
+        'sub': 'a@a.com'
+    }
+
+
+def test_login_with_asymmetric_keys(
+    client: TestClient,
+    user: User,
+    asymmetric_keys: TokenKeys,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    state = client.app.state
+    verifier = TokenVerifier(asymmetric_keys, MemoryCache(max_entries=10))
+    monkeypatch.setattr(state, 'token_keys', asymmetric_keys)
+    monkeypatch.setattr(state, 'token_verifier', verifier)
+    monkeypatch.setattr(state.token_issuer, 'keys', asymmetric_keys)
+
+    token = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()['access_token']
+    response = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    )
+    jwks = client.get('/auth/jwks').json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert jwks == asymmetric_keys.jwks
@@ -2,11 +2,12 @@ from http import HTTPStatus
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
-from app.models import User
+from app.models import Todo, User
 from app.schemas import UserPublic
-from tests.conftest import UserFactory
+from tests.conftest import TodoFactory, UserFactory
 
 
 def test_create_user(client: TestClient):
@@ -81,6 +82,26 @@ def test_create_user_with_existing_email(client: TestClient):
     assert response.json() == {'detail': 'Email already exists'}
 
 
+def test_create_user_conflict_skips_hashing(
+    client: TestClient, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    async def hash_password(password):
+        pytest.fail('hashed a password that could not be stored')
+
+    monkeypatch.setattr(client.app.state.password_pool, 'hash', hash_password)
+
+    response = client.post(
+        '/users/',
+        json={
+            'username': user.username,
+            'email': 'new@example.com',
+            'password': 'secret',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CONFLICT
+
+
 def test_read_users_with_user(
     client: TestClient, user: User, other_user: User
 ):
@@ -94,6 +115,7 @@ def test_read_users_with_user(
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {
         'users': [user_schema, other_user_schema],
+        'next_cursor': None,
     }
 
 
@@ -117,7 +139,35 @@ def test_read_users_empty(client: TestClient):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
+
+
+@pytest.mark.asyncio
+async def test_read_users_cursor_pagination(
+    session: AsyncSession, client: TestClient
+):
+    session.add_all(UserFactory.create_batch(5))
+    await session.commit()
+
+    first_page = client.get('/users/?limit=2').json()
+    second_page = client.get(
+        f'/users/?limit=2&cursor={first_page["next_cursor"]}'
+    ).json()
+    last_page = client.get(
+        f'/users/?limit=2&cursor={second_page["next_cursor"]}'
+    ).json()
+
+    assert [u['id'] for u in first_page['users']] == [1, 2]
+    assert [u['id'] for u in second_page['users']] == [3, 4]
+    assert [u['id'] for u in last_page['users']] == [5]
+    assert last_page['next_cursor'] is None
+
+
+def test_read_users_invalid_cursor(client: TestClient):
+    response = client.get('/users/?cursor=not-a-cursor')
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
 
 
 def test_read_user(client: TestClient, user: User):
@@ -221,6 +271,20 @@ def test_delete_user(client: TestClient, user: User, token: str):
     assert response.json() == {'message': 'User deleted'}
 
 
+@pytest.mark.asyncio
+async def test_delete_user_removes_todos(
+    session: AsyncSession, client: TestClient, user: User, token: str
+):
+    session.add_all(TodoFactory.create_batch(size=3, user_id=user.id))
+    await session.commit()
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert await session.scalar(select(func.count()).select_from(Todo)) == 0
+
+
 def test_delete_user_insufficient_permissions(
     client: TestClient, other_user: User, token: str
 ):
@@ -230,3 +294,50 @@ def test_delete_user_insufficient_permissions(
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permissions'}
+
+
+def test_read_user_not_modified_until_updated(
+    client: TestClient, user: User, token: str
+):
+    first = client.get(f'/users/{user.id}')
+    cached = client.get(
+        f'/users/{user.id}', headers={'If-None-Match': first.headers['ETag']}
+    )
+    since = client.get(
+        f'/users/{user.id}',
+        headers={'If-Modified-Since': first.headers['Last-Modified']},
+    )
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+    updated = client.get(
+        f'/users/{user.id}', headers={'If-None-Match': first.headers['ETag']}
+    )
+
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert since.status_code == HTTPStatus.NOT_MODIFIED
+    assert updated.status_code == HTTPStatus.OK
+    assert updated.json()['username'] == 'bob'
+
+
+def test_read_users_not_modified_until_a_user_is_added(
+    client: TestClient, user: User
+):
+    etag = client.get('/users/').headers['ETag']
+    cached = client.get('/users/', headers={'If-None-Match': f'"x", {etag}'})
+
+    client.post(
+        '/users/',
+        json={'username': 'amy', 'email': 'amy@amy.com', 'password': 'pw'},
+    )
+    added = client.get('/users/', headers={'If-None-Match': etag})
+
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert added.status_code == HTTPStatus.OK